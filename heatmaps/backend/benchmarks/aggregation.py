@@ -0,0 +1,173 @@
+"""Time and memory of the heatmap and insights aggregations as event history grows.
+
+For each scale, loads about that many synthetic zone events (see
+benchmarks.event_generator) into a scratch database, then runs hourly
+heatmaps, daily heatmaps and daily insights for every store and reports
+the wall time and memory high-water mark of each stage. Each stage runs in
+a fresh child process, so `ru_maxrss` reflects that stage alone, not the
+loader or the stages before it. With `--in-memory` the data lives in this
+process and the stages run here one after another; since `ru_maxrss` only
+ever grows, only the first stage's peak is reported then. `--tracemalloc`
+adds the Python allocation peak per stage (and slows the stages down).
+
+    python -m benchmarks.aggregation --events 10000 1000000 10000000 --json
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import resource
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+import pymongo
+
+from src.config.settings import settings
+from .event_generator import load_events, visitors_for
+
+
+def use_in_memory():
+    import mongomock
+    pymongo.MongoClient = mongomock.MongoClient
+
+
+def maxrss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+
+
+STAGES = ('hourly_heatmaps', 'daily_heatmaps', 'insights')  # In order: each reads what the one before wrote
+
+
+def aggregate(database, event_storage, store_ids, stage, trace):
+    """Run one aggregation stage for each store; returns its measurements"""
+    settings.database_name = database
+    settings.event_storage = event_storage
+    from src.core.heatmap_generator import HeatmapGenerator
+    from src.core.insights_generator import InsightsGenerator
+
+    run = {
+        'hourly_heatmaps': lambda store_id: HeatmapGenerator(store_id).generate_hourly_heatmaps(),
+        'daily_heatmaps': lambda store_id: HeatmapGenerator(store_id).generate_daily_heatmaps(),
+        'insights': lambda store_id: InsightsGenerator(store_id).generate_daily_insights()
+    }[stage]
+    baseline_rss = maxrss_mb()
+    if trace:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    outputs = 0
+    # The generators report progress on stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        for store_id in store_ids:
+            output = run(store_id)
+            outputs += len(output) if isinstance(output, list) else int(output is not None)
+    result = {
+        'seconds': round(time.perf_counter() - started, 3),
+        'documents_written': outputs,
+        'baseline_rss_mb': round(baseline_rss, 1),
+        'maxrss_mb': round(maxrss_mb(), 1),
+        'maxrss_growth_mb': round(maxrss_mb() - baseline_rss, 1)
+    }
+    if trace:
+        result['tracemalloc_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        tracemalloc.stop()
+    return result
+
+
+def run_scale(events, args):
+    # Scales share one scratch database: the module-level clients are bound to a name on first import
+    database = args.database
+    settings.database_name = database
+    from src.database import connection
+    from src.database.event_store import get_event_store
+
+    connection.sync_client.drop_database(database)
+    visitors = visitors_for(events, args.stores, args.days, args.visits_per_visitor)
+    started = time.perf_counter()
+    loaded = load_events(
+        connection, get_event_store(args.event_storage), args.stores, args.cameras, args.zones_per_camera,
+        args.days, visitors, args.visits_per_visitor, args.dwell_median, args.dwell_sigma, seed=args.seed
+    )
+    load_seconds = time.perf_counter() - started
+    store_ids = [store_id for store_id, _ in loaded]
+
+    stages = {}
+    try:
+        for stage in STAGES:
+            if args.in_memory:
+                # mongomock data lives in this process, so the stages can't run in a child
+                stages[stage] = aggregate(database, args.event_storage, store_ids, stage, args.tracemalloc)
+                if len(stages) > 1:
+                    # The process high-water mark includes the stages before this one
+                    stages[stage].update(maxrss_mb=None, maxrss_growth_mb=None)
+                continue
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                stages[stage] = pool.submit(
+                    aggregate, database, args.event_storage, store_ids, stage, args.tracemalloc
+                ).result()
+    finally:
+        if not args.keep or events != args.events[-1]:
+            connection.sync_client.drop_database(database)
+
+    return dict(
+        target_events=events,
+        events=sum(count for _, count in loaded),
+        stores=args.stores,
+        days=args.days,
+        visitors_per_day=visitors,
+        event_storage=args.event_storage,
+        load_seconds=round(load_seconds, 1),
+        stages=stages
+    )
+
+
+def print_table(results):
+    header = f"{'events':>10} {'stage':>16} {'seconds':>9} {'docs':>6} {'rss MB':>8} {'growth MB':>10} {'py peak MB':>11}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        for stage, s in r['stages'].items():
+            rss, growth, peak = (
+                '-' if value is None else value
+                for value in (s['maxrss_mb'], s['maxrss_growth_mb'], s.get('tracemalloc_peak_mb'))
+            )
+            print(f"{r['events']:>10} {stage:>16} {s['seconds']:>9.3f} {s['documents_written']:>6} "
+                  f"{rss:>8} {growth:>10} {peak:>11}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, nargs='+', default=[10000, 1000000, 10000000])
+    parser.add_argument('--stores', type=int, default=1)
+    parser.add_argument('--cameras', type=int, default=2, help="Cameras per store")
+    parser.add_argument('--zones-per-camera', type=int, default=4)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--visits-per-visitor', type=float, default=3.0)
+    parser.add_argument('--dwell-median', type=float, default=40.0, help="Median dwell in seconds")
+    parser.add_argument('--dwell-sigma', type=float, default=1.0, help="Log-normal sigma of dwell times")
+    parser.add_argument('--event-storage', choices=['documents', 'buckets'], default=settings.event_storage)
+    parser.add_argument('--database', default=f"{settings.database_name}_benchmark")
+    parser.add_argument('--in-memory', action='store_true', help="Use mongomock instead of a MongoDB server")
+    parser.add_argument('--tracemalloc', action='store_true', help="Also record Python allocation peaks")
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch database of the last scale")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    if args.in_memory:
+        try:
+            use_in_memory()
+        except ImportError:
+            parser.error("--in-memory needs mongomock (pip install mongomock)")
+
+    results = [run_scale(events, args) for events in args.events]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""Concurrent dashboard traffic against the heatmap and insights endpoints.
+
+Seeds a large store (synthetic events from benchmarks.event_generator plus
+the hourly/daily heatmaps and insights built from them), then runs
+`--concurrency` clients that each send requests back to back, picking
+endpoints by the weights in `--mix`. Requests go to the FastAPI app
+in-process through ASGI, or to a running server with `--url`. Reports
+per-endpoint throughput, latency percentiles and a latency histogram, and
+the server's resident memory (this process in-process; `--server-pid`
+with `--url`). `--accept` and `--accept-encoding` pick the response format
+and compression; bytes are reported as sent, before decompression.
+
+    python -m benchmarks.api_load --events 1000000 --concurrency 32 --duration 30
+    python -m benchmarks.api_load --url http://localhost:8000 --server-pid 1234 --store-id <id>
+
+The server behind `--url` must use the same DATABASE_NAME as `--database`
+for the seeded store to be visible to it.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+import numpy as np
+import httpx
+
+from src.config.settings import settings
+from .event_generator import load_events, visitors_for
+
+ENDPOINTS = {
+    'hourly': '/api/stores/{store_id}/heatmaps/hourly',
+    'daily': '/api/stores/{store_id}/heatmaps/daily',
+    'insights': '/api/stores/{store_id}/insights',
+    'transitions': '/api/stores/{store_id}/transitions',
+    'occupancy': '/api/stores/{store_id}/occupancy'
+}
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf')]
+
+
+def parse_mix(mix):
+    """'hourly=4,insights=1' -> {'hourly': 4.0, 'insights': 1.0}"""
+    weights = {}
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}, expected one of {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def rss_mb(pid):
+    """Current and peak resident set size of a process, from /proc (Linux only)"""
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'VmHWM'):
+                values[key] = int(value.split()[0]) / 1024
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+def seed_store(args):
+    """Load synthetic events for one store and build its rollups; returns the store id"""
+    from src.database import connection
+    from src.database.event_store import get_event_store
+    from src.core.heatmap_generator import HeatmapGenerator
+    from src.core.insights_generator import InsightsGenerator
+
+    visitors = visitors_for(args.events, 1, args.days, 3.0)
+    started = time.perf_counter()
+    [(store_id, events)] = load_events(connection, get_event_store(), stores=1, days=args.days,
+                                       visitors=visitors, seed=args.seed)
+    with contextlib.redirect_stdout(sys.stderr):
+        generator = HeatmapGenerator(store_id)
+        generator.generate_hourly_heatmaps()
+        generator.generate_daily_heatmaps()
+        InsightsGenerator(store_id).generate_daily_insights()
+    print(f"Seeded store {store_id} with {events} events and its rollups in "
+          f"{time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return store_id
+
+
+def summarise(latencies, statuses, seconds, sizes):
+    latencies = np.array(latencies) * 1000
+    counts = np.histogram(latencies, bins=[0] + BUCKETS_MS)[0] if len(latencies) else np.zeros(len(BUCKETS_MS))
+    return {
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+        'p90_ms': round(float(np.percentile(latencies, 90)), 2) if len(latencies) else None,
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2) if len(latencies) else None,
+        'max_ms': round(float(latencies.max()), 2) if len(latencies) else None,
+        'mean_response_bytes': round(float(np.mean(sizes))) if len(sizes) else None,
+        'histogram_ms': {f"<={bound:g}": int(count) for bound, count in zip(BUCKETS_MS, counts) if count}
+    }
+
+
+async def drive(client, store_id, weights, concurrency, duration, max_requests, server_pid):
+    names = list(weights)
+    cumulative = np.cumsum([weights[name] for name in names]).tolist()
+    latencies = {name: [] for name in names}
+    statuses = {name: {} for name in names}
+    sizes = {name: [] for name in names}  # Bytes on the wire, before decompression
+    memory = {'rss_mb': [], 'peak_rss_mb': None}
+    deadline = time.perf_counter() + duration
+    sent = 0
+
+    async def client_loop(seed):
+        nonlocal sent
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline and (not max_requests or sent < max_requests):
+            sent += 1
+            name = rng.choices(names, cum_weights=cumulative)[0]
+            started = time.perf_counter()
+            response = await client.get(ENDPOINTS[name].format(store_id=store_id))
+            await response.aread()
+            latencies[name].append(time.perf_counter() - started)
+            sizes[name].append(response.num_bytes_downloaded)
+            statuses[name][response.status_code] = statuses[name].get(response.status_code, 0) + 1
+
+    async def sample_memory():
+        while True:
+            rss, peak = rss_mb(server_pid)
+            memory['rss_mb'].append(rss)
+            memory['peak_rss_mb'] = peak
+            await asyncio.sleep(0.5)
+
+    sampler = asyncio.create_task(sample_memory()) if server_pid else None
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(i) for i in range(concurrency)))
+    seconds = time.perf_counter() - started
+    if sampler:
+        sampler.cancel()
+
+    endpoints = {name: summarise(latencies[name], statuses[name], seconds, sizes[name]) for name in names}
+    all_statuses = {}
+    for name in names:
+        for status, count in statuses[name].items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    overall = summarise([l for name in names for l in latencies[name]], all_statuses, seconds,
+                        [size for name in names for size in sizes[name]])
+    result = {'seconds': round(seconds, 2), 'overall': overall, 'endpoints': endpoints}
+    if memory['rss_mb']:
+        result['server_memory'] = {
+            'rss_start_mb': round(memory['rss_mb'][0], 1),
+            'rss_end_mb': round(memory['rss_mb'][-1], 1),
+            'rss_max_sampled_mb': round(max(memory['rss_mb']), 1),
+            'peak_rss_mb': round(memory['peak_rss_mb'], 1)
+        }
+    return result
+
+
+async def run(args, store_id):
+    weights = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    headers = {'Accept': args.accept, 'Accept-Encoding': args.accept_encoding}
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits, headers=headers)
+        server_pid = args.server_pid
+    else:
+        from src.api.routes import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://benchmark',
+                                   timeout=args.timeout, limits=limits, headers=headers)
+        server_pid = os.getpid()
+
+    async with client:
+        if args.warmup:
+            await drive(client, store_id, weights, min(args.concurrency, 4), 60, args.warmup, None)
+        result = await drive(client, store_id, weights, args.concurrency, args.duration, args.requests, server_pid)
+
+    result['config'] = {
+        'target': args.url or 'in-process',
+        'store_id': store_id,
+        'concurrency': args.concurrency,
+        'accept': args.accept,
+        'accept_encoding': args.accept_encoding,
+        'mix': weights,
+        'events': args.events if not args.store_id else None
+    }
+    return result
+
+
+def print_table(result):
+    print(f"{result['overall']['requests']} requests in {result['seconds']}s "
+          f"({result['overall']['requests_per_second']} req/s) at concurrency {result['config']['concurrency']}")
+    header = f"{'endpoint':>12} {'requests':>9} {'req/s':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'bytes':>10}  statuses"
+    print(header)
+    print('-' * len(header))
+    for name, s in list(result['endpoints'].items()) + [('all', result['overall'])]:
+        if not s['requests']:
+            continue
+        print(f"{name:>12} {s['requests']:>9} {s['requests_per_second']:>8} {s['p50_ms']:>9} {s['p90_ms']:>9} "
+              f"{s['p99_ms']:>9} {s['max_ms']:>9} {s['mean_response_bytes']:>10}  {s['statuses']}")
+    print("latency histogram (all):", result['overall']['histogram_ms'])
+    if 'server_memory' in result:
+        m = result['server_memory']
+        print(f"server RSS {m['rss_start_mb']} -> {m['rss_end_mb']} MB (peak {m['peak_rss_mb']} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="Base URL of a running server (default: the app in-process)")
+    parser.add_argument('--server-pid', type=int, help="Server process to sample RSS from with --url")
+    parser.add_argument('--store-id', help="Use an existing store instead of seeding one")
+    parser.add_argument('--events', type=int, default=1000000, help="Events to seed the store with")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--mix', default='hourly=4,daily=2,insights=1', help="Endpoint weights")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20.0, help="Seconds to run for")
+    parser.add_argument('--requests', type=int, default=0, help="Stop after this many requests (0 = no limit)")
+    parser.add_argument('--warmup', type=int, default=20, help="Requests sent before measuring")
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--accept', default='application/json',
+                        help="Response format to ask for, e.g. application/msgpack")
+    parser.add_argument('--accept-encoding', default='identity', help="e.g. gzip or br")
+    parser.add_argument('--database', default=f"{settings.database_name}_benchmark")
+    parser.add_argument('--keep', action='store_true', help="Keep the seeded database")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    settings.database_name = args.database
+    store_id = args.store_id or seed_store(args)
+    try:
+        result = asyncio.run(run(args, store_id))
+    finally:
+        if not args.store_id and not args.keep:
+            from src.database import connection
+            connection.sync_client.drop_database(args.database)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_table(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Bulk-load realistic synthetic zone events for aggregation benchmarks.
+
+Each store gets cameras and zones registered like the API does. For every
+day, visitors arrive along a two-peak opening-hours profile, visit a few
+zones in turn with log-normal dwell times (short ones fall below the dwell
+threshold and become rejected visits) and walk between zones for a few
+seconds to a few minutes. Events go through the configured event store, so
+the `documents` and `buckets` layouts are loaded the same way as
+processing does. They go into the `<database>_benchmark` scratch database
+unless `--database` names another, never the application's own.
+
+    python -m benchmarks.event_generator --stores 2 --days 30 --visitors 2000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+from src.config.settings import settings
+from src.core.events import ZoneEvent, ENTRY, EXIT
+
+OPENING_HOUR = 9
+CLOSING_HOUR = 21
+CHUNK_SIZE = 10000  # Events handed to the writer at a time
+
+
+def register_store(connection, name, cameras, zones_per_camera, minimum_dwell_threshold):
+    """Insert a store with its cameras and zones; returns (store_id, zones)"""
+    store_id = str(connection.sync_stores.insert_one({'name': name, 'created_at': datetime.utcnow()}).inserted_id)
+    zones = []
+    for c in range(cameras):
+        camera_id = str(connection.sync_cameras.insert_one({
+            'store_id': store_id,
+            'camera_identifier': f"camera-{c}",
+            'name': f"Camera {c + 1}",
+            'video_source': '',
+            'status': 'active'
+        }).inserted_id)
+        for z in range(zones_per_camera):
+            zone = {
+                'camera_id': camera_id,
+                'zone_identifier': f"zone-{c}-{z}",
+                'name': f"Zone {c + 1}.{z + 1}",
+                'polygon': [[0, 0], [100, 0], [100, 100], [0, 100]],
+                'zone_type': 'area',
+                'minimum_dwell_threshold': minimum_dwell_threshold
+            }
+            zone['_id'] = connection.sync_zones.insert_one(zone).inserted_id
+            zones.append(zone)
+    return store_id, zones
+
+
+def arrival_offsets(rng, count):
+    """Seconds after opening, from a late-morning and an early-evening peak"""
+    open_seconds = (CLOSING_HOUR - OPENING_HOUR) * 3600
+    peak = rng.random(count) < 0.45
+    offsets = np.where(
+        peak,
+        rng.normal(open_seconds * 0.3, open_seconds * 0.1, count),
+        rng.normal(open_seconds * 0.75, open_seconds * 0.12, count)
+    )
+    return np.clip(offsets, 0, open_seconds - 1)
+
+
+def day_events(rng, store_id, zones, day, visitors, visits_per_visitor, dwell_median, dwell_sigma,
+               minimum_dwell_threshold):
+    """Entry/exit events of one store-day"""
+    opening = day + timedelta(hours=OPENING_HOUR)
+    visit_counts = np.maximum(1, rng.poisson(visits_per_visitor, visitors))
+    total = int(visit_counts.sum())
+    zone_index = rng.integers(0, len(zones), total)
+    dwell = rng.lognormal(np.log(dwell_median), dwell_sigma, total)
+    walk = rng.exponential(30.0, total)
+    arrivals = arrival_offsets(rng, visitors)
+
+    zone_keys = [(str(z['_id']), z['camera_id']) for z in zones]
+    day_key = f"{day:%Y%m%d}"
+    events = []
+    visit = 0
+    for visitor, count in enumerate(visit_counts.tolist()):
+        person_id = f"P_{day_key}_{visitor}"
+        clock = float(arrivals[visitor])
+        for _ in range(count):
+            zone_id, camera_id = zone_keys[zone_index[visit]]
+            dwell_time = float(dwell[visit])
+            entry_time = opening + timedelta(seconds=clock)
+            exit_time = entry_time + timedelta(seconds=dwell_time)
+            is_valid = dwell_time >= minimum_dwell_threshold
+            events.append(ZoneEvent(zone_id, camera_id, person_id, ENTRY, entry_time))
+            events.append(ZoneEvent(zone_id, camera_id, person_id, EXIT, exit_time, dwell_time, is_valid,
+                                    None if is_valid else "below_minimum_dwell"))
+            clock += dwell_time + float(walk[visit])
+            visit += 1
+    return events
+
+
+def load_events(connection, event_store, stores=1, cameras=2, zones_per_camera=4, days=7, visitors=1000,
+                visits_per_visitor=3.0, dwell_median=40.0, dwell_sigma=1.0, minimum_dwell_threshold=5,
+                start_day=datetime(2024, 1, 1), seed=0):
+    """Register stores and write their events; returns [(store_id, events written)]"""
+    rng = np.random.default_rng(seed)
+    loaded = []
+    for s in range(stores):
+        store_id, zones = register_store(connection, f"Synthetic store {s + 1}", cameras, zones_per_camera,
+                                         minimum_dwell_threshold)
+        writer = event_store.writer(store_id, f"synthetic-{s}")
+        for d in range(days):
+            day = start_day + timedelta(days=d)
+            events = day_events(rng, store_id, zones, day, visitors, visits_per_visitor, dwell_median,
+                                dwell_sigma, minimum_dwell_threshold)
+            for start in range(0, len(events), CHUNK_SIZE):
+                writer.write(events[start:start + CHUNK_SIZE])
+        writer.flush()
+        loaded.append((store_id, writer.watermark))
+    return loaded
+
+
+def visitors_for(events, stores, days, visits_per_visitor):
+    """Visitors per store-day that produce about `events` events in total"""
+    return max(1, round(events / (stores * days * max(visits_per_visitor, 1.0) * 2)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stores', type=int, default=1)
+    parser.add_argument('--cameras', type=int, default=2, help="Cameras per store")
+    parser.add_argument('--zones-per-camera', type=int, default=4)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--visitors', type=int, default=1000, help="Visitors per store and day")
+    parser.add_argument('--visits-per-visitor', type=float, default=3.0)
+    parser.add_argument('--dwell-median', type=float, default=40.0, help="Median dwell in seconds")
+    parser.add_argument('--dwell-sigma', type=float, default=1.0, help="Log-normal sigma of dwell times")
+    parser.add_argument('--event-storage', choices=['documents', 'buckets'], default=settings.event_storage)
+    parser.add_argument('--database', default=f"{settings.database_name}_benchmark")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    settings.database_name = args.database
+    from src.database import connection
+    from src.database.event_store import get_event_store
+
+    started = time.perf_counter()
+    loaded = load_events(
+        connection, get_event_store(args.event_storage), args.stores, args.cameras, args.zones_per_camera,
+        args.days, args.visitors, args.visits_per_visitor, args.dwell_median, args.dwell_sigma, seed=args.seed
+    )
+    elapsed = time.perf_counter() - started
+    total = sum(count for _, count in loaded)
+    print(f"Loaded {total} events for stores {[store_id for store_id, _ in loaded]} "
+          f"into {args.database} in {elapsed:.1f}s ({total / elapsed:,.0f} events/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Insert throughput, storage size and read time of the zone event layouts.
+
+Writes the same synthetic entry/exit stream through the per-event
+(`documents`) and per-zone-minute (`buckets`) event stores into a scratch
+database on the configured MongoDB server, then reports storage and index
+sizes and the time of the hourly-heatmap read.
+
+    python -m benchmarks.event_storage --events 1000000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from pymongo import MongoClient
+
+from src.config.settings import settings
+from src.core.events import ZoneEvent, ENTRY, EXIT
+from src.database.event_store import DocumentEventStore, BucketEventStore
+
+# Mirrors the indexes created by init_db for each layout
+INDEXES = {
+    'documents': [
+        ([('store_id', 1), ('timestamp', 1)], {}),
+        ([('zone_id', 1)], {}),
+        ([('person_id', 1)], {}),
+        ([('event_key', 1)], {'unique': True, 'sparse': True}),
+        ([('run_id', 1), ('seq', 1)], {})
+    ],
+    'buckets': [
+        ([('store_id', 1), ('minute', 1)], {}),
+        ([('zone_id', 1), ('minute', 1)], {})
+    ]
+}
+
+
+def generate_events(count, cameras, zones_per_camera, events_per_minute, seed):
+    """Alternating entry/exit pairs spread over the cameras' zones at a steady rate"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 1, 1, 9, 0)
+    pairs = count // 2
+    zone_index = rng.integers(0, cameras * zones_per_camera, size=pairs)
+    offsets = np.sort(rng.uniform(0, pairs * 2 / events_per_minute * 60, size=pairs))
+    dwell = rng.exponential(20.0, size=pairs)
+
+    events = []
+    for i in range(pairs):
+        camera_id = f"camera-{zone_index[i] // zones_per_camera}"
+        zone_id = f"zone-{zone_index[i]}"
+        person_id = f"P_{i % 5000}"
+        entry_time = start + timedelta(seconds=float(offsets[i]))
+        exit_time = entry_time + timedelta(seconds=float(dwell[i]))
+        is_valid = dwell[i] >= 5
+        events.append(ZoneEvent(zone_id, camera_id, person_id, ENTRY, entry_time))
+        events.append(ZoneEvent(zone_id, camera_id, person_id, EXIT, exit_time, float(dwell[i]), bool(is_valid),
+                                None if is_valid else "below_minimum_dwell"))
+    return events
+
+
+def storage_stats(collection):
+    stats = next(collection.aggregate([{'$collStats': {'storageStats': {}}}]))['storageStats']
+    return {
+        'documents': stats['count'],
+        'data_bytes': stats['size'],
+        'storage_bytes': stats['storageSize'],
+        'index_bytes': stats['totalIndexSize']
+    }
+
+
+def run_layout(store, events, store_id, batch_size):
+    store.collection.drop()
+    for keys, options in INDEXES[store.layout]:
+        store.collection.create_index(keys, **options)
+
+    writer = store.writer(store_id, 'benchmark-run')
+    writer.batch_size = batch_size
+    started = time.perf_counter()
+    # Feed events in batch-sized chunks, as the processing loop does
+    for start in range(0, len(events), batch_size):
+        writer.write(events[start:start + batch_size])
+    writer.flush()
+    insert_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    exits = store.find(
+        {'store_id': store_id, 'event_type': 'exit', 'is_valid_visit': True},
+        ('zone_id', 'person_id', 'timestamp', 'dwell_time')
+    )
+    read_seconds = time.perf_counter() - started
+
+    return dict(
+        layout=store.layout,
+        events=len(events),
+        insert_seconds=round(insert_seconds, 3),
+        events_per_second=round(len(events) / insert_seconds),
+        hourly_read_seconds=round(read_seconds, 3),
+        valid_exits_read=len(exits),
+        **storage_stats(store.collection)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200000)
+    parser.add_argument('--cameras', type=int, default=4)
+    parser.add_argument('--zones-per-camera', type=int, default=5)
+    parser.add_argument('--events-per-minute', type=float, default=600.0)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--database', default=f"{settings.database_name}_benchmark")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    client = MongoClient(settings.mongodb_url)
+    db = client[args.database]
+    events = generate_events(args.events, args.cameras, args.zones_per_camera, args.events_per_minute, args.seed)
+
+    results = []
+    for store in (DocumentEventStore(db.zone_events), BucketEventStore(db.zone_event_buckets)):
+        results.append(run_layout(store, events, 'benchmark-store', args.batch_size))
+    client.drop_database(args.database)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'layout':>10} {'docs':>9} {'events/s':>10} {'data MB':>9} {'storage MB':>11} "
+          f"{'index MB':>9} {'read s':>8}")
+    for r in results:
+        print(f"{r['layout']:>10} {r['documents']:>9} {r['events_per_second']:>10} "
+              f"{r['data_bytes'] / 1e6:>9.1f} {r['storage_bytes'] / 1e6:>11.1f} "
+              f"{r['index_bytes'] / 1e6:>9.1f} {r['hourly_read_seconds']:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
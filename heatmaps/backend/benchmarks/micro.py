@@ -0,0 +1,185 @@
+"""Micro-benchmarks of the per-detection hot paths.
+
+- point_in_polygon: one foot point against polygons of increasing vertex count
+  (and points_in_polygon on the same points, for comparison)
+- OpenVINOReID.match_person: re-sightings of known people against galleries
+  of 1k-100k identities (no model inference, embeddings are synthetic)
+- ZoneManager.check_zones: one frame's sightings of every person with
+  thousands of visits active
+
+    python -m benchmarks.micro --json
+    python -m benchmarks.micro --only reid --gallery-sizes 1000 100000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+import numpy as np
+
+from src.utils.geometry import point_in_polygon, points_in_polygon
+from src.reid.openvino_reid import OpenVINOReID
+from src.core.zone_manager import ZoneManager
+from .synthetic_video import make_zones
+
+
+def percentiles(seconds):
+    seconds = np.asarray(seconds)
+    return {
+        'p50_us': round(float(np.percentile(seconds, 50)) * 1e6, 3),
+        'p95_us': round(float(np.percentile(seconds, 95)) * 1e6, 3),
+        'p99_us': round(float(np.percentile(seconds, 99)) * 1e6, 3),
+        'calls_per_second': round(len(seconds) / float(seconds.sum()), 1)
+    }
+
+
+def regular_polygon(vertices, radius=300.0, centre=(640.0, 360.0)):
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    return [[centre[0] + radius * np.cos(a), centre[1] + radius * np.sin(a)] for a in angles]
+
+
+def bench_point_in_polygon(vertex_counts, points, rng):
+    results = []
+    coordinates = rng.uniform([0, 0], [1280, 720], size=(points, 2))
+    point_list = [tuple(p) for p in coordinates.tolist()]
+    for vertices in vertex_counts:
+        polygon = regular_polygon(vertices)
+        seconds = []
+        for point in point_list:
+            started = time.perf_counter()
+            point_in_polygon(point, polygon)
+            seconds.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        points_in_polygon(coordinates, polygon)
+        vectorised = time.perf_counter() - started
+
+        results.append(dict(
+            benchmark='point_in_polygon',
+            vertices=vertices,
+            calls=points,
+            vectorised_us_per_point=round(vectorised / points * 1e6, 4),
+            **percentiles(seconds)
+        ))
+    return results
+
+
+def bench_match_person(reid_model, gallery_sizes, queries, dim, noise, embedding_dtype, rng):
+    results = []
+    now = datetime(2024, 1, 1, 12, 0)
+    for size in gallery_sizes:
+        reid = OpenVINOReID(reid_model, max_persons=size * 2, person_timeout_seconds=24 * 3600,
+                            embedding_dtype=embedding_dtype)
+        identities = rng.standard_normal((size, dim)).astype(np.float32)
+        identities /= np.linalg.norm(identities, axis=1, keepdims=True)
+        for i, embedding in enumerate(identities):
+            person_id = f"P_{i + 1}"
+            reid.person_database[person_id] = embedding
+            reid.person_last_seen[person_id] = now
+        reid.next_person_id = size + 1
+
+        targets = rng.integers(0, size, size=queries)
+        sightings = identities[targets] + noise * rng.standard_normal((queries, dim)).astype(np.float32) / np.sqrt(dim)
+        sightings /= np.linalg.norm(sightings, axis=1, keepdims=True)
+
+        seconds = []
+        matched = 0
+        for i, (target, features) in enumerate(zip(targets, sightings)):
+            started = time.perf_counter()
+            person_id = reid.match_person(features, now + timedelta(seconds=i))
+            seconds.append(time.perf_counter() - started)
+            matched += person_id == f"P_{target + 1}"
+
+        results.append(dict(
+            benchmark='match_person',
+            gallery_size=size,
+            embedding_dtype=embedding_dtype,
+            calls=queries,
+            matched_ratio=round(matched / queries, 4),
+            **percentiles(seconds)
+        ))
+    return results
+
+
+def bench_check_zones(visit_counts, frames, rng):
+    results = []
+    zones = make_zones(1280, 720, rows=3, cols=4)
+    for i, zone in enumerate(zones):
+        zone.update(_id=f"zone-{i}", camera_id='benchmark-camera')
+    start = datetime(2024, 1, 1, 12, 0)
+
+    for visits in visit_counts:
+        zone_manager = ZoneManager(zones)
+        # Feet spread over the zoned floor; everyone starts inside a zone
+        feet = rng.uniform([0, 720 * 0.3], [1280, 720], size=(visits, 2))
+        person_ids = [f"P_{i}" for i in range(visits)]
+        for person_id, (x, y) in zip(person_ids, feet):
+            zone_manager.check_zones(person_id, [x - 20, y - 100, x + 20, y], start)
+
+        seconds = []
+        frame_seconds = []
+        events = 0
+        for frame in range(1, frames + 1):
+            timestamp = start + timedelta(seconds=frame * 0.2)
+            feet += rng.normal(0, 4.0, size=feet.shape)  # Small steps, occasionally across a zone edge
+            frame_started = time.perf_counter()
+            for person_id, (x, y) in zip(person_ids, feet.tolist()):
+                started = time.perf_counter()
+                events += len(zone_manager.check_zones(person_id, [x - 20, y - 100, x + 20, y], timestamp))
+                seconds.append(time.perf_counter() - started)
+            frame_seconds.append(time.perf_counter() - frame_started)
+
+        results.append(dict(
+            benchmark='check_zones',
+            active_visits=visits,
+            zones=len(zones),
+            calls=len(seconds),
+            events=events,
+            ms_per_frame=round(float(np.mean(frame_seconds)) * 1000, 3),
+            **percentiles(seconds)
+        ))
+    return results
+
+
+def print_table(results):
+    for r in results:
+        detail = {k: v for k, v in r.items() if k not in ('benchmark', 'p50_us', 'p95_us', 'p99_us', 'calls_per_second')}
+        print(f"{r['benchmark']:>17} p50 {r['p50_us']:>10.2f}us  p95 {r['p95_us']:>10.2f}us  "
+              f"p99 {r['p99_us']:>10.2f}us  {r['calls_per_second']:>12,.0f}/s  {detail}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', choices=['polygon', 'reid', 'zones'], nargs='+',
+                        default=['polygon', 'reid', 'zones'])
+    parser.add_argument('--vertices', type=int, nargs='+', default=[4, 16, 64])
+    parser.add_argument('--points', type=int, default=20000)
+    parser.add_argument('--reid-model', default='models/person-reidentification-retail-0287.xml')
+    parser.add_argument('--gallery-sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--dim', type=int, default=256)
+    parser.add_argument('--noise', type=float, default=0.5, help="Norm of the noise added to a re-sighting")
+    parser.add_argument('--embedding-dtype', default='float32')
+    parser.add_argument('--active-visits', type=int, nargs='+', default=[1000, 5000, 10000])
+    parser.add_argument('--frames', type=int, default=5, help="Frames of sightings per active-visit count")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    if 'polygon' in args.only:
+        results += bench_point_in_polygon(args.vertices, args.points, rng)
+    if 'reid' in args.only:
+        results += bench_match_person(args.reid_model, args.gallery_sizes, args.queries, args.dim,
+                                      args.noise, args.embedding_dtype, rng)
+    if 'zones' in args.only:
+        results += bench_check_zones(args.active_visits, args.frames, rng)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""End-to-end VideoProcessor throughput on synthetic footage.
+
+Generates a deterministic video (see benchmarks.synthetic_video), registers
+a store, camera and grid of zones in a scratch database and runs the full
+processing job on it. Every stage (decode, detection, Re-ID, zone checks,
+event inserts, aggregation) is timed per call, and the run is reported as
+frames/s, events/s and per-stage throughput with latency percentiles.
+
+    python -m benchmarks.pipeline --seconds 60 --persons 20 --json > pipeline.json
+    python -m benchmarks.pipeline --in-memory --detector sprites
+
+`--in-memory` runs against mongomock instead of the configured MongoDB
+server (install it separately); `--detector sprites` replaces the person
+detection model with a background-difference detector, so the stages after
+inference see every sprite regardless of how the model scores them.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+import pymongo
+
+from src.config.settings import settings
+from .synthetic_video import generate_video, make_zones, SpriteDetector
+
+
+class StageTimer:
+    """Collects per-call durations of wrapped functions, grouped by stage"""
+
+    def __init__(self):
+        self.durations = {}
+
+    def wrap(self, stage, func):
+        durations = self.durations.setdefault(stage, [])
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                durations.append(time.perf_counter() - started)
+        return timed
+
+    def summary(self, wall_seconds):
+        stages = {}
+        for stage, durations in self.durations.items():
+            if not durations:
+                continue
+            seconds = np.array(durations)
+            total = float(seconds.sum())
+            stages[stage] = {
+                'calls': len(durations),
+                'total_seconds': round(total, 4),
+                'share_of_wall': round(total / wall_seconds, 4),
+                'calls_per_second': round(len(durations) / total, 1) if total else None,
+                'p50_ms': round(float(np.percentile(seconds, 50)) * 1000, 4),
+                'p95_ms': round(float(np.percentile(seconds, 95)) * 1000, 4),
+                'p99_ms': round(float(np.percentile(seconds, 99)) * 1000, 4),
+                'max_ms': round(float(seconds.max()) * 1000, 4)
+            }
+        return stages
+
+
+def patch(owner, name, wrapper, patched):
+    """Replace owner.name with wrapper(original), remembering the original for restore()"""
+    original = getattr(owner, name)
+    patched.append((owner, name, original))
+    setattr(owner, name, wrapper(original))
+
+
+def restore(patched):
+    for owner, name, original in reversed(patched):
+        setattr(owner, name, original)
+
+
+def run(args, video):
+    # Imported here so --in-memory and --database apply to the module-level clients
+    from src.database import connection
+    from src.video.processor import VideoProcessor
+    from src.video.frame_reader import FrameReader
+    from src.core.zone_manager import ZoneManager
+    from src.core.heatmap_generator import HeatmapGenerator
+    from src.core.insights_generator import InsightsGenerator
+    from src.database.event_writer import EventWriter
+
+    store_id = str(connection.sync_stores.insert_one({'name': 'Benchmark store'}).inserted_id)
+    camera = {
+        'store_id': store_id,
+        'camera_identifier': 'benchmark-camera',
+        'name': 'Benchmark camera',
+        'video_source': video['path'],
+        'resolution_width': video['width'],
+        'resolution_height': video['height'],
+        'fps': video['fps'],
+        'status': 'active'
+    }
+    camera['_id'] = connection.sync_cameras.insert_one(camera).inserted_id
+    zones = make_zones(video['width'], video['height'], args.zone_rows, args.zone_cols)
+    for zone in zones:
+        zone.update(camera_id=str(camera['_id']), zone_type='area')
+    connection.sync_zones.insert_many(zones)
+
+    processor = VideoProcessor(
+        args.detector_model, args.reid_model, store_id,
+        analysis_fps=args.analysis_fps, video_segments=1, checkpoint_interval_seconds=0,
+        detection_cache_dir="", reid_gallery_dir=""
+    )
+    if args.detector == 'sprites':
+        sprites = SpriteDetector()
+        processor.detector.detect = sprites.detect
+        processor.detector.detect_regions = sprites.detect_regions
+
+    timer = StageTimer()
+    patched = []
+    patch(FrameReader, 'read', lambda f: timer.wrap('decode', f), patched)
+    patch(processor.detector, 'detect', lambda f: timer.wrap('detect', f), patched)
+    patch(processor.detector, 'detect_regions', lambda f: timer.wrap('detect', f), patched)
+    patch(processor.reid, 'identify_persons', lambda f: timer.wrap('reid', f), patched)
+    patch(ZoneManager, 'check_zones', lambda f: timer.wrap('zones', f), patched)
+    patch(EventWriter, 'insert', lambda f: timer.wrap('event_insert', f), patched)
+    patch(HeatmapGenerator, 'generate_hourly_heatmaps', lambda f: timer.wrap('hourly_heatmaps', f), patched)
+    patch(HeatmapGenerator, 'generate_daily_heatmaps', lambda f: timer.wrap('daily_heatmaps', f), patched)
+    patch(InsightsGenerator, 'generate_daily_insights', lambda f: timer.wrap('insights', f), patched)
+
+    try:
+        started = time.perf_counter()
+        result = processor.process_all_and_generate_insights([camera])
+        wall_seconds = time.perf_counter() - started
+    finally:
+        restore(patched)
+
+    stats = result['camera_stats'][str(camera['_id'])]
+    events = len(processor.event_store.find({'store_id': store_id}, ('event_type',)))
+    processing_seconds = wall_seconds - sum(
+        sum(timer.durations.get(stage, ())) for stage in ('hourly_heatmaps', 'daily_heatmaps', 'insights')
+    )
+    return {
+        'benchmark': 'pipeline',
+        'video': video,
+        'config': {
+            'detector': args.detector,
+            'analysis_fps': args.analysis_fps,
+            'event_storage': settings.event_storage,
+            'zones': len(zones),
+            'database': 'mongomock' if args.in_memory else settings.mongodb_url
+        },
+        'wall_seconds': round(wall_seconds, 3),
+        'processing_seconds': round(processing_seconds, 3),
+        'frames_analysed': stats['frames_analysed'],
+        'frames_inferred': stats['frames_inferred'],
+        'frames_per_second': round(stats['frames_analysed'] / processing_seconds, 2),
+        'events': events,
+        'events_per_second': round(events / processing_seconds, 2),
+        'stages': timer.summary(wall_seconds)
+    }
+
+
+def print_table(result):
+    print(f"{result['frames_analysed']} frames in {result['processing_seconds']}s "
+          f"({result['frames_per_second']} frames/s), {result['events']} events "
+          f"({result['events_per_second']} events/s), {result['wall_seconds']}s with aggregation")
+    header = f"{'stage':>16} {'calls':>8} {'total s':>9} {'share':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for stage, s in result['stages'].items():
+        print(f"{stage:>16} {s['calls']:>8} {s['total_seconds']:>9.3f} {s['share_of_wall']:>7.1%} "
+              f"{s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} {s['p99_ms']:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--fps', type=int, default=25)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--persons', type=int, default=10, help="People on screen at a time")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--zone-rows', type=int, default=2)
+    parser.add_argument('--zone-cols', type=int, default=3)
+    parser.add_argument('--video', help="Reuse this video (generated there first if missing)")
+    parser.add_argument('--detector', choices=['model', 'sprites'], default='model')
+    parser.add_argument('--detector-model', default='models/person-detection-retail-0013.xml')
+    parser.add_argument('--reid-model', default='models/person-reidentification-retail-0287.xml')
+    parser.add_argument('--analysis-fps', type=float, default=settings.analysis_fps)
+    parser.add_argument('--event-storage', choices=['documents', 'buckets'], default=settings.event_storage)
+    parser.add_argument('--in-memory', action='store_true', help="Use mongomock instead of a MongoDB server")
+    parser.add_argument('--database', default=f"{settings.database_name}_benchmark")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    parser.add_argument('--output', help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    if args.in_memory:
+        try:
+            import mongomock
+        except ImportError:
+            parser.error("--in-memory needs mongomock (pip install mongomock)")
+        pymongo.MongoClient = mongomock.MongoClient
+    settings.database_name = args.database
+    settings.event_storage = args.event_storage
+
+    video_path = args.video or os.path.join(tempfile.mkdtemp(), 'benchmark.avi')
+    if os.path.exists(video_path):
+        cap = cv2.VideoCapture(video_path)
+        video = {
+            'path': video_path,
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'fps': cap.get(cv2.CAP_PROP_FPS),
+            'frames': int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        }
+        cap.release()
+    else:
+        video = generate_video(video_path, args.seconds, args.fps, args.width, args.height, args.persons, args.seed)
+
+    # Keep the processor's progress output out of the JSON
+    log = sys.stderr if args.json else sys.stdout
+    try:
+        with contextlib.redirect_stdout(log):
+            result = run(args, video)
+    finally:
+        from src.database import connection
+        connection.sync_client.drop_database(args.database)
+        if not args.video:
+            os.remove(video_path)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_table(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Memory, speed and match accuracy of the Re-ID gallery storage dtypes.
+
+Builds galleries of synthetic identities (random unit vectors, like the
+256-d Re-ID output), then matches noisy re-sightings of known identities
+against each storage dtype and compares with the float32 result.
+
+    python -m benchmarks.reid_quantization --sizes 1000 10000 100000 --queries 200
+"""
+import argparse
+import json
+import time
+import numpy as np
+
+from src.reid.gallery import EmbeddingGallery, SUPPORTED_DTYPES
+
+
+def make_identities(count, dim, rng):
+    identities = rng.standard_normal((count, dim)).astype(np.float32)
+    identities /= np.linalg.norm(identities, axis=1, keepdims=True)
+    return identities
+
+
+def make_queries(identities, count, noise, rng):
+    """Re-sightings of random known identities with additive noise"""
+    targets = rng.integers(0, len(identities), size=count)
+    queries = identities[targets] + noise * rng.standard_normal((count, identities.shape[1])).astype(np.float32) / np.sqrt(identities.shape[1])
+    return targets, queries
+
+
+def run(sizes, dim, query_count, noise, seed):
+    rng = np.random.default_rng(seed)
+    results = []
+    for size in sizes:
+        identities = make_identities(size, dim, rng)
+        targets, queries = make_queries(identities, query_count, noise, rng)
+        reference = None
+
+        for dtype in SUPPORTED_DTYPES:
+            gallery = EmbeddingGallery(dtype)
+            started = time.perf_counter()
+            for person_id, embedding in enumerate(identities):
+                gallery[person_id] = embedding
+            build_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            matches = [gallery.best_match(query) for query in queries]
+            match_seconds = time.perf_counter() - started
+
+            matched_ids = np.array([person_id for person_id, _ in matches])
+            similarities = np.array([similarity for _, similarity in matches])
+            if reference is None:
+                reference = (matched_ids, similarities)
+
+            results.append({
+                'gallery_size': size,
+                'dtype': dtype,
+                'memory_bytes': gallery.nbytes(),
+                'build_seconds': round(build_seconds, 3),
+                'match_ms_per_query': round(match_seconds / query_count * 1000, 3),
+                'top1_accuracy': float(np.mean(matched_ids == targets)),
+                'agreement_with_float32': float(np.mean(matched_ids == reference[0])),
+                'max_similarity_error': float(np.max(np.abs(similarities - reference[1])))
+            })
+    return results
+
+
+def print_table(results):
+    header = f"{'size':>8} {'dtype':>8} {'memory MB':>10} {'ms/query':>9} {'top-1':>7} {'agree':>7} {'max sim err':>12}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['gallery_size']:>8} {r['dtype']:>8} {r['memory_bytes'] / 1e6:>10.2f} "
+              f"{r['match_ms_per_query']:>9.3f} {r['top1_accuracy']:>7.3f} "
+              f"{r['agreement_with_float32']:>7.3f} {r['max_similarity_error']:>12.5f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--dim', type=int, default=256)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--noise', type=float, default=0.8, help="Norm of the noise added to a re-sighting")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.dim, args.queries, args.noise, args.seed)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Cold-start cost of the API and worker entry points.
+
+Each target is imported in a fresh interpreter, several times, and reported
+as import seconds (median and min), peak RSS, modules loaded and which heavy
+modules (cv2, OpenVINO, SciPy, a sync MongoDB client) came with it. `python`
+is the bare interpreter, as a floor for the others; `api+pipeline` is the
+API with the processing pipeline loaded as well, i.e. what every API worker
+paid before the pipeline was imported lazily.
+
+    python -m benchmarks.startup --repeat 10 --json
+    python -m benchmarks.startup --only api worker
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+TARGETS = {
+    'python': [],
+    'api': ['src.api.routes'],
+    'worker': ['src.worker'],
+    'api+pipeline': ['src.api.routes', 'src.video.processor'],
+}
+
+HEAVY_MODULES = ('cv2', 'openvino', 'scipy', 'numpy')
+
+# Runs in the child interpreter; prints one JSON line
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+for module in {modules!r}:
+    __import__(module)
+seconds = time.perf_counter() - started
+connection = sys.modules.get('src.database.connection')
+print(json.dumps({{
+    'seconds': seconds,
+    'maxrss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+    'heavy': [name for name in {heavy!r} if name in sys.modules],
+    'sync_client': connection is not None and 'sync_client' in vars(connection)
+}}))
+"""
+
+
+def measure(modules, repeat, cwd):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(modules=modules, heavy=HEAVY_MODULES)],
+            cwd=cwd, capture_output=True, text=True, check=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    seconds = [run['seconds'] for run in runs]
+    return {
+        'modules_imported': modules,
+        'import_seconds_median': round(statistics.median(seconds), 4),
+        'import_seconds_min': round(min(seconds), 4),
+        'maxrss_mb': round(max(run['maxrss_mb'] for run in runs), 1),
+        'modules_loaded': runs[-1]['modules'],
+        'heavy_modules': runs[-1]['heavy'],
+        'sync_mongo_client': runs[-1]['sync_client']
+    }
+
+
+def print_table(results):
+    header = f"{'target':>14} {'median s':>9} {'min s':>7} {'rss MB':>7} {'modules':>8}  heavy"
+    print(header)
+    print('-' * len(header))
+    for target, r in results.items():
+        heavy = ', '.join(r['heavy_modules'] + (['sync client'] if r['sync_mongo_client'] else [])) or '-'
+        print(f"{target:>14} {r['import_seconds_median']:>9.3f} {r['import_seconds_min']:>7.3f} "
+              f"{r['maxrss_mb']:>7.1f} {r['modules_loaded']:>8}  {heavy}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    # The backend directory, so `src` imports the same way as under python -m
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # A first run warms the OS file cache and writes .pyc files; it isn't reported
+    measure(TARGETS['api+pipeline'], 1, cwd)
+    results = {target: measure(TARGETS[target], args.repeat, cwd) for target in args.only}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+"""Deterministic synthetic store footage with moving person-like sprites.
+
+People walk between random waypoints on a flat floor, pause at each one
+(so zone visits pass the dwell threshold) and leave through an edge, to be
+replaced by a new arrival so the crowd density stays constant. The same
+seed always produces the same video. `make_zones` returns a grid of zones
+over the floor and `SpriteDetector` finds the sprites without a model, for
+benchmarking everything downstream of inference.
+
+    python -m benchmarks.synthetic_video out.avi --seconds 60 --persons 20
+"""
+import argparse
+import cv2
+import numpy as np
+
+BACKGROUND = 90  # Flat grey floor
+
+
+class Walker:
+    """One sprite: walks to `waypoints` in turn, pausing at each, then leaves the frame"""
+
+    def __init__(self, rng, width, height, fps, size):
+        self.size = size
+        self.speed = rng.uniform(0.08, 0.16) * width / fps  # pixels per frame
+        self.colour = tuple(int(c) for c in rng.choice([20, 200, 240], size=3))
+        self.head = tuple(int(c) for c in rng.integers(150, 220, size=3))
+        waypoints = [
+            (rng.uniform(size, width - size), rng.uniform(height * 0.3 + size, height - 10))
+            for _ in range(rng.integers(2, 5))
+        ]
+        edge = rng.integers(0, 2)
+        enter_x = -size if edge == 0 else width + size
+        exit_x = width + size if edge == 0 else -size
+        self.position = np.array([enter_x, waypoints[0][1]], dtype=np.float64)
+        self.targets = [np.array(w) for w in waypoints] + [np.array([exit_x, waypoints[-1][1]])]
+        self.pauses = [int(rng.exponential(8.0) * fps) + fps for _ in waypoints] + [0]
+        self.pause_left = 0
+        self.done = False
+
+    def step(self):
+        if self.pause_left:
+            self.pause_left -= 1
+            return
+        target = self.targets[0]
+        delta = target - self.position
+        distance = np.hypot(*delta)
+        if distance <= self.speed:
+            self.position = target.astype(np.float64)
+            self.targets.pop(0)
+            self.pause_left = self.pauses.pop(0)
+            self.done = not self.targets
+        else:
+            self.position += delta / distance * self.speed
+
+    def bbox(self):
+        """[x_min, y_min, x_max, y_max] with the feet at the walker's position"""
+        x, y = self.position
+        width = self.size * 0.4
+        return [int(x - width / 2), int(y - self.size), int(x + width / 2), int(y)]
+
+    def draw(self, frame):
+        x_min, y_min, x_max, y_max = self.bbox()
+        head_radius = int((x_max - x_min) * 0.35)
+        body_top = y_min + 2 * head_radius
+        legs_top = body_top + int((y_max - body_top) * 0.55)
+        cv2.circle(frame, ((x_min + x_max) // 2, y_min + head_radius), head_radius, self.head, -1)
+        cv2.rectangle(frame, (x_min, body_top), (x_max, legs_top), self.colour, -1)
+        leg_width = (x_max - x_min) // 3
+        cv2.rectangle(frame, (x_min + 2, legs_top), (x_min + 2 + leg_width, y_max), (40, 40, 60), -1)
+        cv2.rectangle(frame, (x_max - 2 - leg_width, legs_top), (x_max - 2, y_max), (40, 40, 60), -1)
+
+
+def generate_video(path, seconds=60, fps=25, width=1280, height=720, persons=10, seed=0):
+    """Write a video with about `persons` people on screen at a time; returns its metadata"""
+    rng = np.random.default_rng(seed)
+    size = height // 6
+    walkers = [Walker(rng, width, height, fps, size) for _ in range(persons)]
+    # Stagger the first walkers along their routes so the scene starts populated
+    for walker in walkers:
+        for _ in range(rng.integers(0, fps * 10)):
+            walker.step()
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open {path} for writing")
+
+    frames = int(seconds * fps)
+    spawned = persons
+    sprites = 0
+    for _ in range(frames):
+        frame = np.full((height, width, 3), BACKGROUND, dtype=np.uint8)
+        # Draw far (top) walkers first so nearer ones overlap them
+        for walker in sorted(walkers, key=lambda w: w.position[1]):
+            walker.draw(frame)
+        writer.write(frame)
+        sprites += len(walkers)
+
+        for i, walker in enumerate(walkers):
+            walker.step()
+            if walker.done:
+                walkers[i] = Walker(rng, width, height, fps, size)
+                spawned += 1
+    writer.release()
+
+    return {
+        'path': path,
+        'seconds': seconds,
+        'fps': fps,
+        'width': width,
+        'height': height,
+        'frames': frames,
+        'persons_on_screen': persons,
+        'persons_total': spawned,
+        'sprites_drawn': sprites,
+        'seed': seed
+    }
+
+
+def make_zones(width, height, rows=2, cols=3, minimum_dwell_threshold=3):
+    """Grid of rectangular zones over the floor (the lower 70% of the frame)"""
+    top = height * 0.3
+    cell_w = width / cols
+    cell_h = (height - top) / rows
+    zones = []
+    for row in range(rows):
+        for col in range(cols):
+            x0, y0 = col * cell_w, top + row * cell_h
+            zones.append({
+                'name': f"Zone {row * cols + col + 1}",
+                'zone_identifier': f"zone-{row}-{col}",
+                'polygon': [[x0, y0], [x0 + cell_w, y0], [x0 + cell_w, y0 + cell_h], [x0, y0 + cell_h]],
+                'minimum_dwell_threshold': minimum_dwell_threshold
+            })
+    return zones
+
+
+class SpriteDetector:
+    """Stand-in for OpenVINOPersonDetector that finds sprites by their difference from the floor"""
+
+    def __init__(self, min_area=200):
+        self.min_area = min_area
+
+    def detect(self, frame):
+        mask = (cv2.absdiff(frame, np.full_like(frame, BACKGROUND)).max(axis=2) > 25).astype(np.uint8)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        detections = []
+        for x, y, w, h, area in stats[1:count]:
+            if area >= self.min_area:
+                detections.append({'bbox': [int(x), int(y), int(x + w), int(y + h)], 'confidence': 1.0})
+        return detections
+
+    def detect_regions(self, frame, regions):
+        detections = []
+        for x_min, y_min, x_max, y_max in regions:
+            for detection in self.detect(frame[y_min:y_max, x_min:x_max]):
+                bx_min, by_min, bx_max, by_max = detection['bbox']
+                detection['bbox'] = [bx_min + x_min, by_min + y_min, bx_max + x_min, by_max + y_min]
+                detections.append(detection)
+        return detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--fps', type=int, default=25)
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--persons', type=int, default=10, help="People on screen at a time")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    meta = generate_video(args.path, args.seconds, args.fps, args.width, args.height, args.persons, args.seed)
+    print(f"Wrote {meta['frames']} frames with {meta['persons_total']} people to {meta['path']}")
+
+
+if __name__ == '__main__':
+    main()
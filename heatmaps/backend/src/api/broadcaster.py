@@ -0,0 +1,77 @@
+import asyncio
+
+
+class Broadcaster:
+    """In-process fan-out of per-store status messages to streaming clients.
+
+    Publishers (processing threads) call `publish` from any thread. Messages
+    for a store are coalesced so subscribers receive at most `max_rate` per
+    second, always the latest one; a slow subscriber skips intermediate
+    messages instead of queueing them.
+    """
+
+    def __init__(self, max_rate):
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.loop = None
+        self.subscribers = {}  # topic -> set of single-slot queues
+        self.latest = {}  # topic -> last published message, sent to new subscribers
+        self.pending = set()  # topics with a flush scheduled
+        self.last_sent = {}
+
+    def attach(self, loop):
+        """Bind to the event loop that serves the subscribers"""
+        self.loop = loop
+
+    def publish(self, topic, message):
+        """Publish a message for topic; safe to call from any thread"""
+        if self.loop is None:
+            self.latest[topic] = message
+            return
+        self.loop.call_soon_threadsafe(self._publish, topic, message)
+
+    def _publish(self, topic, message):
+        self.latest[topic] = message
+        if topic in self.pending:
+            return
+
+        self.pending.add(topic)
+        delay = self.last_sent.get(topic, float('-inf')) + self.min_interval - self.loop.time()
+        if delay > 0:
+            self.loop.call_later(delay, self._flush, topic)
+        else:
+            self._flush(topic)
+
+    def _flush(self, topic):
+        self.pending.discard(topic)
+        self.last_sent[topic] = self.loop.time()
+        message = self.latest[topic]
+        for queue in self.subscribers.get(topic, ()):
+            self._offer(queue, message)
+
+    @staticmethod
+    def _offer(queue, message):
+        if queue.full():
+            queue.get_nowait()  # Replace the undelivered message with the newer one
+        queue.put_nowait(message)
+
+    def subscriber_count(self, topic=None):
+        if topic is not None:
+            return len(self.subscribers.get(topic, ()))
+        return sum(len(queues) for queues in self.subscribers.values())
+
+    async def subscribe(self, topic, heartbeat_seconds=15.0):
+        """Yield the latest message for topic, then each update; yields None after `heartbeat_seconds` of silence"""
+        queue = asyncio.Queue(maxsize=1)
+        if topic in self.latest:
+            queue.put_nowait(self.latest[topic])
+        self.subscribers.setdefault(topic, set()).add(queue)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self.subscribers[topic].discard(queue)
+            if not self.subscribers[topic]:
+                del self.subscribers[topic]
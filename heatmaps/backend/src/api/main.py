@@ -1,13 +1,15 @@
 import uvicorn
 from dotenv import load_dotenv
-from .config.settings import settings
+from ..config.settings import settings
 
 load_dotenv()
 
 if __name__ == "__main__":
+    # By import path, so reload and each of the api_workers processes load the app themselves
     uvicorn.run(
-        "routes:app",
+        "src.api.routes:app",
         host="0.0.0.0",
         port=settings.port,
-        reload=True
-    )
\ No newline at end of file
+        reload=settings.api_reload,
+        workers=settings.api_workers
+    )
@@ -0,0 +1,185 @@
+import gzip
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from bson import ObjectId
+import orjson
+from fastapi.responses import Response
+from ..utils.metrics import registry
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+
+# Accept values mapped to the formats we serve; */* and no header get JSON
+MEDIA_TYPES = {'application/json': JSON, '*/*': JSON, 'application/*': JSON}
+if msgpack is not None:
+    MEDIA_TYPES.update({'application/msgpack': MSGPACK, 'application/x-msgpack': MSGPACK})
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+CACHE_LOOKUPS = registry.counter(
+    "heatmaps_response_cache_lookups_total", "Response cache lookups of store-scoped reads", ("result",)
+)
+
+
+def _default(obj):
+    """Types orjson and msgpack don't handle natively, as the API has always rendered them"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):  # msgpack only; orjson writes datetimes itself
+        return obj.isoformat()
+    if hasattr(obj, 'tolist'):  # NumPy arrays and scalars
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+
+def serialize(content, media_type=JSON):
+    if media_type == MSGPACK:
+        return msgpack.packb(content, default=_default, datetime=False)
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _preferences(header):
+    """(value, q) pairs of an Accept-style header, best first; ties keep the header's order"""
+    preferences = []
+    for position, part in enumerate((header or '').split(',')):
+        value, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            name, _, number = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        if value:
+            preferences.append((value.strip().lower(), q, position))
+    preferences.sort(key=lambda preference: (-preference[1], preference[2]))
+    return [(value, q) for value, q, _ in preferences]
+
+
+def negotiate_media_type(accept):
+    for value, q in _preferences(accept):
+        if q > 0 and value in MEDIA_TYPES:
+            return MEDIA_TYPES[value]
+    return JSON
+
+
+def negotiate_encoding(accept_encoding):
+    preferences = _preferences(accept_encoding)
+    refused = {value for value, q in preferences if q <= 0}
+    for value, q in preferences:
+        if q <= 0:
+            continue
+        if value in ENCODINGS:
+            return value
+        if value == '*':
+            return next((encoding for encoding in ENCODINGS if encoding not in refused), None)
+        if value == 'identity':
+            return None
+    return None
+
+
+class SerializedResponse:
+    """One payload serialized once per format and compressed once per encoding, on demand"""
+
+    def __init__(self, content, min_compress_bytes=1024):
+        self.content = content
+        self.min_compress_bytes = min_compress_bytes
+        self.bodies = {}  # (media type, encoding) -> bytes
+        self.lock = threading.RLock()
+
+    def body(self, media_type, encoding):
+        key = (media_type, encoding)
+        body = self.bodies.get(key)
+        if body is None:
+            with self.lock:
+                body = self.bodies.get(key)
+                if body is None:
+                    body = serialize(self.content, media_type) if encoding is None \
+                        else compress(self.body(media_type, None), encoding)
+                    self.bodies[key] = body
+        return body
+
+    def render(self, request, status_code=200):
+        """A Response in the format and encoding the request accepts"""
+        media_type = negotiate_media_type(request.headers.get('accept'))
+        encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+        body = self.body(media_type, None)
+        if encoding and len(body) >= self.min_compress_bytes:
+            body = self.body(media_type, encoding)
+        else:
+            encoding = None
+        headers = {'Vary': 'Accept, Accept-Encoding'}
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+class ResponseCache:
+    """Serialized responses of store-scoped reads, kept until the store's data changes.
+
+    Entries are dropped by `invalidate(store_id)` when a job rewrites the
+    store's rollups, and after `ttl_seconds` regardless, since another
+    process (a worker, another API process) may have rewritten them. A
+    response built from reads that started before an invalidation isn't
+    stored: pass `put` the `generation` taken before reading. At most
+    `max_entries` responses are kept, least recently used first out.
+    """
+
+    def __init__(self, ttl_seconds=300.0, max_entries=256, min_compress_bytes=1024):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.min_compress_bytes = min_compress_bytes
+        self.entries = OrderedDict()  # (store_id, key) -> (expires at, SerializedResponse)
+        self.generations = {}  # store_id -> invalidations so far
+        self.lock = threading.Lock()
+
+    def generation(self, store_id):
+        return self.generations.get(store_id, 0)
+
+    def get(self, store_id, key):
+        with self.lock:
+            entry = self.entries.get((store_id, key))
+            if entry is None or entry[0] < time.monotonic():
+                CACHE_LOOKUPS.inc(1, "miss")
+                return None
+            self.entries.move_to_end((store_id, key))
+            CACHE_LOOKUPS.inc(1, "hit")
+            return entry[1]
+
+    def put(self, store_id, key, content, generation):
+        response = SerializedResponse(content, self.min_compress_bytes)
+        if self.ttl <= 0:
+            return response
+        with self.lock:
+            if self.generation(store_id) != generation:
+                return response
+            self.entries[(store_id, key)] = (time.monotonic() + self.ttl, response)
+            self.entries.move_to_end((store_id, key))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return response
+
+    def invalidate(self, store_id):
+        with self.lock:
+            self.generations[store_id] = self.generation(store_id) + 1
+            for entry_key in [entry_key for entry_key in self.entries if entry_key[0] == store_id]:
+                del self.entries[entry_key]
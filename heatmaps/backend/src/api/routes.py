@@ -1,21 +1,29 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, FileResponse
 from typing import List
 import os
-import shutil
-from datetime import datetime
+import asyncio
+import threading
+import traceback
+from datetime import datetime, timedelta
 from bson import ObjectId
-from starlette.datastructures import UploadFile as StarletteUploadFile
 import json
 
 from ..database.connection import (
     init_db, stores_collection, cameras_collection, zones_collection,
     zone_events_collection, hourly_heatmaps_collection, 
-    daily_heatmaps_collection, daily_insights_collection, sync_cameras
+    daily_heatmaps_collection, daily_insights_collection, zone_transitions_collection,
+    hourly_occupancy_collection
 )
 from ..database.models import Store, Camera, Zone
-from ..video.processor import VideoProcessor
+from ..utils.metrics import registry, STAGE_SECONDS, stage_summary
+from ..utils.profiling import JobProfiler, ProfileStore, PROFILE_MODES
 from ..config.settings import settings
+from .broadcaster import Broadcaster
+from .scheduler import Job, JobScheduler, PRIORITIES
+from .uploads import ResumableUploads, UploadOffsetError, copy_upload, probe_video
+from .responses import SerializedResponse, ResponseCache
 
 app = FastAPI(title="Retail Heatmap API")
 
@@ -29,25 +37,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add file size limit configuration
-
-StarletteUploadFile.spool_max_size = 1024 * 1024 * 500 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:5173"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+uploads = ResumableUploads(UPLOAD_DIR, settings.upload_chunk_size, settings.upload_partial_max_age_hours)
 
 processing_status = {}
 
+# Serialized dashboard reads, dropped when a store's rollups are rewritten
+response_cache = ResponseCache(settings.response_cache_seconds, settings.response_cache_max_entries,
+                               settings.response_compression_min_bytes)
+
+def respond(request: Request, content):
+    """Serialize content (ObjectIds and datetimes included) in the format and encoding the request accepts."""
+    return SerializedResponse(content, settings.response_compression_min_bytes).render(request)
+
+async def cached_response(request: Request, store_id: str, build):
+    """Serve a store-scoped read from the response cache, awaiting `build()` for the content on a miss.
+    
+    Live streams keep rewriting their store's rollups, so those stores aren't cached while one runs.
+    """
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    response = response_cache.get(store_id, key)
+    if response is None:
+        generation = response_cache.generation(store_id)
+        content = await build()
+        if any(worker["store_id"] == store_id and worker["thread"].is_alive() for worker in stream_workers.values()):
+            return respond(request, content)
+        response = response_cache.put(store_id, key, content, generation)
+    return response.render(request)
+
+# Pushes processing_status changes to /live subscribers
+live_updates = Broadcaster(settings.live_updates_max_rate)
+
+def publish_status(store_id: str):
+    """Send the store's current processing status to live subscribers."""
+    live_updates.publish(store_id, json.dumps(processing_status[store_id], default=str))
+
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    live_updates.attach(asyncio.get_running_loop())
     print("Database initialized")
 
 # ==================== Store Endpoints ====================
@@ -66,13 +95,9 @@ async def create_store(name: str = Form(...), location: str = Form(None)):
     }
 
 @app.get("/api/stores")
-async def list_stores():
+async def list_stores(request: Request):
     """List all stores."""
-    stores = []
-    async for store in stores_collection.find():
-        store['_id'] = str(store['_id'])
-        stores.append(store)
-    return {"stores": stores}
+    return respond(request, {"stores": await stores_collection.find().to_list(None)})
 
 @app.get("/api/stores/{store_id}")
 async def get_store(store_id: str):
@@ -86,39 +111,41 @@ async def get_store(store_id: str):
 
 # ==================== Camera Endpoints ====================
 
-@app.post("/api/stores/{store_id}/cameras")
-async def upload_camera_video(
-    store_id: str,
-    camera_identifier: str = Form(...),
-    name: str = Form(...),
-    video: UploadFile = File(...)
-):
-    """Upload a video for a camera."""
-    store = await stores_collection.find_one({"_id": ObjectId(store_id)})
-    if not store:
-        raise HTTPException(status_code=404, detail="Store not found")
+async def create_camera_from_upload(store_id: str, camera_identifier: str, name: str,
+                                    filename: str, upload_path: str, content_hash: str):
+    """Move a received video into place and register its camera.
     
-    video_filename = f"{store_id}_{camera_identifier}_{video.filename}"
-    video_path = os.path.join(UPLOAD_DIR, video_filename)
+    A video already uploaded (same SHA-256) keeps its one file: the new camera
+    points at it and the upload is dropped. Probing runs in a worker thread.
+    """
+    duplicate = await cameras_collection.find_one({"content_hash": content_hash})
+    if duplicate and os.path.exists(duplicate["video_source"]):
+        await asyncio.to_thread(os.remove, upload_path)
+        video_path = duplicate["video_source"]
+        print(f"Upload {filename} is identical to {video_path}, reusing it")
+    else:
+        duplicate = None
+        video_filename = f"{store_id}_{camera_identifier}_{os.path.basename(filename)}"
+        video_path = os.path.join(UPLOAD_DIR, video_filename)
+        await asyncio.to_thread(os.replace, upload_path, video_path)
     
-    with open(video_path, "wb") as buffer:
-        shutil.copyfileobj(video.file, buffer)
-    
-    import cv2
-    cap = cv2.VideoCapture(video_path)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    cap.release()
+    try:
+        video = await asyncio.to_thread(probe_video, video_path)
+    except ValueError as e:
+        if not duplicate:
+            os.remove(video_path)
+        raise HTTPException(status_code=400, detail=str(e))
     
     camera = Camera(
         store_id=store_id,
         camera_identifier=camera_identifier,
         name=name,
         video_source=video_path,
-        resolution_width=width,
-        resolution_height=height,
-        fps=fps
+        resolution_width=video["width"],
+        resolution_height=video["height"],
+        fps=video["fps"],
+        frame_count=video["frame_count"],
+        content_hash=content_hash
     )
     
     result = await cameras_collection.insert_one(camera.dict(by_alias=True, exclude={'id'}))
@@ -128,17 +155,105 @@ async def upload_camera_video(
         "camera_identifier": camera_identifier,
         "name": name,
         "video_path": video_path,
+        "content_hash": content_hash,
+        "reused_existing_video": duplicate is not None,
         "message": "Video uploaded successfully"
     }
 
+async def get_store_or_404(store_id: str):
+    store = await stores_collection.find_one({"_id": ObjectId(store_id)}) if ObjectId.is_valid(store_id) else None
+    if not store:
+        raise HTTPException(status_code=404, detail="Store not found")
+    return store
+
+@app.post("/api/stores/{store_id}/cameras")
+async def upload_camera_video(
+    store_id: str,
+    camera_identifier: str = Form(...),
+    name: str = Form(...),
+    video: UploadFile = File(...)
+):
+    """Upload a video for a camera in one request (see /uploads for large or resumable uploads)."""
+    await get_store_or_404(store_id)
+    
+    upload_path = uploads.partial_path()
+    try:
+        content_hash = await copy_upload(video, upload_path, settings.upload_chunk_size)
+    except Exception:
+        if os.path.exists(upload_path):
+            os.remove(upload_path)
+        raise
+    return await create_camera_from_upload(store_id, camera_identifier, name, video.filename,
+                                           upload_path, content_hash)
+
+@app.post("/api/stores/{store_id}/uploads")
+async def create_upload(store_id: str, filename: str = Form(...), size: int = Form(...)):
+    """Start a resumable video upload of `size` bytes.
+    
+    Send the file in any number of PATCH /api/uploads/{upload_id}?offset=N
+    requests with raw bytes as the body, each starting where the upload stands.
+    After a dropped connection, GET the upload for its offset and carry on from
+    there; then POST /api/uploads/{upload_id}/camera to create the camera.
+    """
+    await get_store_or_404(store_id)
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="size must be positive")
+    
+    session = uploads.create(store_id, filename, size)
+    return dict(session.describe(), chunk_size=uploads.chunk_size)
+
+def get_upload_or_404(upload_id: str):
+    session = uploads.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
+
+@app.get("/api/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    """Offset a resumable upload has reached."""
+    return get_upload_or_404(upload_id).describe()
+
+@app.patch("/api/uploads/{upload_id}")
+async def append_upload(upload_id: str, offset: int, request: Request):
+    """Append the request body to a resumable upload at `offset`; streamed to disk as it arrives."""
+    session = get_upload_or_404(upload_id)
+    if session.lock.locked():
+        raise HTTPException(status_code=409, detail="Another request is writing to this upload")
+    try:
+        await uploads.append(session, offset, request.stream())
+    except UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.offset)})
+    return session.describe()
+
+@app.post("/api/uploads/{upload_id}/camera")
+async def complete_upload(upload_id: str, camera_identifier: str = Form(...), name: str = Form(...)):
+    """Create the camera of a completed resumable upload."""
+    session = get_upload_or_404(upload_id)
+    if not session.complete:
+        raise HTTPException(status_code=409, detail=f"Upload incomplete: {session.offset} of {session.size} bytes",
+                            headers={"Upload-Offset": str(session.offset)})
+    
+    async with session.lock:
+        content_hash = await asyncio.to_thread(uploads.content_hash, session)
+        try:
+            return await create_camera_from_upload(session.store_id, camera_identifier, name, session.filename,
+                                                   session.path, content_hash)
+        finally:
+            uploads.discard(session)
+
+@app.delete("/api/uploads/{upload_id}")
+async def cancel_upload(upload_id: str):
+    """Abandon a resumable upload and delete what was received."""
+    session = get_upload_or_404(upload_id)
+    if session.lock.locked():
+        raise HTTPException(status_code=409, detail="Another request is writing to this upload")
+    uploads.discard(session)
+    return {"message": "Upload cancelled"}
+
 @app.get("/api/stores/{store_id}/cameras")
-async def list_cameras(store_id: str):
+async def list_cameras(store_id: str, request: Request):
     """List all cameras for a store."""
-    cameras = []
-    async for camera in cameras_collection.find({"store_id": store_id}):
-        camera['_id'] = str(camera['_id'])
-        cameras.append(camera)
-    return {"cameras": cameras}
+    return respond(request, {"cameras": await cameras_collection.find({"store_id": store_id}).to_list(None)})
 
 # ==================== Zone Endpoints ====================
 
@@ -182,13 +297,9 @@ async def create_zone(
     }
 
 @app.get("/api/cameras/{camera_id}/zones")
-async def list_zones(camera_id: str):
+async def list_zones(camera_id: str, request: Request):
     """List all zones for a camera."""
-    zones = []
-    async for zone in zones_collection.find({"camera_id": camera_id}):
-        zone['_id'] = str(zone['_id'])
-        zones.append(zone)
-    return {"zones": zones}
+    return respond(request, {"zones": await zones_collection.find({"camera_id": camera_id}).to_list(None)})
 
 @app.delete("/api/zones/{zone_id}")
 async def delete_zone(zone_id: str):
@@ -202,43 +313,108 @@ async def delete_zone(zone_id: str):
 
 # ==================== Processing Endpoints ====================
 
-def process_videos_background(store_id: str):
-    """Background task to process all videos."""
+def save_profile(store_id: str, profiler: JobProfiler):
+    """Store a job's profiling artifacts; returns what the status reports about them."""
+    profile_id = ProfileStore.new_id()
+    artifacts = ProfileStore(settings.profile_dir).save(store_id, profile_id, profiler.artifacts())
+    print(f"Saved profile {profile_id} of store {store_id} ({profiler.seconds:.1f}s profiled)")
+    return {"id": profile_id, "mode": profiler.mode, "seconds": round(profiler.seconds, 1), "artifacts": artifacts}
+
+def process_videos_background(store_id: str, replay: bool = False, profile: str = None,
+                              profile_seconds: float = None, job: Job = None):
+    """Scheduled processing job (see JobScheduler), optionally under a profiler (see JobProfiler).
+    
+    Returns False when the job yielded to a higher-priority one between cameras; its
+    processor and progress stay in `job.context` and the next call carries on from there.
+    """
+    context = job.context if job else {}
+    profiler = context.get('profiler')
     try:
-        processing_status[store_id] = {
-            "status": "processing",
-            "progress": {},
-            "message": "Processing videos..."
-        }
-        
-        cameras = list(sync_cameras.find({"store_id": store_id}))
-        
-        if not cameras:
+        if 'processor' not in context:
+            # Imported on first use: the pipeline (cv2, OpenVINO, SciPy) isn't needed to serve the API
+            from ..database.connection import sync_cameras
+            from ..video.processor import VideoProcessor
+            
+            # Stage timings are process-wide; the job's summary is what they gained after this point
+            context['metrics_baseline'] = STAGE_SECONDS.snapshot()
             processing_status[store_id] = {
-                "status": "error",
-                "message": "No cameras found for store"
+                "status": "processing",
+                "progress": {},
+                "message": "Processing videos..."
             }
-            return
+            publish_status(store_id)
+            
+            cameras = list(sync_cameras.find({"store_id": store_id}))
+            
+            if not cameras:
+                processing_status[store_id] = {
+                    "status": "error",
+                    "message": "No cameras found for store"
+                }
+                publish_status(store_id)
+                return True
+            
+            for camera in cameras:
+                camera_id = str(camera['_id'])
+                processing_status[store_id]["progress"][camera_id] = {
+                    "name": camera['name'],
+                    "progress": 0.0
+                }
+            
+            processor = VideoProcessor(
+                settings.detector_model_path,
+                settings.reid_model_path,
+                store_id,
+                perf_counters=profile is not None
+            )
+            if profile:
+                # Started here, in the job's thread, after the models are compiled
+                profiler = JobProfiler(profile, profile_seconds, settings.profile_sample_interval)
+                profiler.start([processor.detector.layer_profile, processor.reid.layer_profile])
+            processor.load_gallery()
+            context.update(processor=processor, profiler=profiler, cameras=cameras, cameras_done=0)
+        else:
+            processing_status[store_id]["status"] = "processing"
+            processing_status[store_id]["message"] = "Processing videos..."
+            publish_status(store_id)
         
-        for camera in cameras:
-            camera_id = str(camera['_id'])
-            processing_status[store_id]["progress"][camera_id] = {
-                "name": camera['name'],
-                "progress": 0.0
-            }
+        processor = context['processor']
+        cameras = context['cameras']
+        metrics_baseline = context['metrics_baseline']
         
-        processor = VideoProcessor(
-            settings.detector_model_path,
-            settings.reid_model_path,
-            store_id
+        def update_progress(camera_id, progress, stats=None):
+            if job:
+                job.report(progress / 100)
+            if store_id in processing_status:
+                camera_progress = processing_status[store_id]["progress"][camera_id]
+                camera_progress["progress"] = progress
+                if stats:
+                    camera_progress["frames_skipped_ratio"] = stats['skipped_ratio']
+                    # Finished cameras report no occupancy
+                    camera_progress["occupancy"] = stats.get('occupancy', {})
+                if registry.enabled:
+                    processing_status[store_id]["metrics"] = stage_summary(metrics_baseline)
+                if profiler:
+                    profiler.check()
+                publish_status(store_id)
+        
+        context['cameras_done'] += processor.process_cameras(
+            cameras[context['cameras_done']:], update_progress, replay=replay,
+            should_yield=job.should_yield if job else None,
+            on_camera_done=(lambda camera_id: job.unit_done()) if job else None
         )
+        processor.save_gallery()
         
-        def update_progress(camera_id, progress):
-            if store_id in processing_status:
-                processing_status[store_id]["progress"][camera_id]["progress"] = progress
+        if context['cameras_done'] < len(cameras):
+            processing_status[store_id]["status"] = "queued"
+            processing_status[store_id]["message"] = (
+                f"Paused after {context['cameras_done']} of {len(cameras)} cameras for a higher-priority job"
+            )
+            publish_status(store_id)
+            return False
         
-        # Process all videos and generate insights
-        result = processor.process_all_and_generate_insights(cameras, update_progress)
+        result = processor.generate_insights()
+        response_cache.invalidate(store_id)
         
         processing_status[store_id] = {
             "status": "completed",
@@ -246,88 +422,471 @@ def process_videos_background(store_id: str):
             "result": {
                 "hourly_heatmaps": result['hourly_heatmaps'],
                 "daily_heatmaps": result['daily_heatmaps'],
-                "insights_generated": len(result['insights']) if result['insights'] else 0
+                "insights_generated": len(result['insights']) if result['insights'] else 0,
+                "camera_stats": result['camera_stats']
             }
         }
+        if registry.enabled:
+            processing_status[store_id]["metrics"] = stage_summary(metrics_baseline)
+        if profiler:
+            processing_status[store_id]["profile"] = save_profile(store_id, profiler)
+        publish_status(store_id)
+        return True
         
     except Exception as e:
+        # Rollups may have been partly rewritten
+        response_cache.invalidate(store_id)
         processing_status[store_id] = {
             "status": "error",
             "message": f"Error during processing: {str(e)}"
         }
+        if profiler:
+            # A job that fails slowly is worth a profile too
+            processing_status[store_id]["profile"] = save_profile(store_id, profiler)
+        publish_status(store_id)
         print(f"Error processing store {store_id}: {e}")
-        import traceback
         traceback.print_exc()
+        return True
+
+def publish_schedule():
+    """Refresh the queue position and ETA in the status of every scheduled store."""
+    with scheduler.lock:
+        jobs = scheduler.running + scheduler.queue
+        estimates = scheduler.estimates()
+        schedules = {job.store_id: scheduler.describe(job, estimates) for job in jobs}
+    for store_id, schedule in schedules.items():
+        if store_id in processing_status:
+            processing_status[store_id]["schedule"] = schedule
+            publish_status(store_id)
+
+scheduler = JobScheduler(
+    {
+        'cpu': settings.scheduler_cpu_slots,
+        'memory_mb': settings.scheduler_memory_mb,
+        'inference_streams': settings.scheduler_inference_streams
+    },
+    usage_half_life=settings.scheduler_usage_half_life_seconds,
+    on_change=publish_schedule
+)
 
 @app.post("/api/stores/{store_id}/process")
-async def start_processing(store_id: str, background_tasks: BackgroundTasks):
-    """Start processing all videos for a store."""
+async def start_processing(store_id: str, replay: bool = False, priority: str = None,
+                           profile: str = None, profile_seconds: float = None):
+    """Queue processing of all videos for a store.
+    
+    With `replay=true`, zone events are rebuilt from cached detections (after zone edits).
+    Jobs run as the scheduler's budget allows: `priority=today` (the default, `backfill`
+    for replays) goes before `priority=backfill`, which can be paused between cameras
+    for it, and stores otherwise take turns. The status reports queue position and ETA.
+    With `profile=sampling` (stack samples) or `profile=cprofile` (deterministic, slower),
+    the first `profile_seconds` of the job are profiled and the profile is stored as
+    downloadable artifacts along with OpenVINO per-layer timings of both models;
+    profiled jobs are never paused.
+    """
+    ensure_processing_enabled()
+    if profile is not None and profile not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"profile must be one of: {', '.join(PROFILE_MODES)}")
+    max_seconds = settings.profile_max_seconds
+    profile_seconds = min(profile_seconds, max_seconds) if profile_seconds and profile_seconds > 0 else max_seconds
+    
+    priority = priority or ('backfill' if replay else 'today')
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of: {', '.join(PRIORITIES)}")
+    
     store = await stores_collection.find_one({"_id": ObjectId(store_id)})
     if not store:
         raise HTTPException(status_code=404, detail="Store not found")
     
-    if store_id in processing_status and processing_status[store_id]["status"] == "processing":
-        raise HTTPException(status_code=400, detail="Processing already in progress")
+    ensure_not_processing(store_id)
     
-    background_tasks.add_task(process_videos_background, store_id)
+    cameras = await cameras_collection.count_documents({"store_id": store_id})
+    job = Job(
+        store_id,
+        lambda job: process_videos_background(store_id, replay, profile, profile_seconds, job),
+        priority=priority,
+        demand={'cpu': 1, 'memory_mb': settings.scheduler_job_memory_mb, 'inference_streams': 1},
+        units=cameras,
+        preemptible=profile is None
+    )
+    # Before submitting: the job may start (and set its own status) right away
+    processing_status[store_id] = {
+        "status": "queued",
+        "progress": {},
+        "message": "Waiting for processing capacity..."
+    }
+    scheduler.submit(job)
     
     return {
-        "message": "Processing started",
-        "store_id": store_id
+        "message": "Processing queued",
+        "store_id": store_id,
+        "replay": replay,
+        "profile": {"mode": profile, "max_seconds": profile_seconds} if profile else None,
+        "schedule": scheduler.describe(job)
     }
 
+@app.get("/api/processing/queue")
+async def get_processing_queue():
+    """Running and queued processing jobs of all stores, with the budget they share."""
+    return scheduler.snapshot()
+
 @app.get("/api/stores/{store_id}/processing-status")
 async def get_processing_status(store_id: str):
-    """Get current processing status."""
+    """Get current processing status, with queue position and ETA while the job is scheduled."""
     if store_id not in processing_status:
         return {
             "status": "not_started",
             "message": "Processing has not been started"
         }
     
+    job = scheduler.job_for(store_id)
+    if job:
+        with scheduler.lock:
+            processing_status[store_id]["schedule"] = scheduler.describe(job)
     return processing_status[store_id]
 
+@app.get("/api/stores/{store_id}/live")
+async def stream_live_status(store_id: str, request: Request):
+    """Server-Sent Events stream of processing progress and live zone occupancy.
+    
+    Each `status` event carries the same payload as /processing-status, sent at
+    most LIVE_UPDATES_MAX_RATE times per second while processing runs.
+    """
+    async def events():
+        if store_id not in live_updates.latest:
+            yield f"event: status\ndata: {json.dumps({'status': 'not_started'})}\n\n"
+        
+        async for message in live_updates.subscribe(store_id):
+            if await request.is_disconnected():
+                break
+            if message is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: status\ndata: {message}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ==================== Stream Endpoints ====================
+
+stream_workers = {}  # camera_id -> {"store_id", "thread", "stop", "status"}
+
+def run_stream(store_id: str, camera_id: str, source: str, stop_event: threading.Event):
+    """Thread target: process a live camera source until stopped."""
+    status = stream_workers[camera_id]["status"]
+    try:
+        from ..video.processor import VideoProcessor
+        processor = VideoProcessor(
+            settings.detector_model_path,
+            settings.reid_model_path,
+            store_id
+        )
+        
+        def update_status(stats):
+            status.update(stats)
+            status["state"] = "streaming" if stats["connected"] else "reconnecting"
+        
+        processor.process_stream(camera_id, source, stop_event, update_status)
+        status["state"] = "stopped"
+        response_cache.invalidate(store_id)
+    except Exception as e:
+        status["state"] = "error"
+        status["message"] = f"Error during streaming: {str(e)}"
+        print(f"Error streaming camera {camera_id}: {e}")
+        traceback.print_exc()
+
+@app.post("/api/cameras/{camera_id}/stream/start")
+async def start_stream(camera_id: str, source: str = None):
+    """Start continuous processing of a camera's live feed.
+    
+    `source` is an RTSP/HTTP URL, pipe or file; it defaults to the camera's video source.
+    """
+    ensure_processing_enabled()
+    camera = await cameras_collection.find_one({"_id": ObjectId(camera_id)})
+    if not camera:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    
+    worker = stream_workers.get(camera_id)
+    if worker and worker["thread"].is_alive():
+        raise HTTPException(status_code=400, detail="Stream already running")
+    
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=run_stream,
+        args=(camera["store_id"], camera_id, source or camera["video_source"], stop_event),
+        name=f"stream-{camera_id}",
+        daemon=True
+    )
+    stream_workers[camera_id] = {
+        "store_id": camera["store_id"],
+        "thread": thread,
+        "stop": stop_event,
+        "status": {"state": "starting", "started_at": datetime.utcnow()}
+    }
+    thread.start()
+    response_cache.invalidate(camera["store_id"])
+    
+    return {"message": "Stream started", "camera_id": camera_id}
+
+@app.post("/api/cameras/{camera_id}/stream/stop")
+def stop_stream(camera_id: str):
+    """Stop a camera's live processing; open visits are closed and flushed."""
+    worker = stream_workers.get(camera_id)
+    if not worker or not worker["thread"].is_alive():
+        raise HTTPException(status_code=404, detail="No stream running for camera")
+    
+    worker["stop"].set()
+    worker["status"]["state"] = "stopping"
+    return {"message": "Stream stopping", "camera_id": camera_id}
+
+@app.get("/api/stores/{store_id}/streams")
+def list_streams(store_id: str):
+    """Status of the store's live streams."""
+    return {
+        "streams": {
+            camera_id: worker["status"]
+            for camera_id, worker in stream_workers.items()
+            if worker["store_id"] == store_id
+        }
+    }
+
+@app.on_event("shutdown")
+def stop_all_streams():
+    for worker in stream_workers.values():
+        worker["stop"].set()
+    for worker in stream_workers.values():
+        worker["thread"].join(timeout=10)
+
 # ==================== Heatmap Endpoints ====================
 
 @app.get("/api/stores/{store_id}/heatmaps/hourly")
-async def get_hourly_heatmaps(store_id: str):
+async def get_hourly_heatmaps(store_id: str, request: Request):
     """Get hourly heatmaps for a store."""
-    heatmaps = []
-    async for heatmap in hourly_heatmaps_collection.find({"store_id": store_id}):
-        heatmap['_id'] = str(heatmap['_id'])
-        heatmaps.append(heatmap)
+    async def build():
+        heatmaps = await hourly_heatmaps_collection.find({"store_id": store_id}).to_list(None)
+        if not heatmaps:
+            raise HTTPException(status_code=404, detail="No hourly heatmaps found. Please process videos first.")
+        return {"heatmaps": heatmaps}
     
-    if not heatmaps:
-        raise HTTPException(status_code=404, detail="No hourly heatmaps found. Please process videos first.")
-    
-    return {"heatmaps": heatmaps}
+    return await cached_response(request, store_id, build)
 
 @app.get("/api/stores/{store_id}/heatmaps/daily")
-async def get_daily_heatmaps(store_id: str):
+async def get_daily_heatmaps(store_id: str, request: Request):
     """Get daily heatmaps for a store."""
-    heatmaps = []
-    async for heatmap in daily_heatmaps_collection.find({"store_id": store_id}):
-        heatmap['_id'] = str(heatmap['_id'])
-        heatmaps.append(heatmap)
-    
-    if not heatmaps:
-        raise HTTPException(status_code=404, detail="No daily heatmaps found. Please process videos first.")
+    async def build():
+        heatmaps = await daily_heatmaps_collection.find({"store_id": store_id}).to_list(None)
+        if not heatmaps:
+            raise HTTPException(status_code=404, detail="No daily heatmaps found. Please process videos first.")
+        return {"heatmaps": heatmaps}
     
-    return {"heatmaps": heatmaps}
+    return await cached_response(request, store_id, build)
 
 # ==================== Insights Endpoints ====================
 
 @app.get("/api/stores/{store_id}/insights")
-async def get_daily_insights(store_id: str):
-    insights = []
-    async for insight in daily_insights_collection.find({"store_id": store_id}):
-        insight['_id'] = str(insight['_id'])
-        insights.append(insight)
+async def get_daily_insights(store_id: str, request: Request):
+    async def build():
+        insights = await daily_insights_collection.find({"store_id": store_id}).to_list(None)
+        if not insights:
+            raise HTTPException(status_code=404, detail="No insights found. Please process videos first.")
+        return {"insights": insights}
+    
+    return await cached_response(request, store_id, build)
+
+# ==================== Retention Endpoints ====================
+
+def parse_day(day: str):
+    try:
+        return datetime.strptime(day, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Day must be formatted as YYYY-MM-DD")
+
+def ensure_processing_enabled():
+    if not settings.processing_enabled:
+        raise HTTPException(status_code=503, detail="Processing is disabled on this API process; run it with python -m src.worker")
+
+def ensure_not_processing(store_id: str):
+    status = processing_status.get(store_id, {}).get("status")
+    if status == "processing":
+        raise HTTPException(status_code=400, detail="Processing already in progress")
+    if status == "queued":
+        raise HTTPException(status_code=400, detail="Processing already queued")
+
+@app.post("/api/stores/{store_id}/retention")
+def run_retention(store_id: str, retain_days: int = None):
+    """Archive and expire raw events of rolled-up days older than the retention period."""
+    ensure_not_processing(store_id)
+    retain_days = settings.retention_days if retain_days is None else retain_days
+    if retain_days <= 0:
+        raise HTTPException(status_code=400, detail="Retention is disabled; pass retain_days or set RETENTION_DAYS")
+
+    from ..database.retention import EventRetention
+    archived = EventRetention(store_id, settings.archive_dir, retain_days).run()
+    return {"store_id": store_id, "retain_days": retain_days, "archived": archived}
+
+@app.get("/api/stores/{store_id}/archive")
+def list_archived_days(store_id: str):
+    """List the days archived for a store."""
+    from ..database.retention import EventArchive
+    days = EventArchive(settings.archive_dir).days(store_id)
+    return {"store_id": store_id, "days": [f"{day:%Y-%m-%d}" for day in days]}
+
+@app.post("/api/stores/{store_id}/archive/{day}/rehydrate")
+def rehydrate_archived_day(store_id: str, day: str):
+    """Restore an archived day's raw events, e.g. to re-run the aggregations."""
+    ensure_not_processing(store_id)
+    from ..database.retention import EventRetention
+    count = EventRetention(store_id, settings.archive_dir, settings.retention_days).rehydrate(parse_day(day))
+    if count is None:
+        raise HTTPException(status_code=404, detail="Day is not archived")
+
+    return {"store_id": store_id, "day": day, "events_restored": count}
+
+# ==================== Profiling Endpoints ====================
+
+ARTIFACT_MEDIA_TYPES = {'.json': 'application/json', '.txt': 'text/plain', '.folded': 'text/plain'}
+
+@app.get("/api/stores/{store_id}/profiles")
+def list_profiles(store_id: str):
+    """List the profiled jobs of a store and their artifacts."""
+    profiles = ProfileStore(settings.profile_dir).profiles(store_id)
+    return {
+        "store_id": store_id,
+        "profiles": [{"id": profile_id, "artifacts": artifacts} for profile_id, artifacts in profiles.items()]
+    }
+
+@app.get("/api/stores/{store_id}/profiles/{profile_id}/{artifact}")
+def download_profile_artifact(store_id: str, profile_id: str, artifact: str):
+    """Download one artifact of a profiled job (stacks.folded goes straight into flamegraph.pl)."""
+    profile_store = ProfileStore(settings.profile_dir)
+    # Only names listed from disk, never paths built from the request (ids can't be '..')
+    if not ObjectId.is_valid(store_id) or not profile_id.isalnum() or \
+            artifact not in profile_store.profiles(store_id).get(profile_id, []):
+        raise HTTPException(status_code=404, detail="Profile artifact not found")
+
+    media_type = ARTIFACT_MEDIA_TYPES.get(os.path.splitext(artifact)[1], 'application/octet-stream')
+    return FileResponse(profile_store.path(store_id, profile_id, artifact), media_type=media_type,
+                        filename=f"{store_id}-{profile_id}-{artifact}")
+
+# ==================== Transition Endpoints ====================
+
+def day_range(start: str = None, end: str = None):
+    """hour_start filter for the days from start to end (inclusive), either optional"""
+    hour_range = {}
+    if start:
+        hour_range["$gte"] = parse_day(start)
+    if end:
+        hour_range["$lt"] = parse_day(end) + timedelta(days=1)
+    return hour_range
+
+@app.get("/api/stores/{store_id}/transitions")
+async def get_zone_transitions(store_id: str, request: Request, start: str = None, end: str = None,
+                               path: str = None):
+    """Zone-to-zone transition matrix between two days (inclusive); see zone_transitions."""
+    return await cached_response(request, store_id, lambda: zone_transitions(store_id, start, end, path))
+
+async def zone_transitions(store_id: str, start: str = None, end: str = None, path: str = None):
+    """Zone-to-zone transition matrix between two days (inclusive), from the hourly transition rollups.
+
+    With `path` (comma-separated zone ids) also returns a funnel along it. Only
+    consecutive zone pairs are stored, so step N counts A->B then B->C moves
+    independently; conversion is the ratio of those counts, not of people who
+    walked the whole path.
+    """
+    match = {"store_id": store_id}
+    if start or end:
+        match["hour_start"] = day_range(start, end)
+    
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"from_zone": "$from_zone", "to_zone": "$to_zone"},
+            "count": {"$sum": "$count"},
+            "gap_total": {"$sum": "$gap_total"},
+            "gap_min": {"$min": "$gap_min"},
+            "gap_max": {"$max": "$gap_max"}
+        }}
+    ]
+    transitions = {}
+    async for cell in zone_transitions_collection.aggregate(pipeline):
+        transitions[(cell["_id"]["from_zone"], cell["_id"]["to_zone"])] = {
+            "from_zone": cell["_id"]["from_zone"],
+            "to_zone": cell["_id"]["to_zone"],
+            "count": cell["count"],
+            "avg_gap_seconds": round(cell["gap_total"] / cell["count"], 2),
+            "min_gap_seconds": round(cell["gap_min"], 2),
+            "max_gap_seconds": round(cell["gap_max"], 2)
+        }
     
-    if not insights:
-        raise HTTPException(status_code=404, detail="No insights found. Please process videos first.")
+    if not transitions:
+        raise HTTPException(status_code=404, detail="No zone transitions found. Please process videos first.")
     
-    return {"insights": insights}
+    result = {
+        "store_id": store_id,
+        "transitions": sorted(transitions.values(), key=lambda t: t["count"], reverse=True)
+    }
+    
+    if path:
+        zone_ids = [zone_id.strip() for zone_id in path.split(",") if zone_id.strip()]
+        if len(zone_ids) < 2:
+            raise HTTPException(status_code=400, detail="A path needs at least two zones")
+        
+        steps = []
+        for from_zone, to_zone in zip(zone_ids, zone_ids[1:]):
+            count = transitions.get((from_zone, to_zone), {}).get("count", 0)
+            first = steps[0]["count"] if steps else count
+            previous = steps[-1]["count"] if steps else count
+            steps.append({
+                "from_zone": from_zone,
+                "to_zone": to_zone,
+                "count": count,
+                "conversion_from_previous": round(count / previous, 4) if previous else 0.0,
+                "conversion_from_first": round(count / first, 4) if first else 0.0
+            })
+        result["path"] = steps
+    
+    return result
+
+# ==================== Occupancy Endpoints ====================
+
+@app.get("/api/stores/{store_id}/occupancy")
+async def get_occupancy_timeline(store_id: str, request: Request, start: str = None, end: str = None,
+                                 zone_id: str = None):
+    """Per-minute mean and max occupancy of each zone between two days (inclusive); see occupancy_timeline."""
+    return await cached_response(request, store_id, lambda: occupancy_timeline(store_id, start, end, zone_id))
+
+async def occupancy_timeline(store_id: str, start: str = None, end: str = None, zone_id: str = None):
+    """Per-minute mean and max occupancy of each zone between two days (inclusive).
+
+    Minutes no analysed frame covered are left out of the curves.
+    """
+    query = {"store_id": store_id}
+    if start or end:
+        query["hour_start"] = day_range(start, end)
+    if zone_id:
+        query["zone_id"] = zone_id
+    
+    zones = {}
+    cursor = hourly_occupancy_collection.find(query, {"_id": 0, "updated_at": 0}).sort("hour_start", 1)
+    async for hour in cursor:
+        zone = zones.setdefault(hour["zone_id"], {
+            "zone_id": hour["zone_id"],
+            "zone_name": hour.get("zone_name"),
+            "camera_id": hour["camera_id"],
+            "minutes": [],
+            "mean": [],
+            "max": []
+        })
+        for minute, (mean, peak) in enumerate(zip(hour["mean"], hour["max"])):
+            if mean is None:
+                continue
+            zone["minutes"].append(hour["hour_start"] + timedelta(minutes=minute))
+            zone["mean"].append(mean)
+            zone["max"].append(peak)
+    
+    if not zones:
+        raise HTTPException(status_code=404, detail="No occupancy data found. Please process videos first.")
+    
+    return {"store_id": store_id, "zones": list(zones.values())}
 
 # ==================== Health Check ====================
 
@@ -339,6 +898,11 @@ async def root():
         "status": "running"
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Stage timings, frame and event counters and pipeline gauges in the Prometheus text format."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
\ No newline at end of file
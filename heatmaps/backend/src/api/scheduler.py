@@ -0,0 +1,232 @@
+import math
+import threading
+import time
+import uuid
+
+PRIORITIES = {'today': 0, 'backfill': 1}  # Lower runs first
+RESOURCES = ('cpu', 'memory_mb', 'inference_streams')
+
+
+class Job:
+    """One store's processing job as seen by the JobScheduler.
+
+    `run(job)` does the work on a scheduler thread and returns True when the
+    job is finished, or False when it stopped early because `should_yield`
+    turned True; it is then queued again and `run` is called with the same
+    job (and its `context`) to resume. Progress is counted in units (cameras)
+    and feeds the queue ETAs.
+    """
+
+    def __init__(self, store_id, run, priority='today', demand=None, units=1, preemptible=True):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}, expected one of {', '.join(PRIORITIES)}")
+        self.id = uuid.uuid4().hex[:12]
+        self.store_id = store_id
+        self.run = run
+        self.priority = priority
+        self.demand = demand or {}
+        self.units = max(units, 1)
+        self.preemptible = preemptible
+        self.context = {}  # Kept by `run` across preemptions
+        self.state = 'queued'
+        self.submitted_at = time.time()
+        self.service_seconds = 0.0
+        self.preemptions = 0
+        self.units_done = 0
+        self.unit_fraction = 0.0  # Progress through the current unit
+        self.unit_started = None
+        self.scheduler = None
+        self._yield = threading.Event()
+
+    def should_yield(self):
+        return self._yield.is_set()
+
+    def report(self, fraction):
+        """Progress through the current unit, 0-1"""
+        self.unit_fraction = min(max(fraction, 0.0), 1.0)
+
+    def unit_done(self):
+        now = time.monotonic()
+        if self.scheduler and self.unit_started is not None:
+            self.scheduler.observe_unit(now - self.unit_started)
+        self.units_done += 1
+        self.unit_fraction = 0.0
+        self.unit_started = now
+
+    def remaining_units(self):
+        return max(self.units - self.units_done - self.unit_fraction, 0.0)
+
+
+class JobScheduler:
+    """Admits processing jobs within a resource budget, fairly across stores.
+
+    `budget` maps resources to capacities (0 = unlimited) and each job's
+    `demand` to what it holds while running. Queued jobs are ordered by
+    priority, then by the store's recent processing time (decaying with
+    `usage_half_life`, so a store with a long backlog doesn't crowd out the
+    others), then by submission. A queued job that can't be admitted and
+    outranks a running preemptible job asks that job to yield; it stops at
+    its next camera boundary and goes back to the queue.
+    """
+
+    def __init__(self, budget, usage_half_life=3600.0, on_change=None):
+        self.budget = budget
+        self.usage_half_life = usage_half_life
+        self.on_change = on_change  # Called with no arguments after jobs start, stop or are queued
+        self.queue = []
+        self.running = []
+        self.usage = {}  # store_id -> (decayed service seconds, monotonic time of the value)
+        self.seconds_per_unit = None  # Moving average of observed unit durations
+        self.lock = threading.RLock()
+
+    def submit(self, job):
+        with self.lock:
+            job.scheduler = self
+            job.state = 'queued'
+            self.queue.append(job)
+            self._dispatch()
+        self._changed()
+        return job
+
+    def observe_unit(self, seconds):
+        with self.lock:
+            if self.seconds_per_unit is None:
+                self.seconds_per_unit = seconds
+            else:
+                self.seconds_per_unit = 0.8 * self.seconds_per_unit + 0.2 * seconds
+
+    def store_usage(self, store_id, now=None):
+        now = time.monotonic() if now is None else now
+        value, at = self.usage.get(store_id, (0.0, now))
+        return value * math.pow(0.5, (now - at) / self.usage_half_life)
+
+    def _charge(self, store_id, seconds):
+        now = time.monotonic()
+        self.usage[store_id] = (self.store_usage(store_id, now) + seconds, now)
+
+    def in_use(self):
+        return {resource: sum(job.demand.get(resource, 0) for job in self.running) for resource in RESOURCES}
+
+    def _fits(self, job):
+        if not self.running:
+            return True  # A job bigger than the budget still runs, alone
+        used = self.in_use()
+        return all(
+            not self.budget.get(resource) or used[resource] + job.demand.get(resource, 0) <= self.budget[resource]
+            for resource in RESOURCES
+        )
+
+    def ordered_queue(self):
+        now = time.monotonic()
+        return sorted(self.queue, key=lambda job: (
+            PRIORITIES[job.priority], self.store_usage(job.store_id, now), job.submitted_at
+        ))
+
+    def _dispatch(self):
+        # Strictly in order: a large job at the head isn't starved by smaller ones behind it
+        for job in self.ordered_queue():
+            if not self._fits(job):
+                self._preempt_for(job)
+                break
+            self.queue.remove(job)
+            self._start(job)
+
+    def _preempt_for(self, job):
+        if any(running.should_yield() for running in self.running):
+            return  # One job at a time gives way
+        candidates = [
+            running for running in self.running
+            if running.preemptible and PRIORITIES[running.priority] > PRIORITIES[job.priority]
+        ]
+        if candidates:
+            victim = max(candidates, key=lambda running: (PRIORITIES[running.priority], running.submitted_at))
+            print(f"Asking job {victim.id} of store {victim.store_id} to yield to store {job.store_id}")
+            victim._yield.set()
+
+    def _start(self, job):
+        job.state = 'running'
+        job.unit_started = time.monotonic()
+        self.running.append(job)
+        threading.Thread(target=self._execute, args=(job,), name=f"job-{job.store_id}", daemon=True).start()
+
+    def _execute(self, job):
+        started = time.monotonic()
+        finished = True
+        try:
+            finished = job.run(job)
+        except Exception as e:
+            print(f"Job {job.id} of store {job.store_id} failed: {e}")
+        finally:
+            with self.lock:
+                self.running.remove(job)
+                elapsed = time.monotonic() - started
+                job.service_seconds += elapsed
+                self._charge(job.store_id, elapsed)
+                if finished:
+                    job.state = 'finished'
+                else:
+                    job.preemptions += 1
+                    job._yield.clear()
+                    job.state = 'queued'
+                    job.unit_fraction = 0.0
+                    self.queue.append(job)
+                self._dispatch()
+            self._changed()
+
+    def _changed(self):
+        if self.on_change:
+            self.on_change()
+
+    def estimates(self):
+        """job id -> (queue position, seconds until it starts, seconds until it finishes)"""
+        spu = self.seconds_per_unit
+        slots = self.budget.get('cpu') or max(len(self.running), 1)
+        estimates = {}
+        free = []
+        for job in self.running:
+            remaining = job.remaining_units() * spu if spu is not None else None
+            estimates[job.id] = (0, 0.0, remaining)
+            free.append(remaining)
+        for position, job in enumerate(self.ordered_queue(), start=1):
+            if spu is None:
+                estimates[job.id] = (position, None, None)
+                continue
+            free = sorted(free) + [0.0] * max(slots - len(free), 0)
+            start = free.pop(0)
+            estimates[job.id] = (position, start, start + job.remaining_units() * spu)
+            free.append(estimates[job.id][2])
+        return estimates
+
+    def describe(self, job, estimates=None):
+        estimates = self.estimates() if estimates is None else estimates
+        position, starts_in, finishes_in = estimates.get(job.id, (None, None, None))
+        return {
+            'job_id': job.id,
+            'state': job.state,
+            'priority': job.priority,
+            'queue_position': position if job.state == 'queued' else None,
+            'eta_seconds': round(starts_in) if starts_in is not None and job.state == 'queued' else None,
+            'estimated_remaining_seconds': round(finishes_in) if finishes_in is not None else None,
+            'cameras_done': job.units_done,
+            'cameras': job.units,
+            'preemptions': job.preemptions,
+            'yielding': job.should_yield()
+        }
+
+    def job_for(self, store_id):
+        with self.lock:
+            for job in self.running + self.queue:
+                if job.store_id == store_id:
+                    return job
+        return None
+
+    def snapshot(self):
+        with self.lock:
+            estimates = self.estimates()
+            return {
+                'budget': self.budget,
+                'in_use': self.in_use(),
+                'seconds_per_camera': round(self.seconds_per_unit, 1) if self.seconds_per_unit else None,
+                'running': [dict(self.describe(job, estimates), store_id=job.store_id) for job in self.running],
+                'queued': [dict(self.describe(job, estimates), store_id=job.store_id) for job in self.ordered_queue()]
+            }
@@ -0,0 +1,251 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import time
+import uuid
+
+
+class UploadSession:
+    """One resumable upload: a partial file grown chunk by chunk up to a declared size.
+
+    The SHA-256 of the received bytes is updated as they are written, so the
+    content hash is ready when the last chunk arrives. The partial file is
+    the source of truth: `offset` is what this process last saw of it, and
+    when another process (or a restart) has changed the file since, the
+    digest is dropped and rebuilt from the file on the next append.
+    """
+
+    def __init__(self, upload_id, store_id, filename, size, created_at=None):
+        self.id = upload_id
+        self.store_id = store_id
+        self.filename = filename
+        self.size = size
+        self.created_at = created_at or time.time()
+        self.path = None
+        self.offset = 0
+        self.digest = None  # hashlib object over bytes [0, offset), None until rebuilt
+        self.lock = asyncio.Lock()  # One append at a time
+
+    @property
+    def complete(self):
+        return self.offset == self.size
+
+    def describe(self):
+        return {
+            "upload_id": self.id,
+            "store_id": self.store_id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": self.offset,
+            "complete": self.complete
+        }
+
+
+class UploadOffsetError(Exception):
+    """A chunk that doesn't start where the upload stands, or runs past its size"""
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+class ResumableUploads:
+    """Chunked uploads streamed to `<root>/.partial/<id>`, with a `<id>.json` sidecar.
+
+    Chunks are buffered up to `chunk_size` bytes and written and hashed on a
+    worker thread, so memory stays bounded and the event loop never waits on
+    the disk. Once an upload is complete the caller moves `session.path` into
+    place and discards the session. Partial uploads untouched for
+    `max_age_hours` are removed.
+    """
+
+    def __init__(self, root_dir, chunk_size=8 * 1024 * 1024, max_age_hours=24.0):
+        self.partial_dir = os.path.join(root_dir, ".partial")
+        self.chunk_size = chunk_size
+        self.max_age = max_age_hours * 3600
+        self.sessions = {}
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+    def _paths(self, upload_id):
+        path = os.path.join(self.partial_dir, upload_id)
+        return path, f"{path}.json"
+
+    def create(self, store_id, filename, size):
+        self.expire()
+        session = UploadSession(uuid.uuid4().hex, store_id, os.path.basename(filename), size)
+        session.path, meta_path = self._paths(session.id)
+        open(session.path, "wb").close()
+        session.digest = hashlib.sha256()
+        with open(meta_path, "w") as f:
+            json.dump({"store_id": store_id, "filename": session.filename, "size": size,
+                       "created_at": session.created_at}, f)
+        self.sessions[session.id] = session
+        return session
+
+    def get(self, upload_id):
+        """The session of an upload, refreshed from its partial file; None when unknown"""
+        if not upload_id.isalnum():
+            return None
+        session = self.sessions.get(upload_id)
+        if session is not None:
+            if not self._refresh(session) and not session.lock.locked():
+                # Completed, cancelled or expired by another process
+                self.sessions.pop(upload_id, None)
+                return None
+            return session
+
+        path, meta_path = self._paths(upload_id)
+        if not os.path.exists(meta_path) or not os.path.exists(path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        session = UploadSession(upload_id, meta["store_id"], meta["filename"], meta["size"], meta["created_at"])
+        session.path = path
+        session.offset = os.path.getsize(path)
+        self.sessions[upload_id] = session
+        return session
+
+    @staticmethod
+    def _refresh(session, size=None):
+        """Take the partial file's size as the offset; False when the file is gone"""
+        if size is None:
+            try:
+                size = os.path.getsize(session.path)
+            except FileNotFoundError:
+                return False
+        if size != session.offset:
+            session.offset = size
+            session.digest = None
+        return True
+
+    async def append(self, session, offset, chunks):
+        """Write an async iterable of byte chunks at `offset`; returns the new offset
+
+        The partial file is locked (flock) for the whole append, so API
+        processes sharing the upload directory take turns, and each one
+        checks the offset against the file rather than its own last view.
+        """
+        async with session.lock:
+            try:
+                f = await asyncio.to_thread(_open_locked, session.path)
+            except FileNotFoundError:
+                raise UploadOffsetError("Upload no longer exists", session.offset)
+            try:
+                self._refresh(session, os.fstat(f.fileno()).st_size)
+                if offset != session.offset:
+                    raise UploadOffsetError(f"Upload is at offset {session.offset}, not {offset}", session.offset)
+                if session.digest is None:
+                    session.digest = await asyncio.to_thread(_hash_file, session.path)
+
+                buffer = bytearray()
+                async for chunk in chunks:
+                    if session.offset + len(buffer) + len(chunk) > session.size:
+                        raise UploadOffsetError(f"Chunk runs past the declared size of {session.size} bytes",
+                                                session.offset)
+                    buffer += chunk
+                    if len(buffer) >= self.chunk_size:
+                        await asyncio.to_thread(_write, f, session.digest, bytes(buffer))
+                        session.offset += len(buffer)
+                        buffer.clear()
+                if buffer:
+                    await asyncio.to_thread(_write, f, session.digest, bytes(buffer))
+                    session.offset += len(buffer)
+            finally:
+                await asyncio.to_thread(f.close)  # Also releases the flock
+            return session.offset
+
+    def content_hash(self, session):
+        """SHA-256 of a complete upload"""
+        self._refresh(session)
+        digest = session.digest or _hash_file(session.path)
+        return digest.hexdigest()
+
+    def partial_path(self):
+        """A fresh path next to the partial uploads, e.g. to spool a single-request upload"""
+        return os.path.join(self.partial_dir, uuid.uuid4().hex)
+
+    def discard(self, session):
+        self.sessions.pop(session.id, None)
+        for path in self._paths(session.id):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def expire(self):
+        """Remove uploads whose partial file wasn't appended to for `max_age_hours`"""
+        cutoff = time.time() - self.max_age
+        for name in os.listdir(self.partial_dir):
+            if name.endswith(".json"):
+                continue  # Goes with its partial file, whose mtime is the last append
+            path = os.path.join(self.partial_dir, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            session = self.sessions.get(name)
+            if session is not None and session.lock.locked():
+                continue  # Being appended to right now
+            self.sessions.pop(name, None)
+            for expired in self._paths(name):
+                if os.path.exists(expired):
+                    os.remove(expired)
+
+
+def _open_locked(path):
+    """Open a partial file for appending, holding an exclusive flock until it is closed"""
+    f = open(path, "r+b")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0, os.SEEK_END)
+    except BaseException:
+        f.close()
+        raise
+    return f
+
+
+def _write(f, digest, data):
+    f.write(data)
+    f.flush()  # Other processes take the file size as the upload's offset
+    digest.update(data)
+
+
+def _hash_file(path, chunk_size=8 * 1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest
+
+
+async def copy_upload(upload_file, destination, chunk_size=8 * 1024 * 1024):
+    """Stream a multipart UploadFile to `destination` in chunks; returns its SHA-256"""
+    digest = hashlib.sha256()
+    f = await asyncio.to_thread(open, destination, "wb")
+    try:
+        while True:
+            chunk = await upload_file.read(chunk_size)
+            if not chunk:
+                break
+            await asyncio.to_thread(_write, f, digest, chunk)
+    finally:
+        await asyncio.to_thread(f.close)
+    return digest.hexdigest()
+
+
+def probe_video(video_path):
+    """Width, height, fps and frame count of a video; blocking, run it in a thread"""
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video {os.path.basename(video_path)}")
+        return {
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": cap.get(cv2.CAP_PROP_FPS),
+            "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        }
+    finally:
+        cap.release()
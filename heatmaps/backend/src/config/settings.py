@@ -4,8 +4,55 @@ class Settings(BaseSettings):
     mongodb_url: str = "mongodb://localhost:27017"
     database_name: str = "heatmap_db"
     port: int = 8000
+    api_workers: int = 1  # API processes started by python -m src.api.main (ignored with api_reload)
+    api_reload: bool = True  # Restart the API on code changes (development; set False to run api_workers)
+    processing_enabled: bool = True  # Run processing jobs and streams in the API process (off: use python -m src.worker)
     detector_model_path: str = "models/person-detection-retail-0013.xml"
     reid_model_path: str = "models/person-reidentification-retail-0287.xml"
+    analysis_fps: float = 5.0  # Frames analysed per second of video (0 = every frame)
+    decode_scale_ratio: float = 2.0  # Keep frames this many times the detector input (0 = full resolution)
+    motion_gate_enabled: bool = True  # Skip inference on frames with no change inside any zone
+    motion_min_changed_fraction: float = 0.003  # Fraction of zone pixels that must change
+    motion_max_skip_seconds: float = 2.0  # Force inference at least this often
+    roi_cropping_enabled: bool = True  # Detect only inside padded regions around the zones
+    roi_padding: float = 0.05  # Region margin as a fraction of frame size
+    roi_head_room: float = 0.3  # Extra height above zones (as a fraction of frame height) for bodies
+    roi_max_regions: int = 1  # Each region costs one inference per frame
+    video_segments: int = 1  # Parallel segments per video (1 = sequential)
+    segment_min_seconds: float = 600.0  # Don't split videos into segments shorter than this
+    segment_boundary_seconds: float = 10.0  # Window at each segment edge used to stitch identities
+    checkpoint_interval_seconds: float = 60.0  # Wall-clock time between processing checkpoints (0 = off)
+    detection_cache_dir: str = ""  # Record per-frame detections here for zone-only replays ("" = off)
+    reid_gallery_dir: str = ""  # Persist each store's Re-ID gallery here between jobs ("" = off)
+    reid_max_persons: int = 1000  # Gallery capacity
+    reid_person_timeout_seconds: int = 3600  # Forget persons not seen for this long (raise to match across days)
+    reid_embedding_dtype: str = "float32"  # Gallery storage: float32, float16 or int8
+    event_storage: str = "documents"  # Zone event layout: "documents" (one per event) or "buckets" (per zone-minute)
+    retention_days: int = 0  # Archive and expire rolled-up raw events older than this (0 = keep forever)
+    archive_dir: str = "archive"  # Cold archive of expired events, one file per store and day
+    live_updates_max_rate: float = 2.0  # Max live status pushes per second per store
+    response_cache_seconds: float = 300.0  # Keep serialized dashboard reads this long at most (0 = off)
+    response_cache_max_entries: int = 256  # Serialized responses kept in each API process
+    response_compression_min_bytes: int = 1024  # Send smaller responses uncompressed
+    upload_chunk_size: int = 8 * 1024 * 1024  # Bytes of an upload buffered per disk write
+    upload_partial_max_age_hours: float = 24.0  # Remove unfinished resumable uploads untouched for this long
+    stream_flush_seconds: float = 5.0  # Live streams write events and upsert hourly heatmaps this often
+    stream_reconnect_min_seconds: float = 1.0  # First retry delay after a stream drops
+    stream_reconnect_max_seconds: float = 30.0  # Retry delay doubles up to this
+    transition_max_gap_seconds: float = 1800.0  # Longest gap between two zone visits still counted as a transition
+    metrics_enabled: bool = True  # Time pipeline stages for /metrics and the processing status (off = no overhead)
+    inference_server_enabled: bool = True  # Cameras of a process share one batched model of each kind
+    inference_max_batch: int = 8  # Largest batch the shared models run
+    inference_max_wait_ms: float = 5.0  # Latency budget for filling a batch while several cameras submit
+    inference_workers: int = 1  # Batches run at the same time per model (one CPU stream each)
+    scheduler_cpu_slots: int = 2  # Processing jobs running at once
+    scheduler_memory_mb: int = 0  # Memory budget of running jobs (0 = unlimited)
+    scheduler_job_memory_mb: int = 1024  # Memory one processing job is assumed to hold
+    scheduler_inference_streams: int = 0  # Inference streams running jobs may hold, one each (0 = unlimited)
+    scheduler_usage_half_life_seconds: float = 3600.0  # How long a store's processing time counts against its turn
+    profile_dir: str = "profiles"  # Profiling artifacts of jobs started with ?profile=
+    profile_max_seconds: float = 300.0  # Longest profiling window of a job
+    profile_sample_interval: float = 0.005  # Seconds between stack samples
     
     class Config:
         env_file = ".env"
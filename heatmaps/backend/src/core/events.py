@@ -0,0 +1,84 @@
+ENTRY = 'entry'
+EXIT = 'exit'
+
+
+class ZoneEvent:
+    """A zone entry or exit produced by ZoneManager.
+
+    Events stay as these small slotted objects through the pipeline and are
+    only turned into MongoDB documents by `to_document` when written.
+    """
+
+    __slots__ = ('zone_id', 'camera_id', 'person_id', 'event_type', 'timestamp',
+                 'dwell_time', 'is_valid_visit', 'rejection_reason')
+
+    def __init__(self, zone_id, camera_id, person_id, event_type, timestamp,
+                 dwell_time=None, is_valid_visit=False, rejection_reason=None):
+        self.zone_id = zone_id
+        self.camera_id = camera_id
+        self.person_id = person_id
+        self.event_type = event_type
+        self.timestamp = timestamp
+        self.dwell_time = dwell_time
+        self.is_valid_visit = is_valid_visit
+        self.rejection_reason = rejection_reason
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        return isinstance(other, ZoneEvent) and self.__getstate__() == other.__getstate__()
+
+    def __repr__(self):
+        return f"ZoneEvent({self.event_type} {self.person_id} zone={self.zone_id} at {self.timestamp})"
+
+    def to_document(self, store_id, run_id, seq):
+        """MongoDB document for the zone_events collection"""
+        return {
+            'zone_id': self.zone_id,
+            'camera_id': self.camera_id,
+            'person_id': self.person_id,
+            'event_type': self.event_type,
+            'timestamp': self.timestamp,
+            'dwell_time': self.dwell_time,
+            'is_valid_visit': self.is_valid_visit,
+            'rejection_reason': self.rejection_reason,
+            'store_id': store_id,
+            'run_id': run_id,
+            'seq': seq,
+            'event_key': f"{run_id}:{seq}"
+        }
+
+    def to_bucket_entry(self, run_id, seq):
+        """Compact array entry for a zone_event_buckets document (see BUCKET_FIELDS)"""
+        entry = {
+            'r': run_id,
+            's': seq,
+            'p': self.person_id,
+            'e': self.event_type,
+            't': self.timestamp,
+            'v': self.is_valid_visit
+        }
+        # Absent fields read back as None
+        if self.dwell_time is not None:
+            entry['d'] = self.dwell_time
+        if self.rejection_reason is not None:
+            entry['x'] = self.rejection_reason
+        return entry
+
+
+# zone_events field -> key of an entry in a bucket's `events` array
+BUCKET_FIELDS = {
+    'run_id': 'r',
+    'seq': 's',
+    'person_id': 'p',
+    'event_type': 'e',
+    'timestamp': 't',
+    'dwell_time': 'd',
+    'is_valid_visit': 'v',
+    'rejection_reason': 'x'
+}
@@ -1,20 +1,37 @@
 from datetime import datetime, timedelta
-from ..database.connection import sync_zone_events, sync_hourly_heatmaps, sync_daily_heatmaps, sync_zones
+from ..database.connection import sync_hourly_heatmaps, sync_daily_heatmaps, sync_zones
+from ..database.event_store import get_event_store
+from ..utils.metrics import timed
+
+def day_of(timestamp):
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def delete_camera_heatmaps(store_id, camera_id, start, end):
+    """Remove a camera's hourly and daily heatmaps covering [start, end], e.g. before its events are re-derived"""
+    hours = {'$gte': start.replace(minute=0, second=0, microsecond=0), '$lte': end}
+    days = {'$gte': day_of(start), '$lte': end}
+    query = {'store_id': str(store_id), 'camera_id': camera_id}
+    return (sync_hourly_heatmaps.delete_many(dict(query, hour_start=hours)).deleted_count,
+            sync_daily_heatmaps.delete_many(dict(query, date=days)).deleted_count)
+
 
 class HeatmapGenerator:
-    def __init__(self, store_id):
+    def __init__(self, store_id, event_store=None):
         self.store_id = store_id
+        self.event_store = event_store or get_event_store()
     
+    @timed('aggregate_hourly')
     def generate_hourly_heatmaps(self):
         """Generate hourly heatmap aggregations"""
         print(f"Generating hourly heatmaps for store {self.store_id}")
         
-        # Get all events
-        all_events = list(sync_zone_events.find({
+        # Get all events (only the fields aggregated below)
+        all_events = self.event_store.find({
             'store_id': self.store_id,
             'event_type': 'exit',
             'is_valid_visit': True
-        }))
+        }, ('zone_id', 'person_id', 'timestamp', 'dwell_time'))
         
         if not all_events:
             print("No valid visit events found")
@@ -79,10 +96,15 @@ class HeatmapGenerator:
                     'total_dwell_time': round(total_dwell, 2),
                     'avg_dwell_time': round(avg_dwell, 2),
                     'crowd_density': round(crowd_density, 4),
-                    'created_at': datetime.utcnow()
+                    'updated_at': datetime.utcnow()
                 }
                 
-                sync_hourly_heatmaps.insert_one(heatmap)
+                # Same key as HourlyRollup: an hour a live stream already rolled up is replaced, not duplicated
+                sync_hourly_heatmaps.update_one(
+                    {'store_id': self.store_id, 'zone_id': zone_id, 'hour_start': current_hour},
+                    {'$set': heatmap, '$setOnInsert': {'created_at': heatmap['updated_at']}},
+                    upsert=True
+                )
                 hourly_heatmaps.append(heatmap)
                 
                 print(f"  Hour {current_hour.hour:02d}:00 - Zone '{zone.get('name')}': {visit_count} visits")
@@ -92,12 +114,16 @@ class HeatmapGenerator:
         print(f"Generated {len(hourly_heatmaps)} hourly heatmaps")
         return hourly_heatmaps
     
-    def generate_daily_heatmaps(self):
-        """Generate daily summary heatmaps"""
+    @timed('aggregate_daily')
+    def generate_daily_heatmaps(self, days=None):
+        """Generate daily summary heatmaps (for `days` only, if given)"""
         print(f"Generating daily heatmaps for store {self.store_id}")
         
         # Get all hourly heatmaps
         hourly_heatmaps = list(sync_hourly_heatmaps.find({'store_id': self.store_id}))
+        if days is not None:
+            days = set(days)
+            hourly_heatmaps = [h for h in hourly_heatmaps if day_of(h['hour_start']) in days]
         
         if not hourly_heatmaps:
             print("No hourly heatmaps found")
@@ -136,13 +162,13 @@ class HeatmapGenerator:
                 total_visits = sum(h['visit_count'] for h in day_data)
                 
                 # Get unique visitors from events
-                zone_events = list(sync_zone_events.find({
+                zone_events = self.event_store.find({
                     'store_id': self.store_id,
                     'zone_id': zone_id,
                     'event_type': 'exit',
                     'is_valid_visit': True,
                     'timestamp': {'$gte': date_start, '$lte': date_end}
-                }))
+                }, ('person_id',))
                 unique_visitors = len(set(e['person_id'] for e in zone_events))
                 
                 total_dwell = sum(h['total_dwell_time'] for h in day_data)
@@ -158,12 +184,12 @@ class HeatmapGenerator:
                 crowd_density = total_visits / hours_active if hours_active > 0 else 0.0
                 
                 # Engagement rate from events
-                all_zone_exits = list(sync_zone_events.find({
+                all_zone_exits = self.event_store.find({
                     'store_id': self.store_id,
                     'zone_id': zone_id,
                     'event_type': 'exit',
                     'timestamp': {'$gte': date_start, '$lte': date_end}
-                }))
+                }, ('is_valid_visit',))
                 pass_through = len([e for e in all_zone_exits if not e['is_valid_visit']])
                 engagement_rate = (total_visits / (total_visits + pass_through) * 100) if (total_visits + pass_through) > 0 else 0.0
                 
@@ -181,10 +207,15 @@ class HeatmapGenerator:
                     'peak_hour': peak_hour,
                     'crowd_density': round(crowd_density, 2),
                     'engagement_rate': round(engagement_rate, 2),
-                    'created_at': datetime.utcnow()
+                    'updated_at': datetime.utcnow()
                 }
                 
-                sync_daily_heatmaps.insert_one(daily_heatmap)
+                # Re-aggregating a day replaces its rows
+                sync_daily_heatmaps.update_one(
+                    {'store_id': self.store_id, 'zone_id': zone_id, 'date': date_start},
+                    {'$set': daily_heatmap, '$setOnInsert': {'created_at': daily_heatmap['updated_at']}},
+                    upsert=True
+                )
                 daily_heatmaps.append(daily_heatmap)
                 
                 print(f"  Zone '{day_data[0]['zone_name']}': {total_visits} visits, peak at {peak_hour}:00")
@@ -1,16 +1,27 @@
 from datetime import datetime
-from ..database.connection import sync_zone_events, sync_daily_insights, sync_daily_heatmaps
+from ..database.connection import sync_daily_insights, sync_daily_heatmaps
+from ..database.event_store import get_event_store
+from ..utils.metrics import timed
 
 class InsightsGenerator:
-    def __init__(self, store_id):
+    def __init__(self, store_id, event_store=None):
         self.store_id = store_id
+        self.event_store = event_store or get_event_store()
     
-    def generate_daily_insights(self):
-        """Generate end-of-day insights summary"""
+    @timed('aggregate_insights')
+    def generate_daily_insights(self, days=None):
+        """Generate end-of-day insights summary (for `days` only, if given)"""
         print(f"Generating daily insights for store {self.store_id}")
         
         # Get all daily heatmaps
         daily_heatmaps = list(sync_daily_heatmaps.find({'store_id': self.store_id}))
+        if days is not None:
+            days = set(days)
+            daily_heatmaps = [h for h in daily_heatmaps if h['date'] in days]
+            # A day left without heatmaps (e.g. after a replay) has no insights either
+            empty_days = days - {h['date'] for h in daily_heatmaps}
+            if empty_days:
+                sync_daily_insights.delete_many({'store_id': self.store_id, 'date': {'$in': sorted(empty_days)}})
         
         if not daily_heatmaps:
             print("No daily heatmaps found")
@@ -25,14 +36,14 @@ class InsightsGenerator:
             date_heatmaps = [h for h in daily_heatmaps if h['date'] == date]
             
             # Total unique customers across all zones
-            all_events = list(sync_zone_events.find({
+            all_events = self.event_store.find({
                 'store_id': self.store_id,
                 'is_valid_visit': True,
                 'timestamp': {
                     '$gte': date,
                     '$lt': datetime.combine(date.date(), datetime.max.time())
                 }
-            }))
+            }, ('person_id',))
             total_unique_customers = len(set(e['person_id'] for e in all_events))
             
             # Zone insights
@@ -95,10 +106,15 @@ class InsightsGenerator:
                 'avg_store_dwell_time': round(avg_store_dwell, 2),
                 'peak_hour': peak_hour[0],
                 'peak_hour_customers': peak_hour[1],
-                'created_at': datetime.utcnow()
+                'updated_at': datetime.utcnow()
             }
             
-            sync_daily_insights.insert_one(insights)
+            # Re-aggregating a day replaces its insights
+            sync_daily_insights.update_one(
+                {'store_id': self.store_id, 'date': date},
+                {'$set': insights, '$setOnInsert': {'created_at': insights['updated_at']}},
+                upsert=True
+            )
             insights_list.append(insights)
             
             print(f"\n{'='*60}")
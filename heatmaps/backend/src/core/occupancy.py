@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+import numpy as np
+from ..database.connection import sync_hourly_occupancy
+from ..utils.metrics import timed
+from .rollups import hour_of
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class OccupancyTimeline:
+    """Minute-resolution occupancy curves per zone for one camera.
+
+    `sample` snapshots ZoneManager occupancy once per second into a 60-slot
+    per-zone ring buffer; seconds without an analysed frame carry the last
+    value forward, since occupancy only changes on events. Each completed
+    minute is folded into per-hour arrays (sum, max and number of covered
+    seconds per minute) and `flush` writes one `hourly_occupancy` document
+    per zone and hour with the mean and max occupancy of every minute.
+    An hour's arrays are seeded from its stored documents the first time it
+    is touched, so resumed jobs and restarted streams extend them.
+    """
+
+    def __init__(self, store_id, camera_id, zones, retain_hours=2, seed=True):
+        self.store_id = str(store_id)
+        self.camera_id = camera_id
+        self.zones = zones
+        self.zone_ids = [str(z['_id']) for z in zones]
+        self.retain_hours = retain_hours
+        self.seed = seed  # Off for segment workers, whose arrays are merged into a seeded timeline
+        self.ring = np.zeros((len(zones), 60), dtype=np.int32)  # Per-second occupancy of the current minute
+        self.filled = np.zeros(60, dtype=bool)
+        self.minute = None  # Minutes since epoch of the ring's contents
+        self.last_second = None
+        self.last_values = None
+        self.hours = {}  # hour_start -> {'sum', 'max', 'seconds'} arrays per minute of the hour
+        self.dirty = set()
+
+    def sample(self, timestamp, zone_manager):
+        """Record zone_manager's occupancy for the second of `timestamp` (first sample of a second wins)"""
+        second = int((timestamp - EPOCH).total_seconds())
+        if self.last_second is not None and second <= self.last_second:
+            return
+
+        occupancy = zone_manager.get_zone_occupancy()
+        values = np.array([occupancy.get(zone_id, 0) for zone_id in self.zone_ids], dtype=np.int32)
+        if self.last_second is not None:
+            self._fill(self.last_second + 1, second, self.last_values)
+        self._fill(second, second + 1, values)
+        self.last_second = second
+        self.last_values = values
+
+    def _fill(self, start, end, values):
+        """Set seconds [start, end) to values, folding every minute that completes"""
+        while start < end:
+            minute = start // 60
+            stop = min(end, (minute + 1) * 60)
+            if self.minute != minute:
+                self._fold()
+                self.minute = minute
+
+            self.ring[:, start % 60:stop - minute * 60] = values[:, None]
+            self.filled[start % 60:stop - minute * 60] = True
+            if stop == (minute + 1) * 60:
+                self._fold()
+            start = stop
+
+    def _fold(self):
+        """Add the ring's covered seconds to its minute in the hourly arrays and reset it"""
+        if self.minute is None or not self.filled.any():
+            self.minute = None
+            return
+
+        hour_start = EPOCH + timedelta(minutes=self.minute - self.minute % 60)
+        index = self.minute % 60
+        arrays = self._hour(hour_start)
+        seconds = self.ring[:, self.filled]
+        arrays['sum'][:, index] += seconds.sum(axis=1)
+        arrays['max'][:, index] = np.maximum(arrays['max'][:, index], seconds.max(axis=1))
+        arrays['seconds'][index] += seconds.shape[1]
+        self.dirty.add(hour_start)
+
+        self.filled[:] = False
+        self.minute = None
+
+    def _hour(self, hour_start):
+        if hour_start not in self.hours:
+            arrays = {
+                'sum': np.zeros((len(self.zone_ids), 60), dtype=np.float64),
+                'max': np.zeros((len(self.zone_ids), 60), dtype=np.int32),
+                'seconds': np.zeros(60, dtype=np.int32)
+            }
+            stored = {}
+            if self.seed:
+                stored = {
+                    doc['zone_id']: doc for doc in sync_hourly_occupancy.find({
+                        'store_id': self.store_id, 'camera_id': self.camera_id, 'hour_start': hour_start
+                    })
+                }
+            for i, zone_id in enumerate(self.zone_ids):
+                doc = stored.get(zone_id)
+                if not doc:
+                    continue
+                seconds = np.array(doc['seconds'], dtype=np.int32)
+                arrays['seconds'] = np.maximum(arrays['seconds'], seconds)
+                arrays['sum'][i] = [m * s if m is not None else 0.0 for m, s in zip(doc['mean'], seconds)]
+                arrays['max'][i] = [m if m is not None else 0 for m in doc['max']]
+            self.hours[hour_start] = arrays
+        return self.hours[hour_start]
+
+    def finish(self):
+        """Fold the partially covered current minute, at the end of a video or stream"""
+        self._fold()
+
+    def get_state(self):
+        """Hourly arrays, for merging timelines computed in other processes"""
+        return {hour_start: {k: v.copy() for k, v in arrays.items()} for hour_start, arrays in self.hours.items()}
+
+    def merge(self, state):
+        """Add hourly arrays from another timeline over the same zones (e.g. a video segment)"""
+        for hour_start, other in state.items():
+            arrays = self._hour(hour_start)
+            arrays['sum'] += other['sum']
+            arrays['max'] = np.maximum(arrays['max'], other['max'])
+            arrays['seconds'] += other['seconds']
+            self.dirty.add(hour_start)
+
+    @timed('occupancy_flush')
+    def flush(self, now=None):
+        """Write every hour touched since the last flush; with `now`, drop hours older than retain_hours"""
+        for hour_start in sorted(self.dirty):
+            arrays = self.hours[hour_start]
+            seconds = arrays['seconds']
+            covered = seconds > 0
+            mean = np.zeros_like(arrays['sum'])
+            mean[:, covered] = arrays['sum'][:, covered] / seconds[covered]
+
+            for i, zone in enumerate(self.zones):
+                sync_hourly_occupancy.replace_one(
+                    {
+                        'store_id': self.store_id, 'camera_id': self.camera_id,
+                        'zone_id': self.zone_ids[i], 'hour_start': hour_start
+                    },
+                    {
+                        'store_id': self.store_id,
+                        'camera_id': self.camera_id,
+                        'zone_id': self.zone_ids[i],
+                        'zone_name': zone.get('name', zone.get('zone_identifier')),
+                        'hour_start': hour_start,
+                        'mean': [round(float(m), 3) if c else None for m, c in zip(mean[i], covered)],
+                        'max': [int(m) if c else None for m, c in zip(arrays['max'][i], covered)],
+                        'seconds': seconds.tolist(),
+                        'updated_at': datetime.utcnow()
+                    },
+                    upsert=True
+                )
+        flushed = len(self.dirty)
+        self.dirty.clear()
+
+        if now is not None:
+            oldest = hour_of(now) - timedelta(hours=self.retain_hours)
+            for hour_start in [h for h in self.hours if h < oldest]:
+                del self.hours[hour_start]
+        return flushed
+
+
+def delete_camera_occupancy(store_id, camera_id, start, end):
+    """Remove a camera's stored occupancy curves in the hours covering [start, end], e.g. before its events are re-derived"""
+    return sync_hourly_occupancy.delete_many({
+        'store_id': str(store_id), 'camera_id': camera_id, 'hour_start': {'$gte': hour_of(start), '$lte': end}
+    }).deleted_count
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+from ..database.connection import sync_hourly_heatmaps
+from ..utils.metrics import timed
+from .events import EXIT
+
+
+def hour_of(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+class HourlyRollup:
+    """Hourly heatmaps kept up to date from a live event stream.
+
+    Valid exits are accumulated per (zone, hour) and `flush` upserts the
+    touched hours into `hourly_heatmaps` with the same fields as
+    HeatmapGenerator. The first time an hour is touched its accumulator is
+    seeded from events already stored, so restarting a stream mid-hour keeps
+    earlier visits. Events must be added before they are written to the event
+    store, otherwise they would be counted twice by the seeding query.
+    """
+
+    def __init__(self, store_id, zones, event_store, retain_hours=2):
+        self.store_id = str(store_id)
+        self.zone_map = {str(z['_id']): z for z in zones}
+        self.event_store = event_store
+        self.retain_hours = retain_hours  # Late exits (e.g. stale visits) can land in earlier hours
+        self.hours = {}  # (zone_id, hour_start) -> accumulator
+        self.dirty = set()
+
+    def _accumulator(self, zone_id, hour_start):
+        key = (zone_id, hour_start)
+        if key not in self.hours:
+            stored = self.event_store.find({
+                'store_id': self.store_id,
+                'zone_id': zone_id,
+                'event_type': EXIT,
+                'is_valid_visit': True,
+                'timestamp': {'$gte': hour_start, '$lt': hour_start + timedelta(hours=1)}
+            }, ('person_id', 'dwell_time'))
+            self.hours[key] = {
+                'visit_count': len(stored),
+                'persons': {e['person_id'] for e in stored},
+                'dwell_times': [e['dwell_time'] for e in stored if e.get('dwell_time')]
+            }
+        return self.hours[key]
+
+    def add(self, events):
+        for event in events:
+            if event.event_type != EXIT or not event.is_valid_visit or event.zone_id not in self.zone_map:
+                continue
+
+            hour_start = hour_of(event.timestamp)
+            accumulator = self._accumulator(event.zone_id, hour_start)
+            accumulator['visit_count'] += 1
+            accumulator['persons'].add(event.person_id)
+            if event.dwell_time:
+                accumulator['dwell_times'].append(event.dwell_time)
+            self.dirty.add((event.zone_id, hour_start))
+
+    @timed('rollup_flush')
+    def flush(self, now):
+        """Upsert every hour touched since the last flush and drop hours older than retain_hours"""
+        for zone_id, hour_start in self.dirty:
+            zone = self.zone_map[zone_id]
+            accumulator = self.hours[(zone_id, hour_start)]
+            dwell_times = accumulator['dwell_times']
+            total_dwell = sum(dwell_times)
+            avg_dwell = total_dwell / len(dwell_times) if dwell_times else 0.0
+
+            sync_hourly_heatmaps.update_one(
+                {'store_id': self.store_id, 'zone_id': zone_id, 'hour_start': hour_start},
+                {
+                    '$set': {
+                        'zone_name': zone.get('name', zone.get('zone_identifier')),
+                        'camera_id': zone['camera_id'],
+                        'hour_end': hour_start + timedelta(hours=1),
+                        'visit_count': accumulator['visit_count'],
+                        'unique_visitors': len(accumulator['persons']),
+                        'total_dwell_time': round(total_dwell, 2),
+                        'avg_dwell_time': round(avg_dwell, 2),
+                        'crowd_density': round(accumulator['visit_count'] / 60.0, 4),
+                        'updated_at': datetime.utcnow()
+                    },
+                    '$setOnInsert': {'created_at': datetime.utcnow()}
+                },
+                upsert=True
+            )
+        flushed = len(self.dirty)
+        self.dirty.clear()
+
+        oldest = hour_of(now) - timedelta(hours=self.retain_hours)
+        for key in [key for key in self.hours if key[1] < oldest]:
+            del self.hours[key]
+        return flushed
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from ..database.connection import sync_zone_transitions
+from ..utils.metrics import timed
+from .events import EXIT
+from .rollups import hour_of
+
+
+class TransitionTracker:
+    """Zone-to-zone transition counts per hour for one camera, maintained as visits end.
+
+    A transition A -> B is counted when a person's valid visit to B ends and
+    their previous valid visit was to A, ended at most `max_gap_seconds`
+    before B was entered. Pass-through (invalid) visits neither count nor
+    break a path. Each (hour of entering B, A, B) cell keeps the count and
+    the total/min/max gap between leaving A and entering B, so funnel and
+    path queries only read zones x zones documents per hour.
+
+    Trackers are per camera: each camera's video runs on its own timeline,
+    so visits of different cameras can't be ordered against each other.
+    """
+
+    def __init__(self, store_id, camera_id, max_gap_seconds=1800):
+        self.store_id = str(store_id)
+        self.camera_id = camera_id
+        self.max_gap_seconds = max_gap_seconds
+        self.last_exit = {}  # person_id -> (zone_id, exit_time) of the last valid visit
+        self.cells = {}  # (hour_start, from_zone, to_zone) -> [count, gap_total, gap_min, gap_max]
+
+    def observe(self, events):
+        """Feed zone events in the order they were produced; only valid exits matter"""
+        for event in events:
+            if event.event_type != EXIT or not event.is_valid_visit:
+                continue
+
+            entry_time = event.timestamp - timedelta(seconds=event.dwell_time)
+            previous = self.last_exit.get(event.person_id)
+            if previous and previous[0] != event.zone_id:
+                gap = (entry_time - previous[1]).total_seconds()
+                if 0 <= gap <= self.max_gap_seconds:
+                    self._count(hour_of(entry_time), previous[0], event.zone_id, gap)
+
+            self.last_exit[event.person_id] = (event.zone_id, event.timestamp)
+
+    def _count(self, hour_start, from_zone, to_zone, gap):
+        cell = self.cells.get((hour_start, from_zone, to_zone))
+        if cell is None:
+            self.cells[(hour_start, from_zone, to_zone)] = [1, gap, gap, gap]
+        else:
+            cell[0] += 1
+            cell[1] += gap
+            cell[2] = min(cell[2], gap)
+            cell[3] = max(cell[3], gap)
+
+    def forget_before(self, timestamp):
+        """Drop last exits that can no longer start a transition"""
+        oldest = timestamp - timedelta(seconds=self.max_gap_seconds)
+        self.last_exit = {
+            person_id: last for person_id, last in self.last_exit.items() if last[1] >= oldest
+        }
+
+    @timed('transitions_flush')
+    def flush(self, replace=False):
+        """Persist counted cells to `zone_transitions` and clear them.
+
+        With `replace`, this camera's stored cells in every hour counted here are
+        replaced (a batch run that saw all of those hours); otherwise counts are
+        added to what is stored (a live stream flushing as it goes).
+        """
+        if not self.cells:
+            return 0
+
+        if replace:
+            hours = sorted({hour_start for hour_start, _, _ in self.cells})
+            sync_zone_transitions.delete_many({
+                'store_id': self.store_id, 'camera_id': self.camera_id, 'hour_start': {'$in': hours}
+            })
+            sync_zone_transitions.insert_many([
+                {
+                    'store_id': self.store_id,
+                    'camera_id': self.camera_id,
+                    'hour_start': hour_start,
+                    'from_zone': from_zone,
+                    'to_zone': to_zone,
+                    'count': count,
+                    'gap_total': gap_total,
+                    'gap_min': gap_min,
+                    'gap_max': gap_max,
+                    'updated_at': datetime.utcnow()
+                }
+                for (hour_start, from_zone, to_zone), (count, gap_total, gap_min, gap_max) in self.cells.items()
+            ])
+        else:
+            sync_zone_transitions.bulk_write([
+                UpdateOne(
+                    {
+                        'store_id': self.store_id, 'camera_id': self.camera_id,
+                        'hour_start': hour_start, 'from_zone': from_zone, 'to_zone': to_zone
+                    },
+                    {
+                        '$inc': {'count': count, 'gap_total': gap_total},
+                        '$min': {'gap_min': gap_min},
+                        '$max': {'gap_max': gap_max},
+                        '$set': {'updated_at': datetime.utcnow()}
+                    },
+                    upsert=True
+                )
+                for (hour_start, from_zone, to_zone), (count, gap_total, gap_min, gap_max) in self.cells.items()
+            ], ordered=False)
+
+        flushed = len(self.cells)
+        self.cells = {}
+        return flushed
+
+    def get_state(self):
+        """Snapshot for processing checkpoints (lists, since person ids aren't valid BSON keys)"""
+        return {
+            'last_exit': [[person_id, zone_id, exit_time] for person_id, (zone_id, exit_time) in self.last_exit.items()],
+            'cells': [list(key) + cell for key, cell in self.cells.items()]
+        }
+
+    def load_state(self, state):
+        self.last_exit = {person_id: (zone_id, exit_time) for person_id, zone_id, exit_time in state['last_exit']}
+        self.cells = {tuple(row[:3]): list(row[3:]) for row in state['cells']}
+
+
+def delete_camera_transitions(store_id, camera_id, start, end):
+    """Remove a camera's stored transitions in the hours covering [start, end], e.g. before its events are re-derived"""
+    return sync_zone_transitions.delete_many({
+        'store_id': str(store_id), 'camera_id': camera_id, 'hour_start': {'$gte': hour_of(start), '$lte': end}
+    }).deleted_count
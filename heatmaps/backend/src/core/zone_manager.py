@@ -1,14 +1,45 @@
 from datetime import datetime, timedelta
 from ..utils.geometry import point_in_polygon, calculate_bbox_center
+from ..utils.metrics import timed
+from .events import ZoneEvent, ENTRY, EXIT
 
 class ZoneManager:
-    def __init__(self, zones, visit_timeout_seconds=300):
+    def __init__(self, zones, visit_timeout_seconds=300, transitions=None):
         self.zones = zones
+        self.zone_map = {z['_id']: z for z in zones}
+        self.zone_keys = {z['_id']: str(z['_id']) for z in zones}  # Event zone_id, computed once per zone
         self.active_visits = {}
         self.visit_timeout_seconds = visit_timeout_seconds  # 5 minutes default
+        self.last_cleaned_timestamp = None
+        self.transitions = transitions  # Optional TransitionTracker fed with every exit
         
+    def _observe(self, events):
+        if self.transitions is not None and events:
+            self.transitions.observe(events)
+        return events
+        
+    def make_exit_event(self, person_id, zone_id, entry_time, exit_time, rejection_reason="below_minimum_dwell"):
+        """Build an exit event with dwell measured up to exit_time, or None if the zone is unknown"""
+        zone = self.zone_map.get(zone_id)
+        if not zone:
+            return None
+        
+        dwell_time = (exit_time - entry_time).total_seconds()
+        minimum_threshold = zone.get('minimum_dwell_threshold', 5)
+        is_valid = dwell_time >= minimum_threshold
+        
+        return ZoneEvent(
+            self.zone_keys[zone_id], zone['camera_id'], person_id, EXIT, exit_time,
+            dwell_time, is_valid, None if is_valid else rejection_reason
+        )
+    
     def clean_stale_visits(self, current_timestamp):
         """Remove visits that haven't been seen for longer than timeout period"""
+        # Nothing can become stale again until time moves on
+        if current_timestamp == self.last_cleaned_timestamp:
+            return []
+        self.last_cleaned_timestamp = current_timestamp
+        
         stale_visits = []
         
         for person_id, visit_data in self.active_visits.items():
@@ -22,30 +53,16 @@ class ZoneManager:
         events = []
         for person_id in stale_visits:
             visit_data = self.active_visits[person_id]
-            zone_id = visit_data['zone_id']
-            entry_time = visit_data['entry_time']
-            last_seen = visit_data['last_seen']
-            
-            # Calculate dwell time from entry to last seen
-            dwell_time = (last_seen - entry_time).total_seconds()
-            
-            # Find the zone
-            zone = next((z for z in self.zones if z['_id'] == zone_id), None)
             
-            if zone:
-                minimum_threshold = zone.get('minimum_dwell_threshold', 5)
-                is_valid = dwell_time >= minimum_threshold
-                
-                exit_event = {
-                    'zone_id': str(zone_id),
-                    'camera_id': zone['camera_id'],
-                    'person_id': person_id,
-                    'event_type': 'exit',
-                    'timestamp': last_seen,  # Use last seen time, not current time
-                    'dwell_time': dwell_time,
-                    'is_valid_visit': is_valid,
-                    'rejection_reason': None if is_valid else "stale_visit_timeout"
-                }
+            # Use last seen time, not current time, for both the exit and the dwell
+            exit_event = self.make_exit_event(
+                person_id,
+                visit_data['zone_id'],
+                visit_data['entry_time'],
+                visit_data['last_seen'],
+                "stale_visit_timeout"
+            )
+            if exit_event:
                 events.append(exit_event)
             
             # Remove from active visits
@@ -54,24 +71,34 @@ class ZoneManager:
         if stale_visits:
             print(f"Cleaned {len(stale_visits)} stale visits from ZoneManager")
         
-        return events
+        return self._observe(events)
+        
+    def make_entry_event(self, person_id, zone, timestamp):
+        """Build an entry event for zone"""
+        return ZoneEvent(self.zone_keys[zone['_id']], zone['camera_id'], person_id, ENTRY, timestamp)
+    
+    def find_zone(self, bbox):
+        """Return the first zone containing the person's feet point, or None"""
+        person_center = calculate_bbox_center(bbox)
         
+        for zone in self.zones:
+            if point_in_polygon(person_center, zone['polygon']):
+                return zone
+        return None
+    
+    @timed('zone_check')
     def check_zones(self, person_id, bbox, timestamp):
         """Check zone entries/exits and clean stale visits periodically"""
+        return self.update_visit(person_id, self.find_zone(bbox), timestamp)
+    
+    def update_visit(self, person_id, current_zone, timestamp):
+        """Apply a sighting of person_id in current_zone (None when outside every zone)"""
         events = []
         
-        # Clean stale visits every check (minimal overhead)
+        # Clean stale visits every check (a no-op until the timestamp advances)
         stale_events = self.clean_stale_visits(timestamp)
         events.extend(stale_events)
         
-        person_center = calculate_bbox_center(bbox)
-        
-        current_zone = None
-        for zone in self.zones:
-            if point_in_polygon(person_center, zone['polygon']):
-                current_zone = zone
-                break
-        
         if person_id in self.active_visits:
             previous_zone_id = self.active_visits[person_id]['zone_id']
             
@@ -80,42 +107,21 @@ class ZoneManager:
                 self.active_visits[person_id]['last_seen'] = timestamp
             else:
                 # Exited previous zone
-                entry_time = self.active_visits[person_id]['entry_time']
-                dwell_time = (timestamp - entry_time).total_seconds()
-                
-                previous_zone = next((z for z in self.zones if z['_id'] == previous_zone_id), None)
-                
-                if previous_zone:
-                    minimum_threshold = previous_zone.get('minimum_dwell_threshold', 5)
-                    is_valid = dwell_time >= minimum_threshold
-                    
-                    exit_event = {
-                        'zone_id': str(previous_zone_id),
-                        'camera_id': previous_zone['camera_id'],
-                        'person_id': person_id,
-                        'event_type': 'exit',
-                        'timestamp': timestamp,
-                        'dwell_time': dwell_time,
-                        'is_valid_visit': is_valid,
-                        'rejection_reason': None if is_valid else "below_minimum_dwell"
-                    }
+                exit_event = self.make_exit_event(
+                    person_id,
+                    previous_zone_id,
+                    self.active_visits[person_id]['entry_time'],
+                    timestamp
+                )
+                if exit_event:
                     events.append(exit_event)
+                    self._observe([exit_event])
                 
                 del self.active_visits[person_id]
                 
                 # Entered new zone
                 if current_zone:
-                    entry_event = {
-                        'zone_id': str(current_zone['_id']),
-                        'camera_id': current_zone['camera_id'],
-                        'person_id': person_id,
-                        'event_type': 'entry',
-                        'timestamp': timestamp,
-                        'dwell_time': None,
-                        'is_valid_visit': False,
-                        'rejection_reason': None
-                    }
-                    events.append(entry_event)
+                    events.append(self.make_entry_event(person_id, current_zone, timestamp))
                     
                     self.active_visits[person_id] = {
                         'zone_id': current_zone['_id'],
@@ -125,17 +131,7 @@ class ZoneManager:
         
         elif current_zone:
             # New entry into a zone
-            entry_event = {
-                'zone_id': str(current_zone['_id']),
-                'camera_id': current_zone['camera_id'],
-                'person_id': person_id,
-                'event_type': 'entry',
-                'timestamp': timestamp,
-                'dwell_time': None,
-                'is_valid_visit': False,
-                'rejection_reason': None
-            }
-            events.append(entry_event)
+            events.append(self.make_entry_event(person_id, current_zone, timestamp))
             
             self.active_visits[person_id] = {
                 'zone_id': current_zone['_id'],
@@ -150,30 +146,17 @@ class ZoneManager:
         events = []
         
         for person_id, visit_data in list(self.active_visits.items()):
-            zone_id = visit_data['zone_id']
-            entry_time = visit_data['entry_time']
-            dwell_time = (final_timestamp - entry_time).total_seconds()
-            
-            zone = next((z for z in self.zones if z['_id'] == zone_id), None)
-            
-            if zone:
-                minimum_threshold = zone.get('minimum_dwell_threshold', 5)
-                is_valid = dwell_time >= minimum_threshold
-                
-                exit_event = {
-                    'zone_id': str(zone_id),
-                    'camera_id': zone['camera_id'],
-                    'person_id': person_id,
-                    'event_type': 'exit',
-                    'timestamp': final_timestamp,
-                    'dwell_time': dwell_time,
-                    'is_valid_visit': is_valid,
-                    'rejection_reason': None if is_valid else "below_minimum_dwell"
-                }
+            exit_event = self.make_exit_event(
+                person_id,
+                visit_data['zone_id'],
+                visit_data['entry_time'],
+                final_timestamp
+            )
+            if exit_event:
                 events.append(exit_event)
         
         self.active_visits.clear()
-        return events
+        return self._observe(events)
     
     def get_active_visits_count(self):
         """Get the number of currently active visits"""
@@ -1,41 +1,109 @@
+import threading
 from motor.motor_asyncio import AsyncIOMotorClient
-from pymongo import MongoClient
 from ..config.settings import settings
 
 # Async client for FastAPI
 async_client = AsyncIOMotorClient(settings.mongodb_url)
 async_db = async_client[settings.database_name]
 
-# Sync client for processing
-sync_client = MongoClient(settings.mongodb_url)
-sync_db = sync_client[settings.database_name]
-
 # Async collections
 stores_collection = async_db.stores
 cameras_collection = async_db.cameras
 zones_collection = async_db.zones
 zone_events_collection = async_db.zone_events
+zone_event_buckets_collection = async_db.zone_event_buckets
 hourly_heatmaps_collection = async_db.hourly_heatmaps
+zone_transitions_collection = async_db.zone_transitions
+hourly_occupancy_collection = async_db.hourly_occupancy
 daily_heatmaps_collection = async_db.daily_heatmaps
 daily_insights_collection = async_db.daily_insights
+processing_checkpoints_collection = async_db.processing_checkpoints
+
+# Sync collections for processing, resolved on first use (see __getattr__)
+SYNC_COLLECTIONS = {
+    'sync_stores': 'stores',
+    'sync_cameras': 'cameras',
+    'sync_zones': 'zones',
+    'sync_zone_events': 'zone_events',
+    'sync_zone_event_buckets': 'zone_event_buckets',
+    'sync_hourly_heatmaps': 'hourly_heatmaps',
+    'sync_zone_transitions': 'zone_transitions',
+    'sync_hourly_occupancy': 'hourly_occupancy',
+    'sync_daily_heatmaps': 'daily_heatmaps',
+    'sync_daily_insights': 'daily_insights',
+    'sync_processing_checkpoints': 'processing_checkpoints'
+}
+
+_sync_lock = threading.Lock()
+
+
+def get_sync_db():
+    """Sync database for processing, connected on first use.
+
+    API processes that only serve reads never open the second connection pool.
+    """
+    global sync_client, sync_db
+    with _sync_lock:
+        if 'sync_db' not in globals():
+            from pymongo import MongoClient
+            sync_client = MongoClient(settings.mongodb_url)
+            sync_db = sync_client[settings.database_name]
+        return sync_db
+
+
+def __getattr__(name):
+    # Only called for names not set yet: sync_client, sync_db and the sync collections
+    if name in ('sync_client', 'sync_db'):
+        get_sync_db()
+        return globals()[name]
+    if name in SYNC_COLLECTIONS:
+        collection = globals()[name] = get_sync_db()[SYNC_COLLECTIONS[name]]
+        return collection
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Sync collections
-sync_stores = sync_db.stores
-sync_cameras = sync_db.cameras
-sync_zones = sync_db.zones
-sync_zone_events = sync_db.zone_events
-sync_hourly_heatmaps = sync_db.hourly_heatmaps
-sync_daily_heatmaps = sync_db.daily_heatmaps
-sync_daily_insights = sync_db.daily_insights
+async def drop_duplicate_hourly_heatmaps():
+    """Keep one hourly heatmap per (store, zone, hour); batch jobs used to insert a row per run"""
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {"$group": {
+            "_id": {"store_id": "$store_id", "zone_id": "$zone_id", "hour_start": "$hour_start"},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+    removed = 0
+    async for group in hourly_heatmaps_collection.aggregate(pipeline, allowDiskUse=True):
+        # The last inserted row is the newest aggregation
+        result = await hourly_heatmaps_collection.delete_many({"_id": {"$in": group["ids"][:-1]}})
+        removed += result.deleted_count
+    if removed:
+        print(f"Removed {removed} duplicate hourly heatmaps")
 
 async def init_db():
     """Create indexes"""
     await cameras_collection.create_index("store_id")
+    await cameras_collection.create_index("content_hash", sparse=True)
     await zones_collection.create_index("camera_id")
     await zone_events_collection.create_index([("store_id", 1), ("timestamp", 1)])
     await zone_events_collection.create_index("zone_id")
     await zone_events_collection.create_index("person_id")
+    await zone_events_collection.create_index("event_key", unique=True, sparse=True)
+    await zone_events_collection.create_index([("run_id", 1), ("seq", 1)])
+    await zone_event_buckets_collection.create_index([("store_id", 1), ("minute", 1)])
+    await zone_event_buckets_collection.create_index([("zone_id", 1), ("minute", 1)])
+    # Retention sets expire_at once a day is archived
+    await zone_events_collection.create_index("expire_at", expireAfterSeconds=0)
+    await zone_event_buckets_collection.create_index("expire_at", expireAfterSeconds=0)
     await hourly_heatmaps_collection.create_index([("store_id", 1), ("hour_start", 1)])
+    # Batch aggregation and live rollups both upsert on this key
+    await drop_duplicate_hourly_heatmaps()
+    await hourly_heatmaps_collection.create_index([("store_id", 1), ("zone_id", 1), ("hour_start", 1)], unique=True)
+    await zone_transitions_collection.create_index([("store_id", 1), ("hour_start", 1)])
+    await zone_transitions_collection.create_index([("store_id", 1), ("camera_id", 1), ("hour_start", 1)])
+    await hourly_occupancy_collection.create_index([("store_id", 1), ("hour_start", 1)])
+    await hourly_occupancy_collection.create_index([("store_id", 1), ("camera_id", 1), ("hour_start", 1)])
     await daily_heatmaps_collection.create_index([("store_id", 1), ("date", 1)])
     await daily_insights_collection.create_index([("store_id", 1), ("date", 1)])
+    await processing_checkpoints_collection.create_index("store_id")
     print("Database indexes created")
\ No newline at end of file
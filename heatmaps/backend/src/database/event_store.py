@@ -0,0 +1,149 @@
+from datetime import datetime
+from . import connection
+from .event_writer import EventWriter, BucketEventWriter, bucket_minute
+from ..core.events import BUCKET_FIELDS
+from ..config.settings import settings
+
+# Fields stored once per bucket document rather than per event
+BUCKET_LEVEL_FIELDS = ('store_id', 'camera_id', 'zone_id')
+
+# Every stored field of an event apart from store_id
+EVENT_FIELDS = ('zone_id', 'camera_id', 'person_id', 'event_type', 'timestamp', 'dwell_time',
+                'is_valid_visit', 'rejection_reason', 'run_id', 'seq')
+
+
+def restore_events(store, store_id, records):
+    """Write back (run_id, seq, ZoneEvent) records under their original keys; already stored ones are ignored"""
+    runs = {}
+    for run_id, seq, event in records:
+        runs.setdefault(run_id, ([], []))
+        runs[run_id][0].append(event)
+        runs[run_id][1].append(seq)
+
+    for run_id, (events, seqs) in runs.items():
+        store.writer(store_id, run_id).insert(events, seqs)
+
+
+class DocumentEventStore:
+    """Zone events stored one document per entry/exit in `zone_events`"""
+
+    layout = 'documents'
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def writer(self, store_id, run_id, start_seq=0):
+        return EventWriter(self.collection, store_id, run_id, start_seq)
+
+    def find(self, query, fields):
+        """Events matching a zone_events query, as dicts holding `fields`"""
+        projection = {field: 1 for field in fields}
+        projection['_id'] = 0
+        return list(self.collection.find(query, projection))
+
+    def delete_run(self, store_id, camera_id, run_id):
+        """Remove the events one run wrote for a camera, e.g. before they are re-derived"""
+        return self.collection.delete_many(
+            {'store_id': str(store_id), 'camera_id': camera_id, 'run_id': run_id}
+        ).deleted_count
+
+    def set_expiry(self, store_id, start, end, expire_at):
+        """Set (or with None, clear) the TTL expiry of events in [start, end)"""
+        query = {'store_id': str(store_id), 'timestamp': {'$gte': start, '$lt': end}}
+        update = {'$set': {'expire_at': expire_at}} if expire_at else {'$unset': {'expire_at': ''}}
+        return self.collection.update_many(query, update).modified_count
+
+    def restore(self, store_id, records):
+        restore_events(self, store_id, records)
+
+
+class BucketEventStore:
+    """Zone events packed into one `zone_event_buckets` document per (camera, zone, minute).
+
+    Queries are written against the `zone_events` field names and translated:
+    store/camera/zone and a coarse time range select buckets, the rest is
+    matched on the unwound event entries.
+    """
+
+    layout = 'buckets'
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def writer(self, store_id, run_id, start_seq=0):
+        return BucketEventWriter(self.collection, store_id, run_id, start_seq)
+
+    def _pipeline(self, query, fields):
+        bucket_match = {}
+        event_match = {}
+        for field, condition in query.items():
+            if field in BUCKET_LEVEL_FIELDS:
+                bucket_match[field] = condition
+                continue
+
+            if field == 'timestamp':
+                bucket_match['minute'] = self._minute_range(condition)
+            event_match[f"events.{BUCKET_FIELDS[field]}"] = condition
+
+        projection = {'_id': 0}
+        for field in fields:
+            if field in BUCKET_LEVEL_FIELDS:
+                projection[field] = f"${field}"
+            else:
+                projection[field] = f"$events.{BUCKET_FIELDS[field]}"
+
+        pipeline = [{'$match': bucket_match}, {'$unwind': '$events'}]
+        if event_match:
+            pipeline.append({'$match': event_match})
+        pipeline.append({'$project': projection})
+        return pipeline
+
+    @staticmethod
+    def _minute_range(condition):
+        """Bucket minutes that can hold events matching a timestamp condition"""
+        if isinstance(condition, datetime):
+            return bucket_minute(condition)
+
+        minute_range = {}
+        for operator, value in condition.items():
+            if operator in ('$gte', '$gt'):
+                minute_range['$gte'] = bucket_minute(value)
+            elif operator in ('$lte', '$lt'):
+                minute_range['$lte'] = value
+            else:
+                raise ValueError(f"Unsupported timestamp operator {operator} for bucketed events")
+        return minute_range
+
+    def find(self, query, fields):
+        """Events matching a zone_events query, as dicts holding `fields`"""
+        events = list(self.collection.aggregate(self._pipeline(query, fields)))
+        for event in events:
+            for field in fields:
+                event.setdefault(field, None)
+        return events
+
+    def delete_run(self, store_id, camera_id, run_id):
+        """Remove the events one run wrote for a camera from their buckets, and buckets left empty"""
+        query = {'store_id': str(store_id), 'camera_id': camera_id}
+        result = self.collection.update_many(dict(query, **{'events.r': run_id}), {'$pull': {'events': {'r': run_id}}})
+        self.collection.delete_many(dict(query, events={'$size': 0}))
+        return result.modified_count
+
+    def set_expiry(self, store_id, start, end, expire_at):
+        """Set (or with None, clear) the TTL expiry of buckets in [start, end); bounds must be whole minutes"""
+        query = {'store_id': str(store_id), 'minute': {'$gte': start, '$lt': end}}
+        update = {'$set': {'expire_at': expire_at}} if expire_at else {'$unset': {'expire_at': ''}}
+        return self.collection.update_many(query, update).modified_count
+
+    def restore(self, store_id, records):
+        restore_events(self, store_id, records)
+
+
+def get_event_store(layout=None):
+    """Event store for the configured layout (settings.event_storage)"""
+    layout = layout or settings.event_storage
+    if layout == 'documents':
+        return DocumentEventStore(connection.sync_zone_events)
+    if layout == 'buckets':
+        return BucketEventStore(connection.sync_zone_event_buckets)
+    raise ValueError(f"Unknown event storage layout {layout!r}, expected 'documents' or 'buckets'")
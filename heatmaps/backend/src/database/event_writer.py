@@ -0,0 +1,117 @@
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from ..utils.metrics import timed, EVENTS_WRITTEN
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class EventWriter:
+    """Buffered, idempotent writer for zone events of one processing run.
+
+    Every event gets a sequence number within the run and a unique
+    `event_key` of `<run_id>:<seq>`. Re-writing an event that is already
+    stored (e.g. after resuming from a checkpoint) is silently ignored.
+    Events are buffered as ZoneEvent objects and only converted to
+    documents when a batch is flushed.
+    """
+
+    def __init__(self, collection, store_id, run_id, start_seq=0, batch_size=500):
+        self.collection = collection
+        self.store_id = str(store_id)
+        self.run_id = run_id
+        self.next_seq = start_seq
+        self.watermark = start_seq  # Every event with seq < watermark is stored
+        self.batch_size = batch_size
+        self.buffer = []
+
+    def write(self, events):
+        """Queue events, flushing when the buffer is full"""
+        self.buffer.extend(events)
+        self.next_seq = self.watermark + len(self.buffer)
+
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered events and advance the watermark"""
+        if self.buffer:
+            # Buffered events always start at the watermark
+            self.insert(self.buffer, range(self.watermark, self.next_seq))
+            self.buffer = []
+
+        self.watermark = self.next_seq
+        return self.watermark
+
+    @timed('db_write')
+    def insert(self, events, seqs):
+        """Write events with the given sequence numbers now, ignoring ones already stored"""
+        try:
+            self._insert(events, seqs)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if any(error.get('code') != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+        EVENTS_WRITTEN.inc(len(events), self.store_id)
+
+    def _insert(self, events, seqs):
+        documents = [
+            event.to_document(self.store_id, self.run_id, seq)
+            for seq, event in zip(seqs, events)
+        ]
+        self.collection.insert_many(documents, ordered=False)
+
+    def discard_after_watermark(self):
+        """Delete events of this run written after the watermark (left over by an interrupted run)"""
+        result = self.collection.delete_many({'run_id': self.run_id, 'seq': {'$gte': self.watermark}})
+        return result.deleted_count
+
+
+def bucket_minute(timestamp):
+    return timestamp.replace(second=0, microsecond=0)
+
+
+class BucketEventWriter(EventWriter):
+    """EventWriter for the bucketed layout: one document per (camera, zone, minute).
+
+    Each flush appends a batch's events to their buckets with one upsert per
+    bucket. An upsert only matches a bucket that does not already hold the
+    batch's first (run_id, seq), so replaying a flushed batch collides on
+    `_id` and is ignored like a duplicate insert.
+    """
+
+    def _insert(self, events, seqs):
+        buckets = {}
+        for seq, event in zip(seqs, events):
+            minute = bucket_minute(event.timestamp)
+            key = (event.camera_id, event.zone_id, minute)
+            if key not in buckets:
+                buckets[key] = (seq, [])
+            buckets[key][1].append(event.to_bucket_entry(self.run_id, seq))
+
+        operations = []
+        for (camera_id, zone_id, minute), (bucket_first_seq, entries) in buckets.items():
+            operations.append(UpdateOne(
+                {
+                    '_id': f"{self.store_id}:{camera_id}:{zone_id}:{minute:%Y%m%d%H%M}",
+                    'events': {'$not': {'$elemMatch': {'r': self.run_id, 's': bucket_first_seq}}}
+                },
+                {
+                    '$setOnInsert': {
+                        'store_id': self.store_id,
+                        'camera_id': camera_id,
+                        'zone_id': zone_id,
+                        'minute': minute
+                    },
+                    '$push': {'events': {'$each': entries}}
+                },
+                upsert=True
+            ))
+        self.collection.bulk_write(operations, ordered=False)
+
+    def discard_after_watermark(self):
+        """Remove events of this run written after the watermark from their buckets"""
+        result = self.collection.update_many(
+            {'events.r': self.run_id},
+            {'$pull': {'events': {'r': self.run_id, 's': {'$gte': self.watermark}}}}
+        )
+        return result.modified_count
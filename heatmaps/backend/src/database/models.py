@@ -38,6 +38,8 @@ class Camera(BaseModel):
     resolution_width: Optional[int] = None
     resolution_height: Optional[int] = None
     fps: Optional[float] = None
+    frame_count: Optional[int] = None
+    content_hash: Optional[str] = None  # SHA-256 of the uploaded video, to reuse identical uploads
     status: str = "active"
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -122,7 +124,7 @@ class DailyHeatmap(BaseModel):
         populate_by_name = True
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
-s
+
 class DailyInsights(BaseModel):
     """End-of-day insights summary"""
     id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
@@ -0,0 +1,163 @@
+import os
+from datetime import datetime, timedelta
+import numpy as np
+from .connection import sync_daily_heatmaps
+from .event_store import get_event_store, EVENT_FIELDS
+from ..core.events import ZoneEvent
+from ..utils.metrics import timed
+
+# Stored as fixed-width unicode arrays, so archives load without pickling
+STRING_COLUMNS = ('zone_id', 'camera_id', 'person_id', 'event_type', 'rejection_reason', 'run_id')
+
+
+class EventArchive:
+    """Compressed columnar archive of zone events, one `.npz` file per store and day.
+
+    Files live at `<root>/<store_id>/<YYYY-MM-DD>.npz` and hold one array per
+    event field. Missing dwell times are NaN and missing rejection reasons
+    are empty strings.
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    def path(self, store_id, day):
+        return os.path.join(self.root_dir, str(store_id), f"{day:%Y-%m-%d}.npz")
+
+    def days(self, store_id):
+        """Archived days of a store, oldest first"""
+        store_dir = os.path.join(self.root_dir, str(store_id))
+        if not os.path.isdir(store_dir):
+            return []
+        return sorted(
+            datetime.strptime(name[:-len('.npz')], '%Y-%m-%d')
+            for name in os.listdir(store_dir) if name.endswith('.npz')
+        )
+
+    def write(self, store_id, day, events):
+        """Write the day's events (dicts with EVENT_FIELDS), replacing any previous archive"""
+        columns = {}
+        for field in STRING_COLUMNS:
+            columns[field] = np.array([e[field] or '' for e in events], dtype=str)
+        columns['timestamp'] = np.array([e['timestamp'] for e in events], dtype='datetime64[us]')
+        columns['dwell_time'] = np.array(
+            [np.nan if e['dwell_time'] is None else e['dwell_time'] for e in events], dtype=np.float64
+        )
+        columns['is_valid_visit'] = np.array([bool(e['is_valid_visit']) for e in events], dtype=bool)
+        columns['seq'] = np.array([e['seq'] for e in events], dtype=np.int64)
+
+        path = self.path(store_id, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}.npz"
+        np.savez_compressed(tmp_path, **columns)
+        os.replace(tmp_path, path)
+        return path
+
+    def load(self, store_id, day):
+        """Columns of an archived day, or None if the day was never archived"""
+        path = self.path(store_id, day)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as archive:
+            return {name: archive[name] for name in archive.files}
+
+    @staticmethod
+    def records(columns):
+        """Turn archived columns back into (run_id, seq, ZoneEvent) records"""
+        timestamps = columns['timestamp'].tolist()
+        dwell_times = columns['dwell_time'].tolist()
+        records = []
+        for i in range(len(timestamps)):
+            dwell_time = None if np.isnan(dwell_times[i]) else dwell_times[i]
+            event = ZoneEvent(
+                str(columns['zone_id'][i]), str(columns['camera_id'][i]), str(columns['person_id'][i]),
+                str(columns['event_type'][i]), timestamps[i], dwell_time,
+                bool(columns['is_valid_visit'][i]), str(columns['rejection_reason'][i]) or None
+            )
+            records.append((str(columns['run_id'][i]), int(columns['seq'][i]), event))
+        return records
+
+
+class EventRetention:
+    """Archive and expire a store's raw zone events once they are captured in rollups.
+
+    A day is eligible when it is older than `retain_days` and has daily heatmaps
+    generated after the day ended. Its events are archived (merged with any
+    earlier archive of the day) and then given an `expire_at` so MongoDB's TTL
+    monitor deletes them. Days without rollups are kept.
+    """
+
+    def __init__(self, store_id, archive_dir, retain_days, event_store=None):
+        self.store_id = str(store_id)
+        self.archive = EventArchive(archive_dir)
+        self.retain_days = retain_days
+        self.event_store = event_store or get_event_store()
+
+    def rolled_up_days(self, before):
+        """Days before `before` whose daily heatmaps were generated after the day was over"""
+        days = set()
+        for heatmap in sync_daily_heatmaps.find(
+            {'store_id': self.store_id, 'date': {'$lt': before}}, {'date': 1, 'created_at': 1}
+        ):
+            day = heatmap['date'].replace(hour=0, minute=0, second=0, microsecond=0)
+            if heatmap.get('created_at') and heatmap['created_at'] >= day + timedelta(days=1):
+                days.add(day)
+        return sorted(days)
+
+    def _day_events(self, day):
+        return self.event_store.find(
+            {'store_id': self.store_id, 'timestamp': {'$gte': day, '$lt': day + timedelta(days=1)}},
+            EVENT_FIELDS
+        )
+
+    def archive_day(self, day, expire_at):
+        """Archive one day's raw events and schedule them for expiry; returns the archived count"""
+        events = self._day_events(day)
+        if not events:
+            return 0
+
+        # Keep events archived earlier (e.g. before a re-hydration), de-duplicated by run and seq
+        merged = {}
+        previous = self.archive.load(self.store_id, day)
+        if previous is not None:
+            for run_id, seq, event in self.archive.records(previous):
+                merged[(run_id, seq)] = dict(
+                    {field: getattr(event, field) for field in ZoneEvent.__slots__}, run_id=run_id, seq=seq
+                )
+        for event in events:
+            merged[(event['run_id'], event['seq'])] = event
+
+        archived = sorted(merged.values(), key=lambda e: (e['timestamp'], e['run_id'], e['seq']))
+        path = self.archive.write(self.store_id, day, archived)
+        self.event_store.set_expiry(self.store_id, day, day + timedelta(days=1), expire_at)
+        print(f"Archived {len(archived)} events of {day:%Y-%m-%d} to {path}")
+        return len(archived)
+
+    @timed('retention')
+    def run(self, now=None):
+        """Archive and expire every eligible day; returns {day: archived event count}"""
+        now = now or datetime.utcnow()
+        cutoff = (now - timedelta(days=self.retain_days)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        archived = {}
+        for day in self.rolled_up_days(cutoff):
+            count = self.archive_day(day, now)
+            if count:
+                archived[f"{day:%Y-%m-%d}"] = count
+        return archived
+
+    def rehydrate(self, day):
+        """Restore an archived day's events into the event store for backfill or re-aggregation.
+
+        Events still awaiting TTL deletion are kept rather than duplicated. The
+        day is archived and expired again by the next retention run.
+        """
+        columns = self.archive.load(self.store_id, day)
+        if columns is None:
+            return None
+
+        self.event_store.set_expiry(self.store_id, day, day + timedelta(days=1), None)
+        records = self.archive.records(columns)
+        self.event_store.restore(self.store_id, records)
+        print(f"Re-hydrated {len(records)} archived events of {day:%Y-%m-%d}")
+        return len(records)
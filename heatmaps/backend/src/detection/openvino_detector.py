@@ -1,16 +1,28 @@
 import cv2
 import numpy as np
 from openvino.runtime import Core
+from ..utils.metrics import timed
+from ..utils.profiling import LayerProfile
 
 class OpenVINOPersonDetector:
-    def __init__(self, model_path, confidence_threshold=0.5):
+    def __init__(self, model_path, confidence_threshold=0.5, perf_counters=False, server=None):
         self.confidence_threshold = confidence_threshold
+        self.server = server  # Shared InferenceServer; no model of our own is compiled
+        self.layer_profile = None
+        if server:
+            self.input_shape = server.input_shape
+            return
+        
         ie = Core()
         model = ie.read_model(model=model_path)
-        self.compiled_model = ie.compile_model(model=model, device_name="CPU")
+        config = {"PERF_COUNT": "YES"} if perf_counters else {}
+        self.compiled_model = ie.compile_model(model=model, device_name="CPU", config=config)
         self.input_layer = self.compiled_model.input(0)
         self.output_layer = self.compiled_model.output(0)
         self.input_shape = self.input_layer.shape
+        # Per-layer timings need an infer request we can read the counters from
+        self.infer_request = self.compiled_model.create_infer_request() if perf_counters else None
+        self.layer_profile = LayerProfile("person_detection") if perf_counters else None
         
     def preprocess_frame(self, frame):
         n, c, h, w = self.input_shape
@@ -19,10 +31,20 @@ class OpenVINOPersonDetector:
         input_image = np.expand_dims(input_image, 0)
         return input_image
     
+    def infer(self, input_image):
+        if self.server:
+            return self.server.infer(input_image)
+        if self.infer_request is None:
+            return self.compiled_model([input_image])[self.output_layer]
+        result = self.infer_request.infer([input_image])[self.output_layer]
+        self.layer_profile.add(self.infer_request)
+        return result
+    
+    @timed('detect')
     def detect(self, frame):
         original_h, original_w = frame.shape[:2]
         input_image = self.preprocess_frame(frame)
-        result = self.compiled_model([input_image])[self.output_layer]
+        result = self.infer(input_image)
         
         detections = []
         for detection in result[0][0]:
@@ -38,4 +60,19 @@ class OpenVINOPersonDetector:
                     'confidence': confidence
                 })
         
-        return detections
\ No newline at end of file
+        return detections
+    
+    def detect_regions(self, frame, regions):
+        """Run detection on each [x_min, y_min, x_max, y_max] crop and return boxes in frame coordinates"""
+        detections = []
+        for x_min, y_min, x_max, y_max in regions:
+            crop = frame[y_min:y_max, x_min:x_max]
+            if crop.size == 0:
+                continue
+            
+            for detection in self.detect(crop):
+                bx_min, by_min, bx_max, by_max = detection['bbox']
+                detection['bbox'] = [bx_min + x_min, by_min + y_min, bx_max + x_min, by_max + y_min]
+                detections.append(detection)
+        
+        return detections
@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from openvino.runtime import Core, Dimension
+from ..utils.metrics import registry
+
+DETECTION = 'detection'  # SSD output: one [image_id, label, conf, x_min, y_min, x_max, y_max] list for the batch
+ROWS = 'rows'  # One output row per input image (Re-ID embeddings)
+
+BATCH_SIZE = registry.histogram(
+    "heatmaps_inference_batch_size", "Requests per batched inference", ("model",), buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+QUEUE_SECONDS = registry.histogram(
+    "heatmaps_inference_queue_seconds", "Time a request waited for its batch to run", ("model",)
+)
+
+
+class InferenceRequest:
+    __slots__ = ('input_image', 'future', 'enqueued_at')
+
+    def __init__(self, input_image):
+        self.input_image = input_image
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class InferenceServer:
+    """One compiled OpenVINO model shared by every pipeline thread of the process.
+
+    Callers submit single images ([1, C, H, W]) and get a Future of that
+    image's output in the model's single-image layout, so they can't tell
+    it from a batch-1 model. Worker threads take the oldest request and,
+    while other threads are also submitting, wait up to `max_wait_ms` for
+    more requests to fill a batch of at most `max_batch_size`. A single
+    caller never waits: its requests run as soon as the previous batch is
+    done, batched only with what it queued at once.
+    """
+
+    def __init__(self, model_path, kind, max_batch_size=8, max_wait_ms=5.0, workers=1, name=None):
+        self.kind = kind
+        self.name = name or kind
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        ie = Core()
+        model = ie.read_model(model=model_path)
+        shape = model.input(0).partial_shape
+        shape[0] = Dimension(1, max_batch_size)
+        model.reshape({model.input(0): shape})
+        # With several workers, each runs its batches on its own CPU stream
+        config = {"PERFORMANCE_HINT": "THROUGHPUT", "NUM_STREAMS": str(workers)} if workers > 1 \
+            else {"PERFORMANCE_HINT": "LATENCY"}
+        self.compiled_model = ie.compile_model(model=model, device_name="CPU", config=config)
+        self.output_layer = self.compiled_model.output(0)
+        self.input_shape = [1] + [dimension.get_length() for dimension in list(shape)[1:]]
+
+        self.requests = queue.Queue()
+        self.submitters = {}  # thread id -> monotonic time of its last submit
+        self.threads = [
+            threading.Thread(target=self._run, name=f"inference-{self.name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, input_image):
+        """Queue one [1, C, H, W] image; returns a Future of its output"""
+        request = InferenceRequest(input_image)
+        self.submitters[threading.get_ident()] = request.enqueued_at
+        self.requests.put(request)
+        return request.future
+
+    def infer(self, input_image):
+        return self.submit(input_image).result()
+
+    def _concurrent(self, now):
+        """Whether more than one thread submitted within the last second"""
+        recent = 0
+        for thread_id, submitted_at in list(self.submitters.items()):
+            if now - submitted_at < 1.0:
+                recent += 1
+            else:
+                self.submitters.pop(thread_id, None)
+        return recent > 1
+
+    def _collect(self):
+        batch = [self.requests.get()]
+        deadline = batch[0].enqueued_at + self.max_wait if self._concurrent(time.monotonic()) else 0
+        while len(batch) < self.max_batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                batch.append(self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        infer_request = self.compiled_model.create_infer_request()
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            for request in batch:
+                QUEUE_SECONDS.observe(started - request.enqueued_at, self.name)
+            BATCH_SIZE.observe(len(batch), self.name)
+            try:
+                inputs = np.concatenate([request.input_image for request in batch])
+                output = infer_request.infer([inputs])[self.output_layer]
+                for i, request in enumerate(batch):
+                    request.future.set_result(self._split(output, i))
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _split(self, output, index):
+        """Output of the batch's index-th image, shaped as if it ran alone"""
+        if self.kind == DETECTION:
+            rows = output[0, 0]
+            # The list ends at the first image_id of -1; rows after it are padding
+            end = np.flatnonzero(rows[:, 0] == -1)
+            if len(end):
+                rows = rows[:end[0]]
+            rows = rows[rows[:, 0] == index]
+            rows[:, 0] = 0
+            return rows[np.newaxis, np.newaxis]
+        return output[index:index + 1]
+
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+def get_inference_server(model_path, kind, **options):
+    """The process's server for a model, started on first use"""
+    with _servers_lock:
+        server = _servers.get(model_path)
+        if server is None:
+            server = _servers[model_path] = InferenceServer(model_path, kind, **options)
+            print(f"Started shared inference server for {model_path} "
+                  f"(batches of up to {server.max_batch_size}, {server.max_wait * 1000:g}ms budget)")
+        return server
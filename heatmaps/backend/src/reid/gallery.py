@@ -0,0 +1,184 @@
+import numpy as np
+
+SUPPORTED_DTYPES = ('float32', 'float16', 'int8')
+
+
+class EmbeddingGallery:
+    """Re-ID embeddings packed into one contiguous matrix, optionally quantized.
+
+    Behaves like a dict of person id -> float32 embedding. Rows are stored as
+    float32, float16 (half the memory) or int8 with a per-vector scale
+    (a quarter of the memory, row ~= scale * q with |q| <= 127). Cosine
+    similarity is computed block by block from the stored rows, so a scan
+    reads the compact representation and never materialises a float32 copy
+    of the whole gallery.
+    """
+
+    def __init__(self, dtype='float32', block_rows=4096):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported embedding dtype {dtype!r}, expected one of {SUPPORTED_DTYPES}")
+        self.dtype = np.dtype(dtype)
+        self.block_rows = block_rows
+        self.ids = []  # row -> person id
+        self.index = {}  # person id -> row
+        self.matrix = None  # (capacity, dim) in self.dtype
+        self.scales = None  # (capacity,) dequantization scale, 1.0 unless int8
+        self.norms = None  # (capacity,) L2 norm of each dequantized row
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, person_id):
+        return person_id in self.index
+
+    def __iter__(self):
+        return iter(list(self.ids))
+
+    def keys(self):
+        return list(self.ids)
+
+    def items(self):
+        return [(person_id, self[person_id]) for person_id in self.ids]
+
+    def __getitem__(self, person_id):
+        row = self.index[person_id]
+        return self.matrix[row].astype(np.float32) * self.scales[row]
+
+    def __setitem__(self, person_id, embedding):
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        row = self.index.get(person_id)
+        if row is None:
+            self._ensure_capacity(len(self.ids) + 1, embedding.shape[0])
+            row = len(self.ids)
+            self.ids.append(person_id)
+            self.index[person_id] = row
+
+        stored, scale = self._quantize(embedding)
+        self.matrix[row] = stored
+        self.scales[row] = scale
+        self.norms[row] = np.linalg.norm(stored.astype(np.float32) * scale)
+
+    def __delitem__(self, person_id):
+        # Move the last row into the hole to keep rows [0, len) contiguous
+        row = self.index.pop(person_id)
+        last = len(self.ids) - 1
+        if row != last:
+            moved_id = self.ids[last]
+            self.matrix[row] = self.matrix[last]
+            self.scales[row] = self.scales[last]
+            self.norms[row] = self.norms[last]
+            self.ids[row] = moved_id
+            self.index[moved_id] = row
+        self.ids.pop()
+
+    def clear(self):
+        self.ids = []
+        self.index = {}
+
+    def _quantize(self, embedding):
+        if self.dtype == np.int8:
+            peak = float(np.max(np.abs(embedding))) if embedding.size else 0.0
+            scale = peak / 127.0 if peak > 0 else 1.0
+            return np.clip(np.round(embedding / scale), -127, 127).astype(np.int8), scale
+        return embedding.astype(self.dtype), 1.0
+
+    def _ensure_capacity(self, rows, dim):
+        if self.matrix is not None and self.matrix.shape[1] != dim:
+            raise ValueError(f"Embedding size {dim} does not match gallery size {self.matrix.shape[1]}")
+        if self.matrix is not None and rows <= self.matrix.shape[0]:
+            return
+
+        capacity = max(rows, 1024, 2 * (self.matrix.shape[0] if self.matrix is not None else 0))
+        matrix = np.empty((capacity, dim), dtype=self.dtype)
+        scales = np.ones(capacity, dtype=np.float32)
+        norms = np.zeros(capacity, dtype=np.float32)
+        if self.matrix is not None:
+            used = len(self.ids)
+            matrix[:used] = self.matrix[:used]
+            scales[:used] = self.scales[:used]
+            norms[:used] = self.norms[:used]
+        self.matrix, self.scales, self.norms = matrix, scales, norms
+
+    def best_match(self, query):
+        """Return (person_id, cosine similarity) of the closest positive match, or (None, 0.0)"""
+        count = len(self.ids)
+        if count == 0:
+            return None, 0.0
+
+        query = np.asarray(query, dtype=np.float32).ravel()
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return None, 0.0
+        query = query / query_norm
+
+        best_row = -1
+        best_similarity = 0.0
+        for start in range(0, count, self.block_rows):
+            end = min(start + self.block_rows, count)
+            block = self.matrix[start:end].astype(np.float32, copy=False)
+            similarities = block @ query
+            norms = self.norms[start:end]
+            similarities *= np.divide(self.scales[start:end], norms, out=np.zeros_like(norms), where=norms > 0)
+
+            i = int(np.argmax(similarities))
+            if similarities[i] > best_similarity:
+                best_similarity = float(similarities[i])
+                best_row = start + i
+
+        if best_row < 0:
+            return None, 0.0
+        return self.ids[best_row], best_similarity
+
+    def nbytes(self):
+        """Memory used by the populated rows"""
+        count = len(self.ids)
+        if self.matrix is None:
+            return 0
+        return self.matrix[:count].nbytes + self.scales[:count].nbytes + self.norms[:count].nbytes
+
+    def get_state(self):
+        """Stored rows in their compact form, with per-row scale and norm"""
+        count = len(self.ids)
+        if self.matrix is None:
+            empty = np.zeros(0, dtype=np.float32)
+            return {'embedding_ids': [], 'embeddings': np.zeros((0, 0), dtype=self.dtype),
+                    'scales': empty, 'norms': empty}
+        return {
+            'embedding_ids': list(self.ids),
+            'embeddings': self.matrix[:count].copy(),
+            'scales': self.scales[:count].copy(),
+            'norms': self.norms[:count].copy()
+        }
+
+    def load_state(self, state):
+        """Adopt rows from get_state; arrays already in this gallery's dtype are used without copying"""
+        embeddings = state['embeddings']
+        ids = list(state['embedding_ids'])
+        scales = state.get('scales')
+        if scales is None:
+            scales = np.ones(len(ids), dtype=np.float32)
+
+        if len(ids) == 0:
+            self.matrix = self.scales = self.norms = None
+            self.clear()
+            return
+
+        if embeddings.dtype != self.dtype:
+            # Re-encode a snapshot written with another storage dtype
+            self.clear()
+            self.matrix = None
+            dequantized = embeddings.astype(np.float32) * np.asarray(scales, dtype=np.float32)[:, None]
+            for person_id, embedding in zip(ids, dequantized):
+                self[person_id] = embedding
+            return
+
+        norms = state.get('norms')
+        if norms is None:
+            norms = np.linalg.norm(embeddings.astype(np.float32), axis=1) * scales
+
+        # Until the gallery grows these may be (copy-on-write) memory-mapped arrays
+        self.matrix = embeddings
+        self.scales = np.asarray(scales, dtype=np.float32)
+        self.norms = np.asarray(norms, dtype=np.float32)
+        self.ids = ids
+        self.index = {person_id: row for row, person_id in enumerate(ids)}
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import shutil
+import fcntl
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class GalleryStore:
+    """On-disk Re-ID gallery snapshots for one store.
+
+    Each save writes an immutable snapshot directory (`embeddings.npy` in the
+    gallery's storage dtype, `scales.npy`, `norms.npy`, `last_seen.npy`,
+    `ids.json`) and then atomically repoints `CURRENT` at it, so readers in
+    other processes always see a complete snapshot. Embeddings are mapped
+    copy-on-write on load, which makes loading independent of gallery size;
+    pages are only copied when a match updates them.
+    """
+
+    def __init__(self, root_dir, store_id, keep_snapshots=2):
+        self.path = os.path.join(root_dir, str(store_id))
+        self.keep_snapshots = keep_snapshots
+        os.makedirs(self.path, exist_ok=True)
+
+    @contextmanager
+    def _lock(self, operation=fcntl.LOCK_EX):
+        """Serialise writers across processes; readers take it shared so a prune can't remove their snapshot"""
+        with open(os.path.join(self.path, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _current_snapshot(self):
+        try:
+            with open(os.path.join(self.path, 'CURRENT')) as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return os.path.join(self.path, name) if name else None
+
+    def save(self, state):
+        """Write a gallery snapshot produced by OpenVINOReID.get_state"""
+        last_seen_ids = list(state['last_seen'].keys())
+        last_seen = np.array(
+            [int((state['last_seen'][pid] - EPOCH).total_seconds() * 1e6) for pid in last_seen_ids],
+            dtype=np.int64
+        )
+
+        with self._lock():
+            name = f"snap-{time.time_ns()}-{os.getpid()}"
+            snapshot = os.path.join(self.path, name)
+            os.makedirs(snapshot)
+            np.save(os.path.join(snapshot, 'embeddings.npy'), np.ascontiguousarray(state['embeddings']))
+            np.save(os.path.join(snapshot, 'scales.npy'), state['scales'])
+            np.save(os.path.join(snapshot, 'norms.npy'), state['norms'])
+            np.save(os.path.join(snapshot, 'last_seen.npy'), last_seen)
+            with open(os.path.join(snapshot, 'ids.json'), 'w') as f:
+                json.dump({
+                    'next_person_id': state['next_person_id'],
+                    'embedding_ids': state['embedding_ids'],
+                    'last_seen_ids': last_seen_ids
+                }, f)
+
+            current_tmp = os.path.join(self.path, f"CURRENT.tmp-{os.getpid()}")
+            with open(current_tmp, 'w') as f:
+                f.write(name)
+            os.replace(current_tmp, os.path.join(self.path, 'CURRENT'))
+
+            self._prune(name)
+
+        print(f"Saved Re-ID gallery with {len(state['embedding_ids'])} persons to {snapshot}")
+
+    def _prune(self, current_name):
+        """Remove old snapshots; readers that still map them keep working on POSIX"""
+        snapshots = sorted(
+            (d for d in os.listdir(self.path) if d.startswith('snap-')),
+            key=lambda d: int(d.split('-')[1])
+        )
+        for name in snapshots[:-self.keep_snapshots]:
+            if name != current_name:
+                shutil.rmtree(os.path.join(self.path, name), ignore_errors=True)
+
+    def load(self):
+        """Return the latest snapshot as an OpenVINOReID state, or None if nothing was saved"""
+        # Once mapped and read, the snapshot may be pruned; the mapping stays valid
+        with self._lock(fcntl.LOCK_SH):
+            snapshot = self._current_snapshot()
+            if snapshot is None or not os.path.exists(snapshot):
+                return None
+
+            with open(os.path.join(snapshot, 'ids.json')) as f:
+                ids = json.load(f)
+            # Plain ndarray view of a private mapping: writes never reach the shared snapshot
+            embeddings = np.load(os.path.join(snapshot, 'embeddings.npy'), mmap_mode='c').view(np.ndarray)
+            last_seen = np.load(os.path.join(snapshot, 'last_seen.npy'))
+            scales = np.load(os.path.join(snapshot, 'scales.npy'))
+            norms = np.load(os.path.join(snapshot, 'norms.npy'))
+
+        return {
+            'next_person_id': ids['next_person_id'],
+            'embedding_ids': ids['embedding_ids'],
+            'embeddings': embeddings,
+            'scales': scales,
+            'norms': norms,
+            'last_seen': dict(zip(ids['last_seen_ids'], last_seen.astype('datetime64[us]').tolist()))
+        }
@@ -1,26 +1,47 @@
 import cv2
+import time
 import numpy as np
 from openvino.runtime import Core
-from scipy.spatial.distance import cosine
 from datetime import datetime, timedelta
+from .gallery import EmbeddingGallery
+from ..utils.metrics import timed, STAGE_SECONDS
+from ..utils.profiling import LayerProfile
 
 class OpenVINOReID:
-    def __init__(self, model_path, similarity_threshold=0.7, max_persons=1000, person_timeout_seconds=3600):
+    def __init__(self, model_path, similarity_threshold=0.7, max_persons=1000, person_timeout_seconds=3600,
+                 embedding_dtype='float32', perf_counters=False, server=None):
         self.similarity_threshold = similarity_threshold
-        self.person_database = {}
+        self.person_database = EmbeddingGallery(embedding_dtype)  # float32, float16 or int8 storage
         self.person_last_seen = {}  # Track when each person was last seen
         self.next_person_id = 1
         self.max_persons = max_persons  # Maximum persons to keep in database
         self.person_timeout_seconds = person_timeout_seconds  # 1 hour default
+        self.server = server  # Shared InferenceServer; no model of our own is compiled
+        self.layer_profile = None
+        if server:
+            self.input_shape = server.input_shape
+            return
         
         ie = Core()
         model = ie.read_model(model=model_path)
-        self.compiled_model = ie.compile_model(model=model, device_name="CPU")
+        config = {"PERF_COUNT": "YES"} if perf_counters else {}
+        self.compiled_model = ie.compile_model(model=model, device_name="CPU", config=config)
         self.input_layer = self.compiled_model.input(0)
         self.output_layer = self.compiled_model.output(0)
         self.input_shape = self.input_layer.shape
+        self.infer_request = self.compiled_model.create_infer_request() if perf_counters else None
+        self.layer_profile = LayerProfile("person_reidentification") if perf_counters else None
     
-    def extract_features(self, frame, bbox):
+    def infer(self, input_image):
+        if self.server:
+            return self.server.infer(input_image)
+        if self.infer_request is None:
+            return self.compiled_model([input_image])[self.output_layer]
+        result = self.infer_request.infer([input_image])[self.output_layer]
+        self.layer_profile.add(self.infer_request)
+        return result
+    
+    def preprocess_crop(self, frame, bbox):
         x_min, y_min, x_max, y_max = bbox
         person_crop = frame[y_min:y_max, x_min:x_max]
         
@@ -30,12 +51,34 @@ class OpenVINOReID:
         n, c, h, w = self.input_shape
         resized = cv2.resize(person_crop, (w, h))
         input_image = resized.transpose((2, 0, 1))
-        input_image = np.expand_dims(input_image, 0)
-        
-        features = self.compiled_model([input_image])[self.output_layer]
+        return np.expand_dims(input_image, 0)
+    
+    @staticmethod
+    def normalize(features):
         features = features.flatten()
-        features = features / np.linalg.norm(features)
+        return features / np.linalg.norm(features)
+    
+    @timed('reid_extract')
+    def extract_features(self, frame, bbox):
+        input_image = self.preprocess_crop(frame, bbox)
+        if input_image is None:
+            return None
+        return self.normalize(self.infer(input_image))
+    
+    def extract_features_batch(self, frame, bboxes):
+        """Features of every bbox in a frame; with a server the crops are submitted together and batched"""
+        if not self.server:
+            return [self.extract_features(frame, bbox) for bbox in bboxes]
         
+        started = time.perf_counter()
+        inputs = [self.preprocess_crop(frame, bbox) for bbox in bboxes]
+        futures = [self.server.submit(x) if x is not None else None for x in inputs]
+        features = [self.normalize(future.result()) if future else None for future in futures]
+        if features:
+            # One observation per crop, like the unbatched path
+            per_crop = (time.perf_counter() - started) / len(features)
+            for _ in features:
+                STAGE_SECONDS.observe(per_crop, 'reid_extract')
         return features
     
     def clean_stale_persons(self, current_timestamp):
@@ -77,6 +120,7 @@ class OpenVINOReID:
             
             print(f"Database size limit reached. Removed {len(persons_to_remove)} old persons")
     
+    @timed('gallery_match')
     def match_person(self, features, current_timestamp=None):
         """Match person features against database with timestamp tracking"""
         if current_timestamp is None:
@@ -91,14 +135,7 @@ class OpenVINOReID:
             self.person_last_seen[new_id] = current_timestamp
             return new_id
         
-        best_match_id = None
-        best_similarity = 0.0
-        
-        for person_id, stored_features in self.person_database.items():
-            similarity = 1 - cosine(features, stored_features)
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_match_id = person_id
+        best_match_id, best_similarity = self.person_database.best_match(features)
         
         if best_similarity >= self.similarity_threshold:
             # Update features with exponential moving average
@@ -128,16 +165,43 @@ class OpenVINOReID:
         features = self.extract_features(frame, bbox)
         return self.match_person(features, timestamp)
     
+    def identify_persons(self, frame, bboxes, timestamp=None):
+        """identify_person for all detections of a frame, matched in order after extracting their features together"""
+        if timestamp is None:
+            timestamp = datetime.utcnow()
+        
+        return [self.match_person(features, timestamp) for features in self.extract_features_batch(frame, bboxes)]
+    
     def get_database_stats(self):
         """Get statistics about the Re-ID database"""
         return {
             "total_persons": len(self.person_database),
             "max_capacity": self.max_persons,
+            "embedding_dtype": str(self.person_database.dtype),
+            "embedding_bytes": self.person_database.nbytes(),
             "next_person_id": self.next_person_id,
             "oldest_person_time": min(self.person_last_seen.values()) if self.person_last_seen else None,
             "newest_person_time": max(self.person_last_seen.values()) if self.person_last_seen else None
         }
     
+    def get_state(self):
+        """Snapshot of the gallery (ids, compact embeddings with scales/norms, last-seen times, id counter)"""
+        state = self.person_database.get_state()
+        state['next_person_id'] = self.next_person_id
+        state['last_seen'] = dict(self.person_last_seen)
+        return state
+    
+    def load_state(self, state):
+        """Replace the gallery with a snapshot produced by get_state (arrays may be memory-mapped)"""
+        self.person_database.load_state(state)
+        self.person_last_seen = dict(state['last_seen'])
+        self.next_person_id = state['next_person_id']
+    
+    def apply_retention(self, current_timestamp):
+        """Apply the timeout and capacity policy to a gallery loaded from elsewhere"""
+        self.clean_stale_persons(current_timestamp)
+        self.limit_database_size()
+    
     def clear_database(self):
         """Manually clear the entire database"""
         self.person_database.clear()
@@ -1,3 +1,5 @@
+import numpy as np
+
 def point_in_polygon(point, polygon):
     """Check if point is inside polygon using ray casting"""
     x, y = point
@@ -18,9 +20,135 @@ def point_in_polygon(point, polygon):
     
     return inside
 
+def points_in_polygon(points, polygon):
+    """Vectorised point_in_polygon for an (N, 2) array of points; returns a boolean array"""
+    points = np.asarray(points, dtype=np.float64)
+    x, y = points[:, 0], points[:, 1]
+    inside = np.zeros(len(points), dtype=bool)
+    
+    n = len(polygon)
+    p1x, p1y = polygon[0]
+    for i in range(1, n + 1):
+        p2x, p2y = polygon[i % n]
+        crossing = (y > min(p1y, p2y)) & (y <= max(p1y, p2y)) & (x <= max(p1x, p2x))
+        if p1y != p2y and p1x != p2x:
+            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
+            crossing &= x <= xinters
+        inside ^= crossing
+        p1x, p1y = p2x, p2y
+    
+    return inside
+
 def calculate_bbox_center(bbox):
     """Calculate center point of bbox (use bottom for feet position)"""
     x_min, y_min, x_max, y_max = bbox
     center_x = (x_min + x_max) / 2
     center_y = y_max
-    return (center_x, center_y)
\ No newline at end of file
+    return (center_x, center_y)
+
+def scale_bbox(bbox, factor):
+    """Scale bbox coordinates by factor (e.g. map a downscaled frame back to source)"""
+    x_min, y_min, x_max, y_max = bbox
+    return [
+        int(round(x_min * factor)),
+        int(round(y_min * factor)),
+        int(round(x_max * factor)),
+        int(round(y_max * factor))
+    ]
+
+def polygon_bounds(polygon):
+    """Axis-aligned bounding rect [x_min, y_min, x_max, y_max] of a polygon"""
+    xs = [p[0] for p in polygon]
+    ys = [p[1] for p in polygon]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+def rects_overlap(a, b):
+    """Check if two [x_min, y_min, x_max, y_max] rects intersect"""
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def expand_to_aspect(rect, aspect, frame_size):
+    """Grow rect around its center to width/height == aspect, clipped to the frame"""
+    frame_w, frame_h = frame_size
+    x_min, y_min, x_max, y_max = rect
+    w, h = x_max - x_min, y_max - y_min
+    if w <= 0 or h <= 0:
+        return rect
+    
+    if w / h < aspect:
+        grow = (h * aspect - w) / 2
+        x_min, x_max = x_min - grow, x_max + grow
+    else:
+        grow = (w / aspect - h) / 2
+        y_min, y_max = y_min - grow, y_max + grow
+    
+    # Shift back inside the frame before clipping so the crop keeps its size where possible
+    if x_min < 0:
+        x_max, x_min = x_max - x_min, 0
+    if x_max > frame_w:
+        x_min, x_max = x_min - (x_max - frame_w), frame_w
+    if y_min < 0:
+        y_max, y_min = y_max - y_min, 0
+    if y_max > frame_h:
+        y_min, y_max = y_min - (y_max - frame_h), frame_h
+    
+    return [max(0, x_min), max(0, y_min), min(frame_w, x_max), min(frame_h, y_max)]
+
+def _merge_rects(a, b, aspect, frame_size):
+    union = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+    return expand_to_aspect(union, aspect, frame_size) if aspect else union
+
+def _rect_area(rect):
+    return (rect[2] - rect[0]) * (rect[3] - rect[1])
+
+def zone_regions(polygons, frame_size, padding=0.05, head_room=0.3, aspect=None,
+                 max_regions=1, max_area_fraction=0.6):
+    """Derive the minimal set of padded, non-overlapping regions covering the zone polygons.
+    
+    Zones are tested against the feet point, so each region extends `head_room` of the
+    frame height above its polygon to contain the rest of the body. Every region costs
+    one inference, so regions are merged down to `max_regions`. Returns None when the
+    regions would cover most of the frame and a single full-frame pass is cheaper.
+    """
+    frame_w, frame_h = frame_size
+    pad_x = padding * frame_w
+    pad_y = padding * frame_h
+    
+    rects = []
+    for polygon in polygons:
+        x_min, y_min, x_max, y_max = polygon_bounds(polygon)
+        rect = [
+            max(0, x_min - pad_x),
+            max(0, y_min - pad_y - head_room * frame_h),
+            min(frame_w, x_max + pad_x),
+            min(frame_h, y_max + pad_y)
+        ]
+        if rect[2] > rect[0] and rect[3] > rect[1]:
+            if aspect:
+                rect = expand_to_aspect(rect, aspect, frame_size)
+            rects.append(rect)
+    
+    # Merge until no two regions overlap; merged rects can overlap new neighbours
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                if rects_overlap(rects[i], rects[j]):
+                    rects[i] = _merge_rects(rects[i], rects.pop(j), aspect, frame_size)
+                    merged = True
+                    break
+            if merged:
+                break
+        
+        if not merged and len(rects) > max_regions:
+            # Too many inferences per frame: merge the pair with the smallest union
+            pairs = [(i, j) for i in range(len(rects)) for j in range(i + 1, len(rects))]
+            i, j = min(pairs, key=lambda p: _rect_area(_merge_rects(rects[p[0]], rects[p[1]], aspect, frame_size)))
+            rects[i] = _merge_rects(rects[i], rects.pop(j), aspect, frame_size)
+            merged = True
+    
+    total_area = sum(_rect_area(r) for r in rects)
+    if not rects or total_area >= max_area_fraction * frame_w * frame_h:
+        return None
+    
+    return [[int(r[0]), int(r[1]), int(round(r[2])), int(round(r[3]))] for r in rects]
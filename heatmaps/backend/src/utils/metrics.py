@@ -0,0 +1,223 @@
+import bisect
+import functools
+import threading
+import time
+from ..config.settings import settings
+
+# Upper bounds in seconds, from a single gallery match up to a daily aggregation
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric with one value per combination of label values"""
+    kind = None
+
+    def __init__(self, registry, name, documentation, label_names=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values = {}  # label values tuple -> value
+        self.lock = threading.Lock()
+
+    def remove(self, *labels):
+        with self.lock:
+            self.values.pop(tuple(str(label) for label in labels), None)
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, labels, (), value) for labels, value in sorted(self.values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.label_names, labels, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, *labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(label) for label in labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        if not self.registry.enabled:
+            return
+        with self.lock:
+            self.values[tuple(str(label) for label in labels)] = value
+
+
+class Histogram(Metric):
+    """Bucketed observations; each value holds [per-bucket counts, sum, count]"""
+    kind = "histogram"
+
+    def __init__(self, registry, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        if not self.registry.enabled:
+            return
+        key = tuple(str(label) for label in labels)
+        index = bisect.bisect_left(self.buckets, value)  # len(buckets) -> +Inf
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self):
+        """Copy of the current state, to summarise what happened after it"""
+        with self.lock:
+            return {key: (list(counts), total, count) for key, (counts, total, count) in self.values.items()}
+
+    def quantile(self, counts, q):
+        """Upper bound of the bucket holding the q-quantile of `counts`"""
+        target = q * sum(counts)
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            seen += count
+            if count and seen >= target:
+                return bound
+        return None
+
+    def samples(self):
+        samples = []
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", labels, (("le", bound),), cumulative))
+            samples.append((f"{self.name}_sum", labels, (), total))
+            samples.append((f"{self.name}_count", labels, (), count))
+        return samples
+
+
+class MetricsRegistry:
+    """Process-wide metrics, rendered in the Prometheus text format.
+
+    Metrics are cheap to update but not free; with `enabled` off every
+    update returns immediately and `timed` leaves functions undecorated.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.metrics = {}
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter(self, name, documentation, label_names))
+
+    def gauge(self, name, documentation, label_names=()):
+        return self._register(Gauge(self, name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self, name, documentation, label_names, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry(settings.metrics_enabled)
+
+STAGE_SECONDS = registry.histogram(
+    "heatmaps_stage_seconds", "Duration of one call of a pipeline or aggregation stage", ("stage",)
+)
+FRAMES_ANALYSED = registry.counter(
+    "heatmaps_frames_analysed_total", "Frames taken from the analysis grid", ("camera_id",)
+)
+FRAMES_SKIPPED = registry.counter(
+    "heatmaps_frames_skipped_total", "Analysed frames the motion gate let through without inference", ("camera_id",)
+)
+EVENTS_WRITTEN = registry.counter(
+    "heatmaps_events_written_total", "Zone events written to the event store", ("store_id",)
+)
+ANALYSIS_FPS = registry.gauge(
+    "heatmaps_analysis_fps", "Analysed frames per second since the last progress report", ("camera_id",)
+)
+ACTIVE_VISITS = registry.gauge(
+    "heatmaps_active_visits", "Zone visits currently open", ("camera_id",)
+)
+EVENT_BACKLOG = registry.gauge(
+    "heatmaps_event_backlog", "Zone events buffered and not yet written", ("camera_id",)
+)
+GALLERY_SIZE = registry.gauge(
+    "heatmaps_reid_gallery_size", "Persons in the Re-ID gallery", ("store_id",)
+)
+
+
+def timed(stage):
+    """Decorator recording each call's duration under `stage` in heatmaps_stage_seconds"""
+    def decorate(func):
+        if not registry.enabled:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+        return wrapper
+    return decorate
+
+
+def stage_summary(baseline=None):
+    """Per-stage calls, total time, mean and approximate p95 since `baseline` (a STAGE_SECONDS.snapshot())
+
+    Stage timings are process-wide, so jobs running at the same time show up in each other's summary.
+    """
+    baseline = baseline or {}
+    summary = {}
+    for (stage,), (counts, total, count) in sorted(STAGE_SECONDS.snapshot().items()):
+        before = baseline.get((stage,))
+        if before:
+            counts = [now - then for now, then in zip(counts, before[0])]
+            total -= before[1]
+            count -= before[2]
+        if count <= 0:
+            continue
+        p95 = STAGE_SECONDS.quantile(counts, 0.95)
+        summary[stage] = {
+            'calls': count,
+            'total_seconds': round(total, 3),
+            'mean_ms': round(total / count * 1000, 3),
+            'p95_ms': p95 * 1000 if p95 != float('inf') else None
+        }
+    return summary
@@ -0,0 +1,212 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from datetime import datetime
+
+PROFILE_MODES = ('sampling', 'cprofile')
+
+
+class LayerProfile:
+    """OpenVINO per-layer perf counters of one model, summed over the inferences made while active.
+
+    The model has to be compiled with PERF_COUNT enabled; `add` reads the
+    counters of the infer request's last inference.
+    """
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.active = True
+        self.inferences = 0
+        self.layers = {}  # node name -> [node type, exec type, executions, real us, cpu us]
+
+    def add(self, infer_request):
+        if not self.active:
+            return
+        self.inferences += 1
+        for info in infer_request.profiling_info:
+            if info.status.name != 'EXECUTED':
+                continue
+            layer = self.layers.get(info.node_name)
+            if layer is None:
+                layer = self.layers[info.node_name] = [info.node_type, info.exec_type, 0, 0.0, 0.0]
+            layer[2] += 1
+            layer[3] += info.real_time.total_seconds() * 1e6
+            layer[4] += info.cpu_time.total_seconds() * 1e6
+
+    def report(self):
+        """Layers by total real time, with their share of the model's time"""
+        total = sum(layer[3] for layer in self.layers.values()) or 1.0
+        layers = [
+            {
+                'node_name': name,
+                'node_type': node_type,
+                'exec_type': exec_type,
+                'executions': executions,
+                'real_time_us': round(real_us, 1),
+                'cpu_time_us': round(cpu_us, 1),
+                'mean_real_time_us': round(real_us / executions, 2),
+                'share': round(real_us / total, 4)
+            }
+            for name, (node_type, exec_type, executions, real_us, cpu_us) in self.layers.items()
+        ]
+        layers.sort(key=lambda layer: layer['real_time_us'], reverse=True)
+        return {'model': self.model_name, 'inferences': self.inferences, 'layers': layers}
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval into collapsed stacks.
+
+    Runs in its own thread, so the profiled code isn't instrumented at all;
+    the cost is one stack walk per interval while the GIL is free.
+    """
+
+    def __init__(self, thread_id, interval=0.005, max_seconds=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks = {}  # 'outer;...;inner' -> samples
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        deadline = time.monotonic() + self.max_seconds if self.max_seconds else None
+        while not self._stop.wait(self.interval):
+            if deadline and time.monotonic() >= deadline:
+                break
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack = ';'.join(reversed(names))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope"""
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+class JobProfiler:
+    """Profiles a processing job's thread for at most `max_seconds`.
+
+    Stack sampling always runs; `cprofile` mode also records a deterministic
+    profile. cProfile only sees the thread it was enabled on, so `start`,
+    `check` and `stop` must be called from the job's thread; the window
+    can overrun until the next `check`, except for the stack sampler, which
+    stops itself. Models passed to `start` have their per-layer counters
+    collected for the same window.
+    """
+
+    def __init__(self, mode, max_seconds, sample_interval=0.005):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}, expected one of {', '.join(PROFILE_MODES)}")
+        self.mode = mode
+        self.max_seconds = max_seconds
+        self.sampler = StackSampler(threading.get_ident(), sample_interval, max_seconds)
+        self.profile = cProfile.Profile() if mode == 'cprofile' else None
+        self.layer_profiles = []
+        self.started_at = None
+        self.seconds = None
+
+    def start(self, layer_profiles=()):
+        self.layer_profiles = [profile for profile in layer_profiles if profile is not None]
+        self.started_at = time.monotonic()
+        self.sampler.start()
+        if self.profile:
+            self.profile.enable()
+
+    def check(self):
+        """Stop once the window is over; call regularly from the job's thread"""
+        if self.seconds is None and time.monotonic() - self.started_at >= self.max_seconds:
+            self.stop()
+
+    def stop(self):
+        if self.seconds is not None:
+            return
+        if self.profile:
+            self.profile.disable()
+        self.sampler.stop()
+        for layer_profile in self.layer_profiles:
+            layer_profile.active = False
+        self.seconds = time.monotonic() - self.started_at
+
+    def artifacts(self):
+        """File name -> content of everything captured"""
+        self.stop()
+        files = {'stacks.folded': self.sampler.collapsed()}
+        if self.profile:
+            stream = io.StringIO()
+            stats = pstats.Stats(self.profile, stream=stream)
+            stats.sort_stats('cumulative').print_stats(60)
+            files['profile.txt'] = stream.getvalue()
+            # Written with Stats.dump_stats, for snakeviz or pstats.Stats(path)
+            files['profile.prof'] = stats
+        if self.layer_profiles:
+            files['openvino_perf_counts.json'] = json.dumps(
+                [layer_profile.report() for layer_profile in self.layer_profiles], indent=2
+            )
+        files['summary.json'] = json.dumps({
+            'mode': self.mode,
+            'seconds': round(self.seconds, 3),
+            'max_seconds': self.max_seconds,
+            'stack_samples': self.sampler.samples,
+            'sample_interval': self.sampler.interval
+        }, indent=2)
+        return files
+
+
+class ProfileStore:
+    """Profiling artifacts of processing jobs, at `<root>/<store_id>/<profile_id>/<file>`"""
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    def path(self, store_id, profile_id, name=None):
+        path = os.path.join(self.root_dir, str(store_id), profile_id)
+        return os.path.join(path, name) if name else path
+
+    @staticmethod
+    def new_id():
+        return datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+
+    def save(self, store_id, profile_id, files):
+        """Write the artifacts of a JobProfiler; returns their file names"""
+        directory = self.path(store_id, profile_id)
+        os.makedirs(directory, exist_ok=True)
+        for name, content in files.items():
+            path = os.path.join(directory, name)
+            if isinstance(content, pstats.Stats):
+                content.dump_stats(path)
+            else:
+                with open(path, 'w') as f:
+                    f.write(content)
+        return sorted(files)
+
+    def profiles(self, store_id):
+        """{profile_id: [artifact names]} of a store, oldest first"""
+        store_dir = os.path.join(self.root_dir, str(store_id))
+        if not os.path.isdir(store_dir):
+            return {}
+        return {
+            profile_id: sorted(os.listdir(os.path.join(store_dir, profile_id)))
+            for profile_id in sorted(os.listdir(store_dir))
+            if os.path.isdir(os.path.join(store_dir, profile_id))
+        }
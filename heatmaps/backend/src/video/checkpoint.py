@@ -0,0 +1,93 @@
+import os
+from datetime import datetime
+import numpy as np
+from bson import Binary
+
+
+class CheckpointStore:
+    """Persist per-camera processing state so interrupted jobs can resume.
+
+    A store has checkpoint documents only while a processing job for it is
+    unfinished: cameras are marked completed as they finish and the whole set
+    is cleared when the job ends.
+    """
+
+    def __init__(self, collection, store_id):
+        self.collection = collection
+        self.store_id = str(store_id)
+
+    def _key(self, camera_id):
+        return f"{self.store_id}:{camera_id}"
+
+    @staticmethod
+    def video_fingerprint(video_path):
+        """Cheap identity of a video file, to avoid resuming against a replaced file"""
+        stat = os.stat(video_path)
+        return {'path': video_path, 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    @staticmethod
+    def _encode_reid_state(state):
+        embeddings = state['embeddings']
+        return {
+            'next_person_id': state['next_person_id'],
+            'embedding_ids': state['embedding_ids'],
+            'embeddings': Binary(np.ascontiguousarray(embeddings).tobytes()),
+            'embedding_dtype': str(embeddings.dtype),
+            'embedding_shape': list(embeddings.shape),
+            'scales': Binary(np.asarray(state['scales'], dtype=np.float32).tobytes()),
+            'norms': Binary(np.asarray(state['norms'], dtype=np.float32).tobytes()),
+            'last_seen': state['last_seen']
+        }
+
+    @staticmethod
+    def _decode_reid_state(doc):
+        embeddings = np.frombuffer(doc['embeddings'], dtype=doc['embedding_dtype']).reshape(doc['embedding_shape'])
+        return {
+            'next_person_id': doc['next_person_id'],
+            'embedding_ids': doc['embedding_ids'],
+            'embeddings': embeddings.copy(),
+            'scales': np.frombuffer(doc['scales'], dtype=np.float32).copy(),
+            'norms': np.frombuffer(doc['norms'], dtype=np.float32).copy(),
+            'last_seen': doc['last_seen']
+        }
+
+    def save(self, camera_id, video_path, run_id, start_time, frame_position, frames_analysed,
+             frames_skipped, active_visits, reid_state, event_watermark, transitions_state=None, completed=False):
+        """Write the checkpoint for a camera (events up to the watermark must already be flushed)"""
+        self.collection.replace_one(
+            {'_id': self._key(camera_id)},
+            {
+                'store_id': self.store_id,
+                'camera_id': camera_id,
+                'video': self.video_fingerprint(video_path),
+                'run_id': run_id,
+                'start_time': start_time,
+                'frame_position': frame_position,
+                'frames_analysed': frames_analysed,
+                'frames_skipped': frames_skipped,
+                'active_visits': active_visits,
+                'reid': self._encode_reid_state(reid_state),
+                'event_watermark': event_watermark,
+                'transitions': transitions_state,
+                'completed': completed,
+                'updated_at': datetime.utcnow()
+            },
+            upsert=True
+        )
+
+    def load(self, camera_id, video_path):
+        """Return the checkpoint for a camera, or None if missing or for a different video"""
+        checkpoint = self.collection.find_one({'_id': self._key(camera_id)})
+        if not checkpoint:
+            return None
+
+        if not os.path.exists(video_path) or checkpoint['video'] != self.video_fingerprint(video_path):
+            print(f"Ignoring checkpoint for camera {camera_id}: video has changed")
+            return None
+
+        checkpoint['reid'] = self._decode_reid_state(checkpoint['reid'])
+        return checkpoint
+
+    def clear(self):
+        """Remove all checkpoints of the store once its job has finished"""
+        self.collection.delete_many({'store_id': self.store_id})
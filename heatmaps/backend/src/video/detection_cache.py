@@ -0,0 +1,105 @@
+import os
+import json
+import shutil
+import hashlib
+from array import array
+from datetime import datetime
+import numpy as np
+
+# Arrays stored per cached video; detections of frame i are rows offsets[i]:offsets[i + 1]
+CACHE_ARRAYS = ('frame_index', 'offsets', 'bbox', 'foot_point', 'person_index')
+
+
+def video_content_hash(video_path, chunk_size=8 * 1024 * 1024):
+    """SHA-256 of the video file contents"""
+    digest = hashlib.sha256()
+    with open(video_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DetectionCacheWriter:
+    """Accumulate the per-frame (person_id, bbox) sightings of one run and persist them as NumPy arrays.
+
+    The arrays are written to a temporary directory and renamed into place,
+    so a cache directory is either complete or absent.
+    """
+
+    def __init__(self, cache_dir, content_hash, meta):
+        self.path = os.path.join(cache_dir, content_hash)
+        self.meta = dict(meta, content_hash=content_hash)
+        self.frame_index = array('q')
+        self.offsets = array('q', [0])
+        self.bbox = array('i')
+        self.person_index = array('i')
+        self.person_ids = []
+        self._person_lookup = {}
+
+    def add_frame(self, frame_index, tracks):
+        """Record the (person_id, source bbox) sightings applied to the zones for one analysed frame"""
+        self.frame_index.append(frame_index)
+        for person_id, bbox in tracks:
+            index = self._person_lookup.get(person_id)
+            if index is None:
+                index = len(self.person_ids)
+                self._person_lookup[person_id] = index
+                self.person_ids.append(person_id)
+            self.person_index.append(index)
+            self.bbox.extend(int(v) for v in bbox)
+        self.offsets.append(len(self.person_index))
+
+    def save(self):
+        bbox = np.frombuffer(self.bbox, dtype=np.int32).reshape(-1, 4)
+        # Feet point, as used by ZoneManager, precomputed for vectorised zone lookup
+        foot_point = np.stack([(bbox[:, 0] + bbox[:, 2]) / 2.0, bbox[:, 3]], axis=1).astype(np.float32)
+
+        arrays = {
+            'frame_index': np.frombuffer(self.frame_index, dtype=np.int64),
+            'offsets': np.frombuffer(self.offsets, dtype=np.int64),
+            'bbox': bbox,
+            'foot_point': foot_point,
+            'person_index': np.frombuffer(self.person_index, dtype=np.int32)
+        }
+
+        tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+
+        meta = dict(
+            self.meta,
+            frames=len(self.frame_index),
+            detections=len(self.person_index),
+            created_at=datetime.utcnow().isoformat()
+        )
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        with open(os.path.join(tmp_path, 'person_ids.json'), 'w') as f:
+            json.dump(self.person_ids, f)
+
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.replace(tmp_path, self.path)
+        print(f"Saved detection cache with {meta['detections']} detections to {self.path}")
+
+
+class DetectionCache:
+    """Read-only, memory-mapped view of a cached video's detections"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, 'person_ids.json')) as f:
+            self.person_ids = json.load(f)
+        for name in CACHE_ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r'))
+
+    @classmethod
+    def load(cls, cache_dir, content_hash):
+        """Open the cache for a video hash, or return None if it was never recorded"""
+        path = os.path.join(cache_dir, content_hash)
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            return None
+        return cls(path)
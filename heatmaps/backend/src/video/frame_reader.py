@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+from ..utils.metrics import timed
+
+
+class FrameReader:
+    """Decode only the frames selected for analysis from an open VideoCapture.
+
+    Frames between analysed ones are skipped with grab(), which advances the
+    demuxer/decoder without converting the frame to BGR. Analysed frames are
+    retrieved and (optionally) downscaled into buffers that are reused across
+    reads, so the returned frame is only valid until the next call to read().
+    """
+
+    def __init__(self, cap, analysis_fps=0.0, detector_input_size=None, decode_scale_ratio=0.0):
+        self.cap = cap
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.source_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.source_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        # Analyse every `stride`-th frame of the source
+        if analysis_fps and analysis_fps < self.fps:
+            self.stride = max(1, int(round(self.fps / analysis_fps)))
+        else:
+            self.stride = 1
+
+        self.scale = self._compute_scale(detector_input_size, decode_scale_ratio)
+        if self.scale < 1.0:
+            self.frame_size = (
+                max(1, int(round(self.source_width * self.scale))),
+                max(1, int(round(self.source_height * self.scale)))
+            )
+        else:
+            self.frame_size = (self.source_width, self.source_height)
+
+        self.position = 0  # Index of the next frame in the source
+        self._raw_buffer = None
+        self._scaled_buffer = None
+
+    def _compute_scale(self, detector_input_size, decode_scale_ratio):
+        """Pick a downscale factor that keeps frames `decode_scale_ratio` x the detector input."""
+        if not detector_input_size or not decode_scale_ratio:
+            return 1.0
+        if self.source_width <= 0 or self.source_height <= 0:
+            return 1.0
+
+        det_w, det_h = detector_input_size
+        scale = max(
+            decode_scale_ratio * det_w / self.source_width,
+            decode_scale_ratio * det_h / self.source_height
+        )
+        # Not worth a resize pass for a marginal reduction
+        if scale >= 0.9:
+            return 1.0
+        return scale
+
+    def seek(self, frame_index):
+        """Position the reader so the next grab returns `frame_index`."""
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        self.position = frame_index
+
+    @timed('decode')
+    def read(self):
+        """Return (frame_index, frame) for the next analysed frame, or (None, None) at end of stream."""
+        # Skip frames off the analysis grid without retrieving them
+        while self.position % self.stride != 0:
+            if not self.cap.grab():
+                return None, None
+            self.position += 1
+
+        if not self.cap.grab():
+            return None, None
+
+        frame_index = self.position
+        self.position += 1
+
+        ret, self._raw_buffer = self.cap.retrieve(self._raw_buffer)
+        if not ret:
+            return None, None
+
+        if self.scale >= 1.0:
+            return frame_index, self._raw_buffer
+
+        if self._scaled_buffer is None:
+            width, height = self.frame_size
+            self._scaled_buffer = np.empty((height, width, 3), dtype=self._raw_buffer.dtype)
+
+        self._scaled_buffer = cv2.resize(
+            self._raw_buffer,
+            self.frame_size,
+            dst=self._scaled_buffer,
+            interpolation=cv2.INTER_AREA
+        )
+        return frame_index, self._scaled_buffer
+
+    def timestamp_offset(self, frame_index):
+        """Seconds from the start of the video to `frame_index`."""
+        return frame_index / self.fps
@@ -0,0 +1,62 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Cheap low-resolution change detector restricted to the camera's zones.
+
+    Each analysed frame is shrunk to a small grayscale image and compared with
+    a running-average background. Inference is only needed when enough pixels
+    inside any zone polygon differ from the background, or when the last
+    inference is older than `max_skip_seconds`.
+    """
+
+    def __init__(self, zones, source_size, width=160, pixel_threshold=20,
+                 min_changed_fraction=0.003, learning_rate=0.05, max_skip_seconds=2.0):
+        source_width, source_height = source_size
+        scale = width / float(source_width)
+        self.size = (width, max(1, int(round(source_height * scale))))
+        self.pixel_threshold = pixel_threshold
+        self.learning_rate = learning_rate
+        self.max_skip_seconds = max_skip_seconds
+
+        mask = np.zeros((self.size[1], self.size[0]), dtype=np.uint8)
+        for zone in zones:
+            polygon = np.round(np.array(zone['polygon'], dtype=np.float32) * scale).astype(np.int32)
+            cv2.fillPoly(mask, [polygon], 255)
+        self.mask = mask
+        self.min_changed_pixels = max(1, int(cv2.countNonZero(mask) * min_changed_fraction))
+
+        self.background = None
+        self.last_inference_time = None
+        self._small = None
+        self._gray = None
+        self._diff = None
+
+    @property
+    def enabled(self):
+        return cv2.countNonZero(self.mask) > 0
+
+    def should_analyse(self, frame, timestamp):
+        """Return True if the frame needs detection, updating the background either way."""
+        self._small = cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        self._gray = cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        self._gray = cv2.GaussianBlur(self._gray, (5, 5), 0, dst=self._gray)
+
+        if self.background is None:
+            self.background = self._gray.astype(np.float32)
+            self.last_inference_time = timestamp
+            return True
+
+        self._diff = cv2.absdiff(self._gray, cv2.convertScaleAbs(self.background), dst=self._diff)
+        cv2.threshold(self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+        cv2.bitwise_and(self._diff, self.mask, dst=self._diff)
+        changed = cv2.countNonZero(self._diff)
+
+        cv2.accumulateWeighted(self._gray, self.background, self.learning_rate)
+
+        overdue = (timestamp - self.last_inference_time).total_seconds() >= self.max_skip_seconds
+        if changed >= self.min_changed_pixels or overdue:
+            self.last_inference_time = timestamp
+            return True
+        return False
@@ -1,18 +1,76 @@
 import cv2
+import time
+import uuid
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from ..database.connection import sync_zones, sync_zone_events
+from ..database.connection import sync_zones, sync_processing_checkpoints
+from ..database.event_store import get_event_store
+from ..database.retention import EventRetention
 from ..detection.openvino_detector import OpenVINOPersonDetector
 from ..reid.openvino_reid import OpenVINOReID
+from ..reid.gallery_store import GalleryStore
+from ..inference.server import get_inference_server, DETECTION, ROWS
 from ..core.zone_manager import ZoneManager
-from ..core.heatmap_generator import HeatmapGenerator
+from ..core.heatmap_generator import HeatmapGenerator, day_of, delete_camera_heatmaps
+from ..core.rollups import HourlyRollup
+from ..core.transitions import TransitionTracker, delete_camera_transitions
+from ..core.occupancy import OccupancyTimeline, delete_camera_occupancy
 from ..core.insights_generator import InsightsGenerator
+from ..utils.geometry import scale_bbox, zone_regions, points_in_polygon
+from ..utils.metrics import FRAMES_ANALYSED, FRAMES_SKIPPED, ANALYSIS_FPS, ACTIVE_VISITS, EVENT_BACKLOG, GALLERY_SIZE
+from ..config.settings import settings
+from .frame_reader import FrameReader
+from .stream_reader import StreamReader
+from .motion_gate import MotionGate
+from .segments import split_frame_range, stitch_segments
+from .checkpoint import CheckpointStore
+from .detection_cache import DetectionCache, DetectionCacheWriter, video_content_hash
 
 class VideoProcessor:
-    def __init__(self, detector_model_path, reid_model_path, store_id):
-        self.detector = OpenVINOPersonDetector(detector_model_path)
-        self.reid = OpenVINOReID(reid_model_path)
+    def __init__(self, detector_model_path, reid_model_path, store_id,
+                 analysis_fps=settings.analysis_fps, decode_scale_ratio=settings.decode_scale_ratio,
+                 motion_gating=settings.motion_gate_enabled, roi_cropping=settings.roi_cropping_enabled,
+                 video_segments=settings.video_segments,
+                 checkpoint_interval_seconds=settings.checkpoint_interval_seconds,
+                 detection_cache_dir=settings.detection_cache_dir,
+                 reid_gallery_dir=settings.reid_gallery_dir, perf_counters=False,
+                 inference_server=settings.inference_server_enabled):
+        self.detector_model_path = detector_model_path
+        self.reid_model_path = reid_model_path
+        # Per-layer timings (perf_counters, see JobProfiler) need models of our own
+        detector_server = reid_server = None
+        if inference_server and not perf_counters:
+            options = dict(max_batch_size=settings.inference_max_batch, max_wait_ms=settings.inference_max_wait_ms,
+                           workers=settings.inference_workers)
+            detector_server = get_inference_server(detector_model_path, DETECTION, **options)
+            reid_server = get_inference_server(reid_model_path, ROWS, **options)
+        self.detector = OpenVINOPersonDetector(detector_model_path, perf_counters=perf_counters,
+                                               server=detector_server)
+        self.reid = OpenVINOReID(
+            reid_model_path,
+            max_persons=settings.reid_max_persons,
+            person_timeout_seconds=settings.reid_person_timeout_seconds,
+            embedding_dtype=settings.reid_embedding_dtype,
+            perf_counters=perf_counters,
+            server=reid_server
+        )
         self.store_id = store_id
         self.zone_managers = {}
+        self.analysis_fps = analysis_fps
+        self.decode_scale_ratio = decode_scale_ratio
+        self.motion_gating = motion_gating
+        self.roi_cropping = roi_cropping
+        self.video_segments = video_segments
+        self.checkpoint_interval_seconds = checkpoint_interval_seconds
+        self.checkpoints = CheckpointStore(sync_processing_checkpoints, store_id)
+        self.event_store = get_event_store()
+        self.detection_cache_dir = detection_cache_dir
+        self.gallery_store = GalleryStore(reid_gallery_dir, store_id) if reid_gallery_dir else None
+        self.camera_stats = {}
+        self.replayed_days = set()  # Days whose rollups a replay removed, re-aggregated by generate_insights
+        self.metric_marks = {}  # camera_id -> (monotonic time, frames analysed, frames skipped) at the last report
         
     def load_zones_for_camera(self, camera_id):
         """Load zones from MongoDB for a camera."""
@@ -22,6 +80,159 @@ class VideoProcessor:
             zone['camera_id'] = str(zone['camera_id'])
         return zones
     
+    def _new_zone_manager(self, camera_id, zones):
+        """ZoneManager for a camera, counting its zone-to-zone transitions"""
+        transitions = TransitionTracker(self.store_id, camera_id, settings.transition_max_gap_seconds)
+        zone_manager = ZoneManager(zones, transitions=transitions)
+        self.zone_managers[camera_id] = zone_manager
+        return zone_manager
+    
+    def _open_reader(self, video_path):
+        """Open a video and wrap it in a FrameReader configured for the detector."""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            print(f"Error: Could not open video {video_path}")
+            return None
+        
+        n, c, det_h, det_w = self.detector.input_shape
+        return FrameReader(
+            cap,
+            analysis_fps=self.analysis_fps,
+            detector_input_size=(det_w, det_h),
+            decode_scale_ratio=self.decode_scale_ratio
+        )
+    
+    def _detection_regions(self, zones, reader):
+        """Regions of the analysed frame to run detection on, or None for the full frame."""
+        if not self.roi_cropping:
+            return None
+        
+        n, c, det_h, det_w = self.detector.input_shape
+        regions = zone_regions(
+            [[(x * reader.scale, y * reader.scale) for x, y in zone['polygon']] for zone in zones],
+            reader.frame_size,
+            padding=settings.roi_padding,
+            head_room=settings.roi_head_room,
+            max_regions=settings.roi_max_regions,
+            aspect=det_w / det_h
+        )
+        if regions:
+            print(f"Detecting in {len(regions)} zone region(s): {regions}")
+        return regions
+    
+    def _motion_gate(self, zones, reader):
+        """Motion gate over the zones, or None when gating is disabled."""
+        if not self.motion_gating:
+            return None
+        
+        motion_gate = MotionGate(
+            zones,
+            (reader.source_width, reader.source_height),
+            min_changed_fraction=settings.motion_min_changed_fraction,
+            max_skip_seconds=settings.motion_max_skip_seconds
+        )
+        return motion_gate if motion_gate.enabled else None
+    
+    def _process_frames(self, reader, zones, zone_manager, start_time, emit,
+                        end_frame=None, frame_callback=None, progress_callback=None,
+                        track_callback=None, zone_shortcuts=True, occupancy=None):
+        """Run detection, Re-ID and zone checks on analysed frames until end_frame or end of video.
+        
+        Events are passed to `emit` as they are produced. With `zone_shortcuts` off, every
+        frame is inferred in full so the sightings passed to `track_callback` don't depend
+        on the zones. Zone occupancy is sampled into the `occupancy` timeline when given.
+        Returns (frames_analysed, frames_skipped).
+        """
+        regions = self._detection_regions(zones, reader) if zone_shortcuts else None
+        motion_gate = self._motion_gate(zones, reader) if zone_shortcuts else None
+        # Detections come back in analysed-frame coordinates, zones are drawn on the source
+        to_source = 1.0 / reader.scale
+        
+        frames_analysed = 0
+        frames_skipped = 0
+        tracks = []  # (person_id, source bbox) from the last inferred frame
+        
+        while end_frame is None or reader.position < end_frame:
+            frame_index, frame = reader.read()
+            if frame is None or (end_frame is not None and frame_index >= end_frame):
+                break
+            
+            # Timestamps follow the source frame index, not the number of analysed frames
+            timestamp = start_time + timedelta(seconds=reader.timestamp_offset(frame_index))
+            
+            events = []
+            if motion_gate and not motion_gate.should_analyse(frame, timestamp):
+                # Nothing changed inside the zones: the people from the last
+                # inferred frame are still where they were
+                frames_skipped += 1
+                if tracks:
+                    for person_id, bbox in tracks:
+                        events.extend(zone_manager.check_zones(person_id, bbox, timestamp))
+                else:
+                    events.extend(zone_manager.clean_stale_visits(timestamp))
+            else:
+                tracks = []
+                if regions:
+                    detections = self.detector.detect_regions(frame, regions)
+                else:
+                    detections = self.detector.detect(frame)
+                
+                bboxes = [detection['bbox'] for detection in detections]
+                person_ids = self.reid.identify_persons(frame, bboxes, timestamp)
+                for person_id, bbox in zip(person_ids, bboxes):
+                    if to_source != 1.0:
+                        bbox = scale_bbox(bbox, to_source)
+                    tracks.append((person_id, bbox))
+                    events.extend(zone_manager.check_zones(person_id, bbox, timestamp))
+            
+            if events:
+                emit(events)
+            
+            if occupancy:
+                occupancy.sample(timestamp, zone_manager)
+            
+            if track_callback:
+                track_callback(frame_index, tracks)
+            
+            frames_analysed += 1
+            
+            if frame_callback:
+                frame_callback(timestamp, frames_analysed, frames_skipped)
+            
+            if progress_callback and frames_analysed % 30 == 0:
+                progress_callback(frames_analysed, frames_skipped)
+        
+        return frames_analysed, frames_skipped
+    
+    def _record_metrics(self, camera_id, zone_manager, writer, frames_analysed, frames_skipped):
+        """Update the camera's gauges and frame counters with progress since the last call."""
+        now = time.monotonic()
+        marked_at, marked_analysed, marked_skipped = self.metric_marks.get(camera_id, (now, 0, 0))
+        self.metric_marks[camera_id] = (now, frames_analysed, frames_skipped)
+        if frames_analysed < marked_analysed:
+            # A new run on this camera (or a restarted stream) counts from zero again
+            marked_analysed = marked_skipped = 0
+        
+        FRAMES_ANALYSED.inc(frames_analysed - marked_analysed, camera_id)
+        FRAMES_SKIPPED.inc(frames_skipped - marked_skipped, camera_id)
+        if now > marked_at:
+            ANALYSIS_FPS.set(round((frames_analysed - marked_analysed) / (now - marked_at), 2), camera_id)
+        ACTIVE_VISITS.set(zone_manager.get_active_visits_count(), camera_id)
+        EVENT_BACKLOG.set(len(writer.buffer), camera_id)
+        GALLERY_SIZE.set(len(self.reid.person_database), self.store_id)
+    
+    def _clear_metrics(self, camera_id):
+        """Drop the gauges of a camera that is no longer being processed."""
+        self.metric_marks.pop(camera_id, None)
+        for gauge in (ANALYSIS_FPS, ACTIVE_VISITS, EVENT_BACKLOG):
+            gauge.remove(camera_id)
+    
+    @staticmethod
+    def _new_run():
+        """Run id and start time for a fresh run (millisecond precision so it survives a BSON round trip)."""
+        now = datetime.utcnow()
+        return uuid.uuid4().hex, now.replace(microsecond=now.microsecond // 1000 * 1000)
+    
     def process_video(self, camera_id, video_path, progress_callback=None):
         """Process a single video file."""
         print(f"Processing video for camera {camera_id}: {video_path}")
@@ -31,86 +242,550 @@ class VideoProcessor:
             print(f"No zones defined for camera {camera_id}, skipping...")
             return
         
-        zone_manager = ZoneManager(zones)
-        self.zone_managers[camera_id] = zone_manager
+        zone_manager = self._new_zone_manager(camera_id, zones)
         
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            print(f"Error: Could not open video {video_path}")
-            return
+        checkpoint = self.checkpoints.load(camera_id, video_path) if self.checkpoint_interval_seconds else None
+        if checkpoint and checkpoint['completed']:
+            # Finished before the job was interrupted; carry its gallery forward for the next camera
+            print(f"Camera {camera_id} already processed by the interrupted job, skipping")
+            self.reid.load_state(checkpoint['reid'])
+            return self._finish_camera(
+                camera_id, checkpoint['frames_analysed'], checkpoint['frames_skipped'], progress_callback
+            )
         
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        reader = self._open_reader(video_path)
+        if reader is None:
+            return
         
-        frame_count = 0
-        start_time = datetime.utcnow()
+        fps = reader.fps
+        total_frames = reader.total_frames
         
-        print(f"Video FPS: {fps}, Total frames: {total_frames}")
+        segment_count = self._segment_count(reader)
+        if segment_count > 1 and not checkpoint:
+            reader.cap.release()
+            return self._process_video_segmented(
+                camera_id, video_path, zones, zone_manager, total_frames, reader.stride,
+                segment_count, progress_callback
+            )
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+        if checkpoint:
+            run_id = checkpoint['run_id']
+            start_time = checkpoint['start_time']
+            base_analysed = checkpoint['frames_analysed']
+            base_skipped = checkpoint['frames_skipped']
+            zone_manager.active_visits = checkpoint['active_visits']
+            if checkpoint.get('transitions'):
+                zone_manager.transitions.load_state(checkpoint['transitions'])
+            self.reid.load_state(checkpoint['reid'])
+            reader.seek(checkpoint['frame_position'])
             
-            timestamp = start_time + timedelta(seconds=frame_count / fps)
-            
-            detections = self.detector.detect(frame)
+            writer = self.event_store.writer(self.store_id, run_id, checkpoint['event_watermark'])
+            discarded = writer.discard_after_watermark()
+            print(f"Resuming camera {camera_id} from frame {checkpoint['frame_position']} "
+                  f"(discarded {discarded} events written after the checkpoint)")
+        else:
+            run_id, start_time = self._new_run()
+            base_analysed = base_skipped = 0
+            writer = self.event_store.writer(self.store_id, run_id)
+        
+        # Only an uninterrupted run sees every frame, so only it can record the cache
+        cache_writer = None
+        if self.detection_cache_dir and not checkpoint:
+            cache_writer = DetectionCacheWriter(self.detection_cache_dir, video_content_hash(video_path), {
+                'fps': fps,
+                'total_frames': total_frames,
+                'stride': reader.stride,
+                'source_size': [reader.source_width, reader.source_height],
+                # A replay writes its events onto this run's timeline
+                'run_id': run_id,
+                'start_time': start_time.isoformat()
+            })
+            print("Recording detection cache: ROI cropping and motion gating are off for this run")
+        
+        print(f"Video FPS: {fps}, Total frames: {total_frames}, "
+              f"analysing every {reader.stride} frame(s) at {reader.frame_size[0]}x{reader.frame_size[1]}")
+        
+        occupancy = OccupancyTimeline(self.store_id, camera_id, zones)
+        
+        def save_checkpoint(frames_analysed, frames_skipped, completed=False):
+            writer.flush()
+            self.checkpoints.save(
+                camera_id, video_path, run_id, start_time, reader.position,
+                base_analysed + frames_analysed, base_skipped + frames_skipped,
+                zone_manager.active_visits, self.reid.get_state(), writer.watermark,
+                transitions_state=zone_manager.transitions.get_state(), completed=completed
+            )
+            # After the checkpoint: a crash in between loses these minutes rather than counting them twice
+            occupancy.flush()
+        
+        last_checkpoint = time.monotonic()
+        
+        def maybe_checkpoint(timestamp, frames_analysed, frames_skipped):
+            nonlocal last_checkpoint
+            if self.checkpoint_interval_seconds and \
+                    time.monotonic() - last_checkpoint >= self.checkpoint_interval_seconds:
+                save_checkpoint(frames_analysed, frames_skipped)
+                last_checkpoint = time.monotonic()
+        
+        def report_progress(frames_analysed, frames_skipped):
+            self._record_metrics(camera_id, zone_manager, writer, frames_analysed, frames_skipped)
+            if progress_callback and total_frames:
+                progress = min(reader.position / total_frames, 1.0) * 100
+                stats = self._frame_stats(base_analysed + frames_analysed, base_skipped + frames_skipped)
+                stats['occupancy'] = zone_manager.get_zone_occupancy()
+                progress_callback(camera_id, progress, stats)
+        
+        frames_analysed, frames_skipped = self._process_frames(
+            reader, zones, zone_manager, start_time, writer.write,
+            frame_callback=maybe_checkpoint, progress_callback=report_progress,
+            track_callback=cache_writer.add_frame if cache_writer else None,
+            zone_shortcuts=cache_writer is None, occupancy=occupancy
+        )
+        
+        self._record_metrics(camera_id, zone_manager, writer, frames_analysed, frames_skipped)
+        
+        total_frames = max(total_frames, reader.position)
+        final_timestamp = start_time + timedelta(seconds=reader.timestamp_offset(total_frames))
+        writer.write(zone_manager.finalize_all_visits(final_timestamp))
+        writer.flush()
+        zone_manager.transitions.flush(replace=True)
+        
+        reader.cap.release()
+        
+        if cache_writer:
+            cache_writer.meta['total_frames'] = total_frames
+            cache_writer.save()
+        
+        occupancy.finish()
+        if self.checkpoint_interval_seconds:
+            save_checkpoint(frames_analysed, frames_skipped, completed=True)
+        else:
+            occupancy.flush()
+        
+        return self._finish_camera(
+            camera_id, base_analysed + frames_analysed, base_skipped + frames_skipped, progress_callback
+        )
+    
+    def process_stream(self, camera_id, source, stop_event, status_callback=None):
+        """Process a live source until stop_event is set, keeping events and hourly heatmaps current.
+
+        Timestamps come from the wall clock. Every `stream_flush_seconds` buffered
+        events are written and the touched hourly heatmaps are upserted, so
+        dashboards lag the camera by seconds. Visits still open are closed when
+        the stream is stopped.
+        """
+        zones = self.load_zones_for_camera(camera_id)
+        if not zones:
+            print(f"No zones defined for camera {camera_id}, not starting stream")
+            return None
+
+        zone_manager = self._new_zone_manager(camera_id, zones)
+        run_id = uuid.uuid4().hex
+        writer = self.event_store.writer(self.store_id, run_id)
+        rollup = HourlyRollup(self.store_id, zones, self.event_store)
+        occupancy = OccupancyTimeline(self.store_id, camera_id, zones)
+
+        def emit(events):
+            # Rollups first: they seed new hours from what the writer has already stored
+            rollup.add(events)
+            writer.write(events)
+
+        reader = None
+        stats = {'frames_analysed': 0, 'frames_skipped': 0}
+        last_flush = time.monotonic()
+
+        def report(timestamp):
+            if reader:
+                self._record_metrics(camera_id, zone_manager, writer, stats['frames_analysed'], stats['frames_skipped'])
+            if status_callback:
+                status_callback(dict(
+                    stats,
+                    connected=reader.connected if reader else False,
+                    reconnects=reader.reconnects if reader else 0,
+                    last_frame_at=reader.last_frame_at if reader else None,
+                    events_written=writer.watermark,
+                    occupancy=zone_manager.get_zone_occupancy(),
+                    timestamp=timestamp
+                ))
+
+        def maybe_flush(timestamp):
+            nonlocal last_flush
+            if time.monotonic() - last_flush < settings.stream_flush_seconds:
+                return
+            writer.flush()
+            rollup.flush(timestamp)
+            zone_manager.transitions.flush()
+            zone_manager.transitions.forget_before(timestamp)
+            occupancy.flush(timestamp)
+            last_flush = time.monotonic()
+            report(timestamp)
+
+        def on_idle(timestamp):
+            # While disconnected, visits still time out and pending events still reach the dashboards
+            events = zone_manager.clean_stale_visits(timestamp)
+            if events:
+                emit(events)
+            occupancy.sample(timestamp, zone_manager)
+            maybe_flush(timestamp)
+
+        def on_frame(timestamp, frames_analysed, frames_skipped):
+            stats['frames_analysed'] = frames_analysed
+            stats['frames_skipped'] = frames_skipped
+            maybe_flush(timestamp)
+
+        n, c, det_h, det_w = self.detector.input_shape
+        try:
+            reader = StreamReader(
+                source, stop_event,
+                analysis_fps=self.analysis_fps,
+                detector_input_size=(det_w, det_h),
+                decode_scale_ratio=self.decode_scale_ratio,
+                reconnect_min_seconds=settings.stream_reconnect_min_seconds,
+                reconnect_max_seconds=settings.stream_reconnect_max_seconds,
+                on_idle=on_idle
+            )
+        except RuntimeError as e:
+            print(e)
+            return None
+
+        print(f"Streaming camera {camera_id} from {source} at {reader.fps:.1f} FPS, "
+              f"analysing every {reader.stride} frame(s)")
+
+        self._process_frames(
+            reader, zones, zone_manager, reader.start_time, emit, frame_callback=on_frame, occupancy=occupancy
+        )
+
+        stopped_at = reader.now()
+        emit(zone_manager.finalize_all_visits(stopped_at))
+        writer.flush()
+        rollup.flush(stopped_at)
+        zone_manager.transitions.flush()
+        occupancy.sample(stopped_at, zone_manager)
+        occupancy.finish()
+        occupancy.flush(stopped_at)
+        reader.cap.release()
+        report(stopped_at)
+        self._clear_metrics(camera_id)
+
+        print(f"Stopped stream for camera {camera_id} after {stats['frames_analysed']} analysed frames, "
+              f"{reader.reconnects} reconnect(s), {writer.watermark} events")
+        return dict(stats, reconnects=reader.reconnects, events_written=writer.watermark)
+
+    def replay_video(self, camera_id, video_path, progress_callback=None):
+        """Re-derive a camera's zone events from its detection cache without running the models."""
+        cache = None
+        if self.detection_cache_dir:
+            cache = DetectionCache.load(self.detection_cache_dir, video_content_hash(video_path))
+        if cache is None:
+            print(f"No detection cache for camera {camera_id}, processing video instead")
+            return self.process_video(camera_id, video_path, progress_callback)
+        if 'run_id' not in cache.meta:
+            # Recorded before caches kept their run: its events and timeline can't be told apart
+            print(f"Detection cache for camera {camera_id} predates run tracking, processing video instead")
+            return self.process_video(camera_id, video_path, progress_callback)
+        
+        print(f"Replaying {cache.meta['detections']} cached detections for camera {camera_id}")
+        
+        zones = self.load_zones_for_camera(camera_id)
+        if not zones:
+            print(f"No zones defined for camera {camera_id}, skipping...")
+            return
+        
+        zone_manager = self._new_zone_manager(camera_id, zones)
+        
+        fps = cache.meta['fps']
+        run_id, start_time = cache.meta['run_id'], datetime.fromisoformat(cache.meta['start_time'])
+        final_timestamp = start_time + timedelta(seconds=cache.meta['total_frames'] / fps)
+        
+        # The cached run's events and what was aggregated over its span were derived from the previous zones;
+        # other runs and days of this camera are kept
+        self.event_store.delete_run(self.store_id, camera_id, run_id)
+        delete_camera_transitions(self.store_id, camera_id, start_time, final_timestamp)
+        delete_camera_occupancy(self.store_id, camera_id, start_time, final_timestamp)
+        delete_camera_heatmaps(self.store_id, camera_id, start_time, final_timestamp)
+        day = day_of(start_time)
+        while day <= final_timestamp:
+            self.replayed_days.add(day)
+            day += timedelta(days=1)
+        occupancy = OccupancyTimeline(self.store_id, camera_id, zones)
+        writer = self.event_store.writer(self.store_id, run_id)
+        replay_started = time.monotonic()
+        
+        # Zone of every cached detection, first match in zone order like ZoneManager.find_zone
+        zone_index = np.full(len(cache.person_index), -1, dtype=np.int32)
+        for i in reversed(range(len(zones))):
+            zone_index[points_in_polygon(cache.foot_point, zones[i]['polygon'])] = i
+        
+        zone_lookup = zones + [None]  # index -1 -> outside every zone
+        person_ids = cache.person_ids
+        person_index = cache.person_index.tolist()
+        zone_index = zone_index.tolist()
+        offsets = cache.offsets.tolist()
+        update_visit = zone_manager.update_visit
+        
+        for frame, frame_index in enumerate(cache.frame_index.tolist()):
+            timestamp = start_time + timedelta(seconds=frame_index / fps)
+            start, end = offsets[frame], offsets[frame + 1]
             
-            for detection in detections:
-                bbox = detection['bbox']
-                person_id = self.reid.identify_person(frame, bbox)
-                
-                events = zone_manager.check_zones(person_id, bbox, timestamp)
-                
-                for event in events:
-                    event['store_id'] = str(self.store_id)
-                    sync_zone_events.insert_one(event)
+            if start == end:
+                events = zone_manager.clean_stale_visits(timestamp)
+            else:
+                events = []
+                for d in range(start, end):
+                    sighting_events = update_visit(person_ids[person_index[d]], zone_lookup[zone_index[d]], timestamp)
+                    if sighting_events:
+                        events.extend(sighting_events)
             
-            frame_count += 1
+            if events:
+                writer.write(events)
+            occupancy.sample(timestamp, zone_manager)
+        
+        writer.write(zone_manager.finalize_all_visits(final_timestamp))
+        writer.flush()
+        zone_manager.transitions.flush(replace=True)
+        occupancy.finish()
+        occupancy.flush()
+        
+        elapsed = time.monotonic() - replay_started
+        print(f"Replayed {cache.meta['detections']} detections in {elapsed:.2f}s "
+              f"({cache.meta['detections'] / max(elapsed, 1e-9):,.0f} detections/s), {writer.watermark} events")
+        
+        frames = cache.meta['frames']
+        return self._finish_camera(camera_id, frames, frames, progress_callback)
+    
+    def _finish_camera(self, camera_id, frames_analysed, frames_skipped, progress_callback):
+        self._clear_metrics(camera_id)
+        stats = self._frame_stats(frames_analysed, frames_skipped)
+        self.camera_stats[camera_id] = stats
+        print(f"Finished processing video for camera {camera_id} "
+              f"({frames_skipped}/{frames_analysed} analysed frames without inference)")
+        
+        if progress_callback:
+            progress_callback(camera_id, 100.0, stats)
+        
+        return stats
+    
+    def _segment_count(self, reader):
+        """Number of parallel segments to split this video into (1 = sequential)."""
+        if self.video_segments <= 1 or not reader.total_frames:
+            return 1
+        duration = reader.total_frames / reader.fps
+        return max(1, min(self.video_segments, int(duration // settings.segment_min_seconds)))
+    
+    def _process_video_segmented(self, camera_id, video_path, zones, zone_manager, total_frames, stride,
+                                 segment_count, progress_callback=None):
+        """Process frame-range segments of one video in parallel worker processes and stitch them."""
+        ranges = split_frame_range(total_frames, segment_count, stride)
+        run_id, start_time = self._new_run()
+        print(f"Splitting {total_frames} frames into {len(ranges)} segments: {ranges}")
+        
+        options = {
+            'analysis_fps': self.analysis_fps,
+            'decode_scale_ratio': self.decode_scale_ratio,
+            'motion_gating': self.motion_gating,
+            'roi_cropping': self.roi_cropping
+        }
+        
+        results = [None] * len(ranges)
+        # Spawn rather than fork: the parent already holds OpenVINO thread pools
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(ranges), mp_context=context) as pool:
+            futures = {
+                pool.submit(
+                    _process_segment,
+                    self.detector_model_path, self.reid_model_path, self.store_id, options,
+                    zones, video_path, start_frame, end_frame, start_time
+                ): index
+                for index, (start_frame, end_frame) in enumerate(ranges)
+            }
             
-            if progress_callback and frame_count % 30 == 0:
-                progress = (frame_count / total_frames) * 100
-                progress_callback(camera_id, progress)
+            completed = 0
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                completed += 1
+                if progress_callback:
+                    progress_callback(camera_id, completed / len(ranges) * 100 * 0.99)
         
+        fps = results[0]['fps']
         final_timestamp = start_time + timedelta(seconds=total_frames / fps)
-        final_events = zone_manager.finalize_all_visits(final_timestamp)
+        events, self.reid.next_person_id = stitch_segments(
+            results, zone_manager, self.reid.similarity_threshold, final_timestamp, self.reid.next_person_id
+        )
+        writer = self.event_store.writer(self.store_id, run_id)
+        writer.write(events)
+        writer.flush()
+        # Segment workers don't track transitions; count them once on the stitched, globally identified events
+        zone_manager.transitions.observe(events)
+        zone_manager.transitions.flush(replace=True)
+        occupancy = OccupancyTimeline(self.store_id, camera_id, zones)
+        for result in results:
+            occupancy.merge(result['occupancy'])
+        occupancy.flush()
         
-        for event in final_events:
-            event['store_id'] = str(self.store_id)
-            sync_zone_events.insert_one(event)
+        frames_analysed = sum(r['frames_analysed'] for r in results)
+        frames_skipped = sum(r['frames_skipped'] for r in results)
+        # Stage timings of the workers stay in their processes; only the frame counts come back
+        FRAMES_ANALYSED.inc(frames_analysed, camera_id)
+        FRAMES_SKIPPED.inc(frames_skipped, camera_id)
+        if self.checkpoint_interval_seconds:
+            self.checkpoints.save(
+                camera_id, video_path, run_id, start_time, total_frames, frames_analysed, frames_skipped,
+                {}, self.reid.get_state(), writer.watermark, completed=True
+            )
+        return self._finish_camera(camera_id, frames_analysed, frames_skipped, progress_callback)
+    
+    def process_segment(self, zones, video_path, start_frame, end_frame, start_time):
+        """Process frames [start_frame, end_frame) and return events plus boundary state for stitching."""
+        zone_manager = ZoneManager(zones)
+        occupancy = OccupancyTimeline(self.store_id, None, zones, seed=False)
+        reader = self._open_reader(video_path)
+        if reader is None:
+            raise RuntimeError(f"Could not open video {video_path}")
         
-        cap.release()
-        print(f"Finished processing video for camera {camera_id}")
+        reader.seek(start_frame)
+        boundary = timedelta(seconds=settings.segment_boundary_seconds)
+        head_end = start_time + timedelta(seconds=reader.timestamp_offset(start_frame)) + boundary
+        head = {}
+        events = []
         
-        if progress_callback:
-            progress_callback(camera_id, 100.0)
+        def snapshot_head(timestamp, frames_analysed, frames_skipped):
+            # Everyone in the gallery was first seen inside the head window
+            if not head and timestamp >= head_end:
+                head.update({pid: emb.copy() for pid, emb in self.reid.person_database.items()})
+        
+        frames_analysed, frames_skipped = self._process_frames(
+            reader, zones, zone_manager, start_time, events.extend,
+            end_frame=end_frame, frame_callback=snapshot_head, occupancy=occupancy
+        )
+        reader.cap.release()
+        occupancy.finish()
+        
+        if not head:
+            head = {pid: emb.copy() for pid, emb in self.reid.person_database.items()}
+        
+        tail_start = start_time + timedelta(seconds=reader.timestamp_offset(end_frame)) - boundary
+        tail = {
+            pid: self.reid.person_database[pid].copy()
+            for pid, last_seen in self.reid.person_last_seen.items()
+            if last_seen >= tail_start and pid in self.reid.person_database
+        }
+        
+        return {
+            'fps': reader.fps,
+            'events': events,
+            'open_visits': dict(zone_manager.active_visits),
+            'occupancy': occupancy.get_state(),
+            'head': head,
+            'tail': tail,
+            'frames_analysed': frames_analysed,
+            'frames_skipped': frames_skipped
+        }
+    
+    def _frame_stats(self, frames_analysed, frames_skipped):
+        """Summarise how many analysed frames actually went through inference."""
+        return {
+            'frames_analysed': frames_analysed,
+            'frames_inferred': frames_analysed - frames_skipped,
+            'frames_skipped': frames_skipped,
+            'skipped_ratio': round(frames_skipped / frames_analysed, 4) if frames_analysed else 0.0
+        }
     
-    def process_all_and_generate_insights(self, cameras, progress_callback=None):
-        """Process all videos and generate heatmaps + insights"""
+    def load_gallery(self):
+        """Start from the store's persisted Re-ID gallery so returning customers keep their ids."""
+        if not self.gallery_store:
+            return
+        
+        started = time.monotonic()
+        state = self.gallery_store.load()
+        if state is None:
+            return
+        
+        self.reid.load_state(state)
+        self.reid.apply_retention(datetime.utcnow())
+        print(f"Loaded Re-ID gallery with {len(self.reid.person_database)} persons "
+              f"in {time.monotonic() - started:.3f}s")
+    
+    def save_gallery(self):
+        """Persist the Re-ID gallery for the next job of this store."""
+        if self.gallery_store:
+            self.gallery_store.save(self.reid.get_state())
+    
+    def process_cameras(self, cameras, progress_callback=None, replay=False, should_yield=None,
+                        on_camera_done=None):
+        """Process the videos of cameras in order; returns how many were processed.
+        
+        With `replay`, zone events are re-derived from cached detections where available,
+        which is enough when only zones or dwell thresholds changed. `should_yield` is
+        asked between cameras; when it returns True the remaining cameras are left for a
+        later call on this processor, which keeps the Re-ID gallery in the meantime.
+        `on_camera_done` is called with the camera id once each camera is finished.
+        """
         print(f"\nStarting video processing for {len(cameras)} cameras...")
         
-        # Process each video
-        for camera in cameras:
+        for processed, camera in enumerate(cameras):
+            if processed and should_yield and should_yield():
+                print(f"Yielding after {processed} of {len(cameras)} cameras")
+                return processed
+            
             camera_id = str(camera['_id'])
             video_path = camera['video_source']
-            self.process_video(camera_id, video_path, progress_callback)
+            if replay:
+                self.replay_video(camera_id, video_path, progress_callback)
+            else:
+                self.process_video(camera_id, video_path, progress_callback)
+            if on_camera_done:
+                on_camera_done(camera_id)
         
+        return len(cameras)
+    
+    def process_all_and_generate_insights(self, cameras, progress_callback=None, replay=False):
+        """Process all videos and generate heatmaps + insights."""
+        self.load_gallery()
+        self.process_cameras(cameras, progress_callback, replay)
+        self.save_gallery()
+        return self.generate_insights()
+    
+    def generate_insights(self):
+        """Aggregate the store's events into heatmaps and insights once its videos are processed."""
         print("\nAll videos processed. Generating heatmaps and insights...")
         
         # Generate hourly heatmaps
         heatmap_gen = HeatmapGenerator(self.store_id)
         hourly_heatmaps = heatmap_gen.generate_hourly_heatmaps()
         
+        # Only days that still have raw events can be re-aggregated; archived days keep their rollups
+        # Replayed days too, so one whose hours all lost their visits doesn't keep its old rollups
+        days = sorted({day_of(h['hour_start']) for h in hourly_heatmaps} | self.replayed_days)
+        self.replayed_days = set()
+        
         # Generate daily heatmaps
-        daily_heatmaps = heatmap_gen.generate_daily_heatmaps()
+        daily_heatmaps = heatmap_gen.generate_daily_heatmaps(days)
         
         # Generate daily insights
         insights_gen = InsightsGenerator(self.store_id)
-        insights = insights_gen.generate_daily_insights()
+        insights = insights_gen.generate_daily_insights(days)
+        
+        # The job is complete; a later run starts from scratch
+        self.checkpoints.clear()
+        
+        if settings.retention_days > 0:
+            archived = EventRetention(self.store_id, settings.archive_dir, settings.retention_days).run()
+            if archived:
+                print(f"Archived raw events of {len(archived)} days")
         
         print("\n✅ Processing complete!")
         return {
             'hourly_heatmaps': len(hourly_heatmaps),
             'daily_heatmaps': len(daily_heatmaps),
-            'insights': insights
-        }
\ No newline at end of file
+            'insights': insights,
+            'camera_stats': self.camera_stats
+        }
+
+
+def _process_segment(detector_model_path, reid_model_path, store_id, options, zones, video_path,
+                     start_frame, end_frame, start_time):
+    """Worker entry point: load the models in this process and process one segment."""
+    processor = VideoProcessor(detector_model_path, reid_model_path, store_id,
+                               video_segments=1, checkpoint_interval_seconds=0, detection_cache_dir="",
+                               reid_gallery_dir="", inference_server=False, **options)
+    return processor.process_segment(zones, video_path, start_frame, end_frame, start_time)
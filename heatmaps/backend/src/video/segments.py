@@ -0,0 +1,173 @@
+"""Split one long video into frame-range segments and stitch their results.
+
+Each segment is processed independently (own ZoneManager and Re-ID gallery)
+and reports, besides its events, the state needed to join it to its
+neighbours: the visits still open at its end, the embeddings of people seen
+in its last `boundary_seconds` (tail) and in its first `boundary_seconds`
+(head). Stitching walks the segments in order, maps head identities onto the
+previous tail by cosine similarity and merges visits that cross a boundary.
+
+Compared with a sequential run, the stitched events are expected to differ
+only in these ways:
+
+- People who leave view before a boundary and return after the following
+  segment's head window get a new person id.
+- A visit open at a boundary whose person is not re-seen in any zone is
+  closed as a stale visit at its last_seen time, and one whose person is next
+  seen in another zone is closed when that entry happens. A sequential run
+  may close either a little earlier, when the person is seen outside every
+  zone. Exit times and dwell of boundary-crossing visits can therefore
+  differ by at most the gap until the person is seen again (bounded by the
+  ZoneManager visit timeout).
+- Seeking is keyframe-accurate on most containers, which can shift the first
+  analysed frame of a segment by a few frames.
+"""
+import numpy as np
+
+
+def split_frame_range(total_frames, segment_count, stride=1):
+    """Split [0, total_frames) into contiguous ranges whose starts lie on the analysis grid"""
+    segment_count = max(1, min(segment_count, total_frames // max(stride, 1) or 1))
+    step = total_frames / segment_count
+
+    starts = []
+    for i in range(segment_count):
+        start = int(round(i * step))
+        # Align to the stride so a segment analyses the same frames a sequential run would
+        start = ((start + stride - 1) // stride) * stride
+        starts.append(min(start, total_frames))
+
+    ranges = []
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else total_frames
+        if end > start:
+            ranges.append((start, end))
+    return ranges
+
+
+def _normalize(embedding):
+    embedding = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm > 0 else embedding
+
+
+def match_boundary_identities(head, tail, similarity_threshold):
+    """Greedily pair head person ids with tail person ids by descending cosine similarity"""
+    if not head or not tail:
+        return {}
+
+    head_ids = list(head.keys())
+    tail_ids = list(tail.keys())
+    head_matrix = np.stack([_normalize(head[pid]) for pid in head_ids])
+    tail_matrix = np.stack([_normalize(tail[pid]) for pid in tail_ids])
+    similarities = head_matrix @ tail_matrix.T
+
+    matches = {}
+    used_tail = set()
+    for flat_index in np.argsort(similarities, axis=None)[::-1]:
+        i, j = np.unravel_index(flat_index, similarities.shape)
+        if similarities[i, j] < similarity_threshold:
+            break
+        if head_ids[i] in matches or j in used_tail:
+            continue
+        matches[head_ids[i]] = tail_ids[j]
+        used_tail.add(j)
+
+    return matches
+
+
+def stitch_segments(results, zone_manager, similarity_threshold, final_timestamp, next_person_id=1):
+    """Merge per-segment results (in frame order) into one event stream.
+
+    `zone_manager` is only used for its zones, visit timeout and exit event
+    construction; its active visits are not touched. Stitched people are
+    numbered from `next_person_id` (the store's Re-ID counter, so ids don't
+    collide with other cameras and jobs). Returns the events and the next
+    free person id.
+    """
+    timeout = zone_manager.visit_timeout_seconds
+    zone_ids = {key: zone_id for zone_id, key in zone_manager.zone_keys.items()}  # event zone_id -> zone _id
+    previous_tail = {}
+    carried = {}  # global person id -> visit still open at the previous boundary
+    stitched = []
+
+    for result in results:
+        boundary_matches = match_boundary_identities(result['head'], previous_tail, similarity_threshold)
+        mapping = {}
+
+        def global_id(local_id):
+            nonlocal next_person_id
+            if local_id not in mapping:
+                if local_id in boundary_matches:
+                    mapping[local_id] = boundary_matches[local_id]
+                else:
+                    mapping[local_id] = f"P_{next_person_id}"
+                    next_person_id += 1
+            return mapping[local_id]
+
+        continuing = {}  # global person id -> original entry time of a visit crossing the boundary
+
+        for event in result['events']:
+            person_id = global_id(event.person_id)
+            event.person_id = person_id
+
+            if person_id in carried:
+                visit = carried.pop(person_id)
+                gap = (event.timestamp - visit['last_seen']).total_seconds()
+
+                if (event.event_type == 'entry' and event.zone_id == zone_manager.zone_keys.get(visit['zone_id'])
+                        and gap <= timeout):
+                    # Same visit seen from the other side of the boundary
+                    continuing[person_id] = visit['entry_time']
+                    continue
+
+                if gap <= timeout:
+                    exit_event = zone_manager.make_exit_event(
+                        person_id, visit['zone_id'], visit['entry_time'], event.timestamp
+                    )
+                else:
+                    exit_event = zone_manager.make_exit_event(
+                        person_id, visit['zone_id'], visit['entry_time'], visit['last_seen'],
+                        "stale_visit_timeout"
+                    )
+                if exit_event:
+                    stitched.append(exit_event)
+
+            if event.event_type == 'exit' and person_id in continuing:
+                reason = event.rejection_reason or "below_minimum_dwell"
+                rebuilt = zone_manager.make_exit_event(
+                    person_id, zone_ids.get(event.zone_id), continuing.pop(person_id), event.timestamp, reason
+                )
+                if rebuilt:
+                    event = rebuilt
+
+            stitched.append(event)
+
+        # Visits carried into this segment whose person never showed up in a zone
+        for person_id, visit in carried.items():
+            exit_event = zone_manager.make_exit_event(
+                person_id, visit['zone_id'], visit['entry_time'], visit['last_seen'],
+                "stale_visit_timeout"
+            )
+            if exit_event:
+                stitched.append(exit_event)
+
+        carried = {}
+        for local_id, visit in result['open_visits'].items():
+            person_id = global_id(local_id)
+            carried[person_id] = {
+                'zone_id': visit['zone_id'],
+                'entry_time': continuing.get(person_id, visit['entry_time']),
+                'last_seen': visit['last_seen']
+            }
+
+        previous_tail = {global_id(local_id): embedding for local_id, embedding in result['tail'].items()}
+
+    for person_id, visit in carried.items():
+        exit_event = zone_manager.make_exit_event(
+            person_id, visit['zone_id'], visit['entry_time'], final_timestamp
+        )
+        if exit_event:
+            stitched.append(exit_event)
+
+    return stitched, next_person_id
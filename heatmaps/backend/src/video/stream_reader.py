@@ -0,0 +1,118 @@
+import os
+import time
+from datetime import datetime, timedelta
+import cv2
+from .frame_reader import FrameReader
+
+
+class StreamReader(FrameReader):
+    """FrameReader over a live source (RTSP/HTTP URL, pipe or file) that reconnects on failure.
+
+    Frame timestamps follow the wall clock: `timestamp_offset` returns the
+    time since `start_time` at which the frame was read. A regular file is
+    played back at its native frame rate and reopened at its end, so it can
+    stand in for a camera in tests. `read` returns (None, None) only once
+    `stop_event` is set.
+    """
+
+    def __init__(self, source, stop_event, analysis_fps=0.0, detector_input_size=None, decode_scale_ratio=0.0,
+                 reconnect_min_seconds=1.0, reconnect_max_seconds=30.0, on_idle=None):
+        self.source = source
+        self.stop_event = stop_event
+        self.reconnect_min_seconds = reconnect_min_seconds
+        self.reconnect_max_seconds = reconnect_max_seconds
+        self.on_idle = on_idle  # Called with the current timestamp while waiting to reconnect
+        self.realtime = os.path.isfile(source)
+        self.reconnects = 0
+        self.connected = False
+        self.last_frame_at = None
+
+        self.start_time = datetime.utcnow()
+        self._start_monotonic = time.monotonic()
+        self._last_index = None
+        self._last_offset = 0.0
+
+        cap = self._connect()
+        if cap is None:
+            raise RuntimeError(f"Stream {source} stopped before it could be opened")
+        super().__init__(cap, analysis_fps, detector_input_size, decode_scale_ratio)
+        self._reset_pacing()
+
+    def now(self):
+        """Current stream time (start_time plus monotonic elapsed time)"""
+        return self.start_time + timedelta(seconds=time.monotonic() - self._start_monotonic)
+
+    def _connect(self):
+        """Open the source, retrying with exponential backoff; None if stopped first"""
+        delay = self.reconnect_min_seconds
+        while not self.stop_event.is_set():
+            cap = cv2.VideoCapture(self.source)
+            if cap.isOpened():
+                self.connected = True
+                return cap
+            cap.release()
+
+            print(f"Could not open stream {self.source}, retrying in {delay:.0f}s")
+            if self.on_idle:
+                self.on_idle(self.now())
+            self.stop_event.wait(delay)
+            delay = min(delay * 2, self.reconnect_max_seconds)
+        return None
+
+    def _reconnect(self):
+        self.connected = False
+        self.cap.release()
+        if not self.realtime:
+            print(f"Stream {self.source} interrupted, reconnecting")
+            if self.on_idle:
+                self.on_idle(self.now())
+            self.stop_event.wait(self.reconnect_min_seconds)
+
+        cap = self._connect()
+        if cap is None:
+            return False
+
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if (width, height) != (self.source_width, self.source_height):
+            print(f"Warning: stream resolution changed from {self.source_width}x{self.source_height} "
+                  f"to {width}x{height}; zones are still drawn on the original resolution")
+
+        self.cap = cap
+        self.reconnects += 1
+        self._reset_pacing()
+        return True
+
+    def _reset_pacing(self):
+        self._pace_origin = (time.monotonic(), self.position)
+
+    def _pace(self):
+        """Hold a file source back to its native frame rate"""
+        origin_time, origin_position = self._pace_origin
+        due = origin_time + (self.position - origin_position) / self.fps
+        delay = due - time.monotonic()
+        if delay > 0:
+            self.stop_event.wait(delay)
+
+    def read(self):
+        """Return (frame_index, frame) for the next analysed frame, or (None, None) once stopped."""
+        while not self.stop_event.is_set():
+            frame_index, frame = super().read()
+            if frame is None:
+                if not self._reconnect():
+                    break
+                continue
+
+            if self.realtime:
+                self._pace()
+            self._last_index = frame_index
+            self._last_offset = time.monotonic() - self._start_monotonic
+            self.last_frame_at = self.start_time + timedelta(seconds=self._last_offset)
+            return frame_index, frame
+        return None, None
+
+    def timestamp_offset(self, frame_index):
+        """Wall-clock seconds from start_time to when `frame_index` was read."""
+        if frame_index == self._last_index:
+            return self._last_offset
+        return time.monotonic() - self._start_monotonic
@@ -0,0 +1,71 @@
+"""Processing worker: runs the video pipeline for stores outside the API process.
+
+    python -m src.worker <store_id> [<store_id> ...] [--replay]
+
+With PROCESSING_ENABLED=false the API only serves CRUD and dashboard reads
+and never loads cv2, OpenVINO or SciPy; processing then runs here, e.g.
+from cron for the nightly backfill. Stores are processed one after another
+and their heatmaps and insights land in the same database the API reads.
+"""
+import argparse
+import sys
+import time
+from bson import ObjectId
+from .config.settings import settings
+from .database.connection import sync_stores, sync_cameras
+from .video.processor import VideoProcessor
+
+
+def process_store(store_id, replay=False):
+    """Process all videos of a store; returns the aggregation result, or None without cameras"""
+    cameras = list(sync_cameras.find({"store_id": store_id}))
+    if not cameras:
+        print(f"Store {store_id} has no cameras")
+        return None
+
+    names = {str(camera['_id']): camera['name'] for camera in cameras}
+    reported = {}
+
+    def update_progress(camera_id, progress, stats=None):
+        # Every 10%, the processor reports far more often
+        step = int(progress // 10)
+        if reported.get(camera_id) != step:
+            reported[camera_id] = step
+            print(f"  {names.get(camera_id, camera_id)}: {progress:.0f}%")
+
+    processor = VideoProcessor(settings.detector_model_path, settings.reid_model_path, store_id)
+    return processor.process_all_and_generate_insights(cameras, update_progress, replay=replay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process the videos of stores and generate their heatmaps and insights")
+    parser.add_argument('store_ids', nargs='+', metavar='store_id')
+    parser.add_argument('--replay', action='store_true',
+                        help="Rebuild zone events from cached detections (after zone edits)")
+    args = parser.parse_args()
+
+    failed = 0
+    for store_id in args.store_ids:
+        if not ObjectId.is_valid(store_id) or not sync_stores.find_one({"_id": ObjectId(store_id)}):
+            print(f"Store {store_id} not found")
+            failed += 1
+            continue
+
+        started = time.monotonic()
+        print(f"Processing store {store_id}...")
+        try:
+            result = process_store(store_id, args.replay)
+        except Exception as e:
+            print(f"Error processing store {store_id}: {e}")
+            failed += 1
+            continue
+        if result:
+            print(f"Store {store_id} done in {time.monotonic() - started:.0f}s: "
+                  f"{result['hourly_heatmaps']} hourly and {result['daily_heatmaps']} daily heatmaps, "
+                  f"{len(result['insights']) if result['insights'] else 0} insights")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()